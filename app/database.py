@@ -3,6 +3,9 @@ from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
 
+from app.services import tracing
+from app.services.db_metrics import TimedQueuePool, instrument
+
 # Cargar variables de entorno desde .env
 load_dotenv()
 
@@ -14,8 +17,11 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 engine = create_engine(
     DATABASE_URL,
     echo=True,            # Muestra las consultas SQL en consola (útil en desarrollo)
-    future=True           # Usa la API moderna de SQLAlchemy
+    future=True,          # Usa la API moderna de SQLAlchemy
+    poolclass=TimedQueuePool  # QueuePool con métricas de espera (ver /metrics)
 )
+instrument(engine)
+tracing.instrument_engine(engine)
 
 # Sesión para interactuar con la DB
 SessionLocal = sessionmaker(
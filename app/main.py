@@ -1,15 +1,42 @@
 from fastapi import FastAPI
-from fastapi import Request
-import logging
+from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from app.routers import routers  # importa la lista de routers definida en __init__.py
+from app.database import SessionLocal, engine
+from app.services import bulkheads
+from app.services.catalog_cache import cache as catalog_cache
+from app.services.compression import CompressionMiddleware
+from app.services.fast_json import FastJSONResponse
+from app.services.metrics import writer as metrics_writer
+from app.services.profiling import ProfilingMiddleware
+from app.services.request_timing import RequestTimingMiddleware
+from app.services.session_activity import tracker as session_tracker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tamaño del threadpool por defecto; PDFs, bcrypt y exportaciones tienen el suyo
+    bulkheads.configurar_default()
+    # Volcado periódico de la actividad de sesiones
+    session_tracker.start(engine)
+    # Catálogos (nacionalidad, afp, salud, territorial, ...) en memoria
+    catalog_cache.warm(SessionLocal)
+    # Snapshot periódico de métricas para /metrics con varios workers
+    metrics_writer.start()
+    yield
+    metrics_writer.stop()
+    session_tracker.stop(engine)
+
 
 app = FastAPI(
     title="ERP System",
     description="Backend ERP con FastAPI",
     version="1.0.0",
+    lifespan=lifespan,
+    # orjson (ver fast_json)
+    default_response_class=FastJSONResponse,
     swagger_ui_init_oauth={
         "usePkceWithAuthorizationCodeGrant": True,
     }
@@ -29,6 +56,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip/brotli para respuestas de texto (JSON, NDJSON, CSV); PDF y XLSX pasan tal cual
+app.add_middleware(CompressionMiddleware)
+# Perfilado bajo demanda (X-Profile: 1, solo administradores)
+app.add_middleware(ProfilingMiddleware)
+# Tiempos y conteo por ruta; se agrega al final para quedar como la capa más externa
+app.add_middleware(RequestTimingMiddleware)
 # incluir todos los routers automáticamente
 for r in routers:
     app.include_router(r)
@@ -36,13 +69,3 @@ for r in routers:
 @app.get("/")
 def root():
     return {"msg": "API funcionando 🚀"}
-
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger = logging.getLogger("uvicorn")
-    logger.info(f"➡️ {request.method} {request.url} desde {request.client.host}")
-
-    response = await call_next(request)
-
-    logger.info(f"⬅️ {response.status_code} {request.method} {request.url}")
-    return response
@@ -1,6 +1,6 @@
 from typing import List, Optional
 
-from sqlalchemy import ARRAY, BigInteger, Boolean, CHAR, CheckConstraint, Column, Date, DateTime, ForeignKeyConstraint, Identity, Integer, Numeric, PrimaryKeyConstraint, Sequence, SmallInteger, String, Text, UniqueConstraint, text
+from sqlalchemy import ARRAY, BigInteger, Boolean, CHAR, CheckConstraint, Column, Date, DateTime, ForeignKeyConstraint, Identity, Index, Integer, Numeric, PrimaryKeyConstraint, Sequence, SmallInteger, String, Text, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
 from sqlalchemy.orm.base import Mapped
 
@@ -357,7 +357,9 @@ class LoginUsuario(Base):
     __tablename__ = 'login_usuario'
     __table_args__ = (
         ForeignKeyConstraint(['id_usuario'], ['usuario.id_usuario'], ondelete='CASCADE', name='fk_usuario'),
-        PrimaryKeyConstraint('id_login', name='login_usuario_pkey')
+        PrimaryKeyConstraint('id_login', name='login_usuario_pkey'),
+        Index('ix_login_usuario_verificacion_pendiente', 'email_verificacion_hash', unique=True, postgresql_where=text('email_verificado_at IS NULL')),
+        Index('ix_login_usuario_verificacion_expira', 'email_verificacion_expira', postgresql_where=text('email_verificado_at IS NULL'))
     )
 
     id_login = mapped_column(Integer, Identity(always=True, start=1, increment=1, minvalue=1, maxvalue=2147483647, cycle=False, cache=1))
@@ -369,6 +371,8 @@ class LoginUsuario(Base):
     email_verificado_at = mapped_column(DateTime(True))
     email_verificacion_hash = mapped_column(CHAR(64))
     email_verificacion_expira = mapped_column(DateTime(True))
+    email_verificacion_reenviado_at = mapped_column(DateTime(True))
+    registrado_at = mapped_column(DateTime(True), server_default=text('now()'))
 
     usuario: Mapped[Optional['Usuario']] = relationship('Usuario', back_populates='login_usuario')
     sesiones: Mapped[List['Sesiones']] = relationship('Sesiones', uselist=True, back_populates='login_usuario')
@@ -510,6 +514,7 @@ class Sesiones(Base):
     revoked_at = mapped_column(DateTime(True))
     user_agent = mapped_column(Text)
     ip = mapped_column(Text)
+    ultima_actividad = mapped_column(DateTime(True))
 
     login_usuario: Mapped['LoginUsuario'] = relationship('LoginUsuario', back_populates='sesiones')
 
@@ -1,11 +1,14 @@
 #from . import afps, bosses, locations, positions, register_company, workers
-from .auth import register, verify_email ,login, refresh
+from .auth import register, verify_email ,login, refresh, sessions
 from . import epp, odi
 from . import register_company
 from . import workers
 from . import nacionalidad
 from . import contrato
 from . import clausulas
+from . import territorial
+from . import metrics
+from . import profiling
 
 routers = [
     #afps.router,
@@ -19,11 +22,15 @@ routers = [
     verify_email.router,
     refresh.router,
     login.router,
+    sessions.router,
     epp.router,
     odi.router,
     register_company.router,
     workers.router,
     nacionalidad.router,
     contrato.router,
-    clausulas.router
+    clausulas.router,
+    territorial.router,
+    metrics.router,
+    profiling.router
 ]
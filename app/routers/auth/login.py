@@ -5,11 +5,13 @@ from sqlalchemy.orm import Session
 from hashlib import sha256
 from datetime import timedelta, datetime, timezone
 import secrets
-from jose import jwt, JWTError
 
 from app.database import get_db
 from app.models.generated import LoginUsuario, Usuario, Sesiones
 from app.services import auth
+from app.services.bulkheads import correr_en_pool
+from app.services import login_throttle
+from app.services.permissions import require_permission
 from app.schemas.login import LoginRequest, LoginResponse
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -20,8 +22,17 @@ templates = Jinja2Templates(directory="app/templates")
 # ---------------------------
 @router.post("/login_api", response_model=LoginResponse)
 def login_user(data: LoginRequest, request: Request, db: Session = Depends(get_db)):
+    return autenticar(data, request, db)
+
+
+def autenticar(data: LoginRequest, request: Request, db: Session) -> dict:
+    """Login completo (sesión y tokens); solo bcrypt corre en el pool "hash"."""
+    # Limitar intentos antes de tocar la DB y bcrypt
+    login_throttle.check_login_attempt(request.client.host if request.client else None, data.email)
+
     login_entry = db.query(LoginUsuario).filter(LoginUsuario.correo == data.email).first()
-    if not login_entry or not auth.verify_password(data.password, login_entry.password):
+    # Los intentos rechazados por el limitador o sin usuario no ocupan el pool
+    if not login_entry or not correr_en_pool("hash", auth.verify_password, data.password, login_entry.password):
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
     if not login_entry.email_verificado_at:
@@ -30,27 +41,31 @@ def login_user(data: LoginRequest, request: Request, db: Session = Depends(get_d
     usuario = db.query(Usuario).filter(Usuario.id_usuario == login_entry.id_usuario).first()
     empresa_id = usuario.id_empresa if usuario else None
 
-    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth.create_access_token(
-        data={
-            "sub": str(login_entry.id_usuario),
-            "empresa_id": str(empresa_id),
-            "rol": str(login_entry.tipo_usuario)
-        },
-        expires_delta=access_token_expires
-    )
-
     refresh_token = secrets.token_urlsafe(64)
+    ahora = datetime.now(timezone.utc)
     sesion = Sesiones(
         idusuario=login_entry.id_login,
         tokenrefresh_hash=sha256(refresh_token.encode()).hexdigest(),
-        fecha_sesion=datetime.now(timezone.utc),
-        limite_sesion=datetime.now(timezone.utc) + timedelta(days=auth.REFRESH_TOKEN_EXPIRE_DAYS),
+        fecha_sesion=ahora,
+        limite_sesion=ahora + timedelta(days=auth.REFRESH_TOKEN_EXPIRE_DAYS),
         revoked_at=None,
         user_agent=request.headers.get("user-agent"),
-        ip=request.client.host
+        ip=request.client.host,
+        ultima_actividad=ahora
     )
     db.add(sesion)
+    db.flush()  # sesion.id va en el token para registrar su actividad
+
+    access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = auth.create_access_token(
+        data={
+            "sub": str(login_entry.id_usuario),
+            "empresa_id": str(empresa_id),
+            "rol": str(login_entry.tipo_usuario),
+            "sid": str(sesion.id)
+        },
+        expires_delta=access_token_expires
+    )
     db.commit()
 
     role_map = {
@@ -86,7 +101,7 @@ def login_html(
 ):
     try:
         data = LoginRequest(email=email, password=password)
-        api_response = login_user(data=data, request=request, db=db)
+        api_response = autenticar(data, request, db)
 
         resp = RedirectResponse(url="/empresa", status_code=303)
         resp.set_cookie(
@@ -100,6 +115,10 @@ def login_html(
     except Exception:
         return RedirectResponse(url="/login", status_code=303)
 
+@router.get("/login-throttle/stats")
+def login_throttle_stats(current_user: dict = Depends(require_permission("metricas:ver"))):
+    return login_throttle.stats()
+
 @router.get("/logout")
 def logout():
     resp = RedirectResponse(url="/login", status_code=303)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.generated import Empresa
@@ -6,14 +6,15 @@ from app.models.generated import Usuario
 from app.models.generated import LoginUsuario
 from app.schemas.register import Register
 from app.services import auth
+from app.services.bulkheads import correr_en_pool
 import secrets
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from app.services.email_validation import send_verification_email
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register")
-def register_user(data: Register, db: Session = Depends(get_db)):
+def register_user(data: Register, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     # 0. Validar que el correo no exista en login_usuario
     existing = db.query(LoginUsuario).filter(LoginUsuario.correo == data.email).first()
     if existing:
@@ -22,7 +23,11 @@ def register_user(data: Register, db: Session = Depends(get_db)):
             detail="El correo ya está registrado"
         )
 
-    # 1. Crear empresa vacía
+    # Solo bcrypt va al pool "hash"; la DB y el correo no le quitan hilos al login.
+    # Antes de escribir nada: si el pool responde 503 no quedan filas a medias
+    hashed_password = correr_en_pool("hash", auth.get_password_hash, data.password)
+
+    # 1. Crear empresa vacía (empresa, usuario y login van en una sola transacción)
     nueva_empresa = Empresa(
         id_territorial=None,
         rut_empresa=None,
@@ -39,8 +44,7 @@ def register_user(data: Register, db: Session = Depends(get_db)):
         correo=""
     )
     db.add(nueva_empresa)
-    db.commit()
-    db.refresh(nueva_empresa)
+    db.flush()
 
     # 2. Crear usuario ligado a la empresa
     nuevo_usuario = Usuario(
@@ -50,13 +54,11 @@ def register_user(data: Register, db: Session = Depends(get_db)):
         id_empresa=nueva_empresa.id_empresa
     )
     db.add(nuevo_usuario)
-    db.commit()
-    db.refresh(nuevo_usuario)
+    db.flush()
 
     # 3. Crear login_usuario ligado al usuario
-    hashed_password = auth.get_password_hash(data.password)
-    verification_token = secrets.token_hex(32)  # 🔑 token único
-    expiry_time = datetime.utcnow() + timedelta(hours=24)  # expira en 24h
+    verification_token = secrets.token_urlsafe(32)  # 🔑 token único (solo viaja en el correo)
+    expiry_time = datetime.now(timezone.utc) + timedelta(hours=24)  # expira en 24h
 
     login_entry = LoginUsuario(
     telefono="",
@@ -65,14 +67,15 @@ def register_user(data: Register, db: Session = Depends(get_db)):
     id_usuario=nuevo_usuario.id_usuario,
     tipo_usuario=1,
     email_verificado_at=None,
-    email_verificacion_hash=verification_token,
+    email_verificacion_hash=auth.hash_token(verification_token),
     email_verificacion_expira=expiry_time
     )
-    db.add_all([nueva_empresa, nuevo_usuario, login_entry])
+    db.add(login_entry)
     db.commit()
     db.refresh(login_entry)
 
-    send_verification_email(login_entry.correo, login_entry.email_verificacion_hash) #enviar correo de verificación
+    # enviar correo de verificación después de responder (SendGrid no retrasa el registro)
+    background_tasks.add_task(send_verification_email, login_entry.correo, verification_token)
 
     return {
         "msg": "Usuario registrado con éxito",
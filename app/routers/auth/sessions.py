@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from datetime import datetime, timezone
+
+from app.database import get_db
+from app.models.generated import Sesiones, LoginUsuario, Usuario
+from app.schemas.sesiones import SesionActivaResponse
+from app.services.dependencies import get_current_user
+from app.services.permissions import has_permission
+from app.services.session_activity import tracker as session_tracker
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+
+@router.get("/sessions/active", response_model=list[SesionActivaResponse])
+def list_active_sessions(
+    empresa: bool = Query(False, description="Listar las sesiones de toda la empresa (solo admin)"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Sesiones vigentes (no revocadas ni expiradas) del usuario, o de toda la
+    empresa si lo pide un admin. Incluye la actividad aún no volcada a la DB.
+    """
+    if empresa and not has_permission(current_user["rol"], "sesiones:empresa"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para ver las sesiones de la empresa"
+        )
+
+    query = (
+        select(Sesiones, LoginUsuario.id_usuario)
+        .join(LoginUsuario, Sesiones.idusuario == LoginUsuario.id_login)
+        .where(
+            Sesiones.revoked_at.is_(None),
+            Sesiones.limite_sesion > datetime.now(timezone.utc)
+        )
+        .order_by(Sesiones.ultima_actividad.desc().nulls_last())
+    )
+    if empresa:
+        query = query.join(Usuario, LoginUsuario.id_usuario == Usuario.id_usuario).where(
+            Usuario.id_empresa == current_user["empresa_id"]
+        )
+    else:
+        query = query.where(LoginUsuario.id_usuario == current_user["usuario_id"])
+
+    sesiones = []
+    for sesion, id_usuario in db.execute(query).all():
+        ultima_actividad = sesion.ultima_actividad
+        pendiente = session_tracker.pending(sesion.id)
+        if pendiente and (ultima_actividad is None or pendiente > ultima_actividad):
+            ultima_actividad = pendiente
+
+        sesiones.append({
+            "id": sesion.id,
+            "id_usuario": id_usuario,
+            "fecha_sesion": sesion.fecha_sesion,
+            "limite_sesion": sesion.limite_sesion,
+            "ultima_actividad": ultima_actividad,
+            "ip": sesion.ip,
+            "user_agent": sesion.user_agent,
+            "actual": sesion.id == current_user["sesion_id"]
+        })
+
+    return sesiones
@@ -3,14 +3,16 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 from app.database import get_db
 from app.models.generated import LoginUsuario
+from app.services import auth
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.get("/verify-email/{token}")
 def verify_email(token: str, db: Session = Depends(get_db)):
-    # 1. Buscar usuario con ese token
+    # 1. Buscar usuario con ese token (se guarda solo su digest, con índice parcial de pendientes)
     login_entry = db.query(LoginUsuario).filter(
-        LoginUsuario.email_verificacion_hash == token
+        LoginUsuario.email_verificacion_hash == auth.hash_token(token),
+        LoginUsuario.email_verificado_at.is_(None)
     ).first()
 
     if not login_entry:
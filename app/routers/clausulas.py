@@ -5,7 +5,10 @@ from sqlalchemy.exc import IntegrityError
 from app.database import get_db
 from app.models.generated import Clausulas
 from app.schemas.clausulas import ClausulaCreate, ClausulaResponse
-from app.services.dependencies import get_current_user
+from app.schemas.pagination import Pagina
+from app.services.fast_json import model_response
+from app.services.pagination import PageParams, page_params, paginate
+from app.services.permissions import require_permission
 
 router = APIRouter(prefix="/clausulas", tags=["Clausulas"])
 
@@ -14,14 +17,8 @@ router = APIRouter(prefix="/clausulas", tags=["Clausulas"])
 def create_clausula(
     clausula_data: ClausulaCreate,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("clausulas:crear"))
 ):
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para crear cláusulas"
-        )
-
     try:
         # Obtener empresa_id de la sesión actual
         empresa_id = current_user["empresa_id"]
@@ -52,17 +49,13 @@ def create_clausula(
             )
 
 
-@router.get("/list", response_model=list[ClausulaResponse])
+@router.get("/list", response_model=Pagina[ClausulaResponse])
 def list_clausulas(
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("clausulas:listar"))
 ):
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para listar cláusulas"
-        )
-
     empresa_id = current_user["empresa_id"]
-    clausulas = db.query(Clausulas).filter(Clausulas.id_empresa == empresa_id).all()
-    return clausulas
+    return model_response(Pagina[ClausulaResponse], paginate(
+        db.query(Clausulas).filter(Clausulas.id_empresa == empresa_id), Clausulas.id_clausula, page
+    ))
@@ -3,31 +3,25 @@ from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 import os
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
 
 from app.database import get_db
 from app.models.generated import Empresa, Trabajador, DatosTrabajador, Territorial, Contrato
 from app.schemas.pdf_contrato import PDFContratoRequest, PDFContratoResponse
 from app.schemas.pdf_termino_contrato import PDFTerminoContratoRequest, PDFTerminoContratoResponse
-from app.services.pdf_generator import PDFContratoGenerator, PDFTerminoContratoGenerator
-from app.services.dependencies import get_current_user
+from app.services.bulkheads import en_pool
+from app.services.permissions import require_permission
+from app.services import tracing
 
 router = APIRouter(prefix="/contrato", tags=["Contrato"])
 
 
 @router.post("/generate-pdf")
+@en_pool("documentos")
 def generate_contrato_pdf(
     pdf_data: PDFContratoRequest,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("contrato:pdf"))
 ):
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para generar contratos"
-        )
-
     try:
         # Obtener empresa_id del usuario autenticado
         empresa_id = current_user["empresa_id"]
@@ -66,6 +60,8 @@ def generate_contrato_pdf(
         pdf_generator_data.clausulas = pdf_data.clausulas
 
         # Crear instancia del generador de PDF
+        # ReportLab se importa recién al generar el primer PDF
+        from app.services.pdf_generator import PDFContratoGenerator
         pdf_generator = PDFContratoGenerator()
 
         # Generar el PDF
@@ -93,17 +89,12 @@ def generate_contrato_pdf(
 
 
 @router.post("/generate-pdf-termino")
+@en_pool("documentos")
 def generate_termino_contrato_pdf(
     pdf_data: PDFTerminoContratoRequest,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("contrato:termino_pdf"))
 ):
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para generar cartas de término"
-        )
-
     try:
         # Obtener empresa_id del usuario autenticado
         empresa_id = current_user["empresa_id"]
@@ -175,6 +166,8 @@ def generate_termino_contrato_pdf(
         pdf_generator_data.telefono_notaria = pdf_data.telefono_notaria
 
         # Crear instancia del generador de PDF
+        # ReportLab se importa recién al generar el primer PDF
+        from app.services.pdf_generator import PDFTerminoContratoGenerator
         pdf_generator = PDFTerminoContratoGenerator()
 
         # Generar el PDF
@@ -202,16 +195,11 @@ def generate_termino_contrato_pdf(
 
 
 @router.get("/generate-list-contracts")
+@en_pool("exportaciones")
 def generate_list_contracts(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("contrato:listado"))
 ):
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para generar listado de contratos"
-        )
-
     try:
         # Obtener empresa_id del usuario autenticado
         empresa_id = current_user["empresa_id"]
@@ -229,7 +217,10 @@ def generate_list_contracts(
                 detail="No se encontraron contratos para esta empresa"
             )
 
-        # Crear el archivo Excel
+        # Crear el archivo Excel (openpyxl se importa recién aquí)
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, PatternFill
+
         wb = Workbook()
         ws = wb.active
         ws.title = "Listado de Contratos"
@@ -306,7 +297,8 @@ def generate_list_contracts(
         os.makedirs(excel_dir, exist_ok=True)
         filename = f"listado_contratos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         filepath = os.path.join(excel_dir, filename)
-        wb.save(filepath)
+        with tracing.span("excel.save", filas=len(contratos)):
+            wb.save(filepath)
 
         # Devolver el archivo Excel
         return FileResponse(
@@ -7,58 +7,41 @@ import os
 from app.database import get_db
 from app.models.generated import Epp, Empresa, Trabajador, DatosTrabajador, Cargo
 from app.schemas.epp import EppCreate, EppResponse
+from app.schemas.pagination import Pagina
 from app.schemas.pdf_epp import PDFEppRequest, PDFEppResponse
-from app.services.pdf_generator import PDFEppGenerator
-from app.services.dependencies import get_current_user
+from app.services.bulkheads import en_pool
+from app.services.fast_json import model_response
+from app.services.pagination import PageParams, page_params, paginate
+from app.services.permissions import require_permission
 
 router = APIRouter(prefix="/epp", tags=["EPP"])
 
 
-@router.get("/list", response_model=list[EppResponse])
+@router.get("/list", response_model=Pagina[EppResponse])
 def list_epp(
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("epp:listar"))
 ):
-    # Verificar que el usuario tenga rol 1 (admin) o 2 (contador)
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para listar EPP"
-        )
-
     # Obtener empresa_id de la sesión del usuario
     empresa_id = current_user["empresa_id"]
 
-    # Obtener todos los EPP de la empresa
-    epps = db.query(Epp).filter(Epp.id_empresa == empresa_id).all()
-
-    return epps
+    # EPP de la empresa, paginados por id
+    return model_response(
+        Pagina[EppResponse], paginate(db.query(Epp).filter(Epp.id_empresa == empresa_id), Epp.id_epp, page)
+    )
 
 
 @router.post("/create", response_model=EppResponse, status_code=status.HTTP_201_CREATED)
 def create_epp(
     epp_data: EppCreate,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("epp:crear"))
 ):
-    # Verificar que el usuario tenga rol 1 (admin) o 2 (contador)
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para crear EPP"
-        )
-
     # Obtener empresa_id de la sesión del usuario
+    # (si la empresa no existe lo detecta la FK fk_epp_empresa, ver IntegrityError)
     empresa_id = current_user["empresa_id"]
 
-    # Verificar que la empresa existe
-    empresa = db.query(Empresa).filter(Empresa.id_empresa == empresa_id).first()
-    if not empresa:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="La empresa especificada no existe"
-        )
-
     try:
         new_epp = Epp(
             id_empresa=empresa_id,
@@ -97,18 +80,12 @@ def create_epp(
 
 
 @router.post("/generate-pdf")
+@en_pool("documentos")
 def generate_epp_pdf(
     pdf_data: PDFEppRequest,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("epp:pdf"))
 ):
-    # Verificar que el usuario tenga rol 1 (admin) o 2 (contador)
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para generar PDF de EPP"
-        )
-
     try:
         # Obtener empresa_id del usuario autenticado
         empresa_id = current_user["empresa_id"]
@@ -204,6 +181,8 @@ def generate_epp_pdf(
         ]
 
         # Crear instancia del generador de PDF
+        # ReportLab se importa recién al generar el primer PDF
+        from app.services.pdf_generator import PDFEppGenerator
         pdf_generator = PDFEppGenerator()
 
         # Generar el PDF
@@ -0,0 +1,36 @@
+import os
+import secrets
+
+from dotenv import load_dotenv
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.services import metrics
+
+load_dotenv()
+
+# Token que usa Prometheus para leer /metrics; sin él el endpoint no se expone
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter(tags=["Métricas"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics(authorization: str | None = Header(None)):
+    """
+    Métricas en formato de texto de Prometheus, sumadas entre workers si está
+    definido METRICS_MULTIPROC_DIR. Requiere `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not authorization or not secrets.compare_digest(authorization, f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas inválido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return PlainTextResponse(
+        metrics.render_prometheus(metrics.collect()),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,18 +1,39 @@
-from fastapi import APIRouter, Depends
+import hashlib
+
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.generated import Nacionalidad
 from app.schemas.nacionalidad import NacionalidadResponse
-from app.services.dependencies import get_current_user
+from app.schemas.pagination import Pagina
+from app.services.catalog_cache import CATALOG_HTTP_MAX_AGE_SECONDS, cache as catalogos
+from app.services.empresa_cache import etag_matches
+from app.services.fast_json import dumps
+from app.services.pagination import PageParams, decode_cursor, page_params, page_result
+from app.services.permissions import require_permission
 
 router = APIRouter(prefix="/nacionalidad", tags=["Nacionalidad"])
 
 
-@router.get("/list", response_model=list[NacionalidadResponse])
+@router.get("/list", response_model=Pagina[NacionalidadResponse])
 def list_nacionalidades(
+    request: Request,
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("catalogos:ver"))
 ):
-    nacionalidades = db.query(Nacionalidad).all()
-    return nacionalidades
+    # Se sirve desde el cache de catálogos; el ETag depende de la versión del
+    # catálogo y de la página pedida
+    catalogo = catalogos.get("nacionalidad", db)
+    etag = '"' + hashlib.sha256(f"{catalogo.etag}|{page.limit}|{page.cursor}".encode()).hexdigest() + '"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={CATALOG_HTTP_MAX_AGE_SECONDS}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    after = decode_cursor(page.cursor, int)
+    rows = catalogo.page(after[0] if after else None, page.limit + 1)
+    pagina = page_result(rows, page.limit, lambda row: (row["id_nacionalidad"],))
+    return Response(content=dumps(pagina), media_type="application/json", headers=headers)
@@ -7,24 +7,22 @@ import os
 from app.database import get_db
 from app.models.generated import Odi, Empresa
 from app.schemas.odi import OdiCreate, OdiResponse 
+from app.schemas.pagination import Pagina
 from app.schemas.pdf_odi import PDFOdiRequest, PDFOdiResponse
-from app.services.pdf_generator import PDFOdiGenerator
-from app.services.dependencies import get_current_user
+from app.services.bulkheads import en_pool
+from app.services.fast_json import model_response
+from app.services.pagination import PageParams, page_params, paginate
+from app.services.permissions import require_permission
 
 router = APIRouter(prefix="/odi", tags=["ODI"])
 
 
 @router.post("/create", response_model=OdiResponse, status_code=status.HTTP_201_CREATED)
-def create_odi(odi_data: OdiCreate, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permiso para crear ODI"
-        )
+def create_odi(odi_data: OdiCreate, db: Session = Depends(get_db), current_user: dict = Depends(require_permission("odi:crear"))):
 
     try:
         new_odi = Odi(
+            id_empresa=current_user["empresa_id"],
             tarea=odi_data.tarea,
             riesgo=odi_data.riesgo,
             consecuencias=odi_data.consecuencias,
@@ -52,13 +50,9 @@ def create_odi(odi_data: OdiCreate, db: Session = Depends(get_db), current_user:
 
 
 @router.post("/generate-pdf")
-def generate_odi_pdf(pdf_data: PDFOdiRequest, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+@en_pool("documentos")
+def generate_odi_pdf(pdf_data: PDFOdiRequest, db: Session = Depends(get_db), current_user: dict = Depends(require_permission("odi:pdf"))):
 
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permiso para crear ODI"
-        )
     try:
         # Obtener empresa_id del usuario autenticado
         empresa_id = current_user["empresa_id"]
@@ -107,6 +101,8 @@ def generate_odi_pdf(pdf_data: PDFOdiRequest, db: Session = Depends(get_db), cur
         pdf_generator_data.elementos = [OdiRow(tarea=e.tarea, riesgo=e.riesgo, consecuencias=e.consecuencias, precaucion=e.precaucion) for e in elementos]
 
         # Crear instancia del generador de PDF
+        # ReportLab se importa recién al generar el primer PDF
+        from app.services.pdf_generator import PDFOdiGenerator
         pdf_generator = PDFOdiGenerator()
 
         # Generar el PDF
@@ -132,30 +128,20 @@ def generate_odi_pdf(pdf_data: PDFOdiRequest, db: Session = Depends(get_db), cur
             detail=f"Error al generar el PDF: {str(e)}"
         )
 
-@router.get("/list", response_model=list[OdiResponse])
+@router.get("/list", response_model=Pagina[OdiResponse])
 def list_odi(
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("odi:listar"))
 ):
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permiso para listar ODI"
-        )
-    
     empresa_id = current_user["empresa_id"]
-    odis = db.query(Odi).filter(Odi.id_empresa == empresa_id).all()
-    return odis
+    return model_response(
+        Pagina[OdiResponse], paginate(db.query(Odi).filter(Odi.id_empresa == empresa_id), Odi.id_odi, page)
+    )
 
 @router.delete("/delete/{id_odi}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_odi(id_odi: int, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
+def delete_odi(id_odi: int, db: Session = Depends(get_db), current_user: dict = Depends(require_permission("odi:eliminar"))):
 
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permiso para listar ODI"
-        )
- 
     empresa_id = current_user["empresa_id"]
 
     odi = db.query(Odi).filter(Odi.id_odi == id_odi, Odi.id_empresa == empresa_id).first()
@@ -0,0 +1,27 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from app.services.permissions import require_permission
+from app.services.profiling import PROFILE_DIR, PROFILE_ID_RE
+
+router = APIRouter(prefix="/perfiles", tags=["Perfilado"])
+
+
+@router.get("/{perfil_id}", include_in_schema=False)
+def descargar_perfil(
+    perfil_id: str,
+    formato: str = Query("json", pattern="^(json|folded)$"),
+    current_user: dict = Depends(require_permission("perfilado:usar")),
+):
+    """
+    Perfil guardado por un request con `X-Profile: 1` (id del header `X-Profile-Id`).
+    `json` es el resumen; `folded` son las pilas colapsadas para flamegraph.pl o speedscope.
+    """
+    ruta = os.path.join(PROFILE_DIR, f"{perfil_id}.{formato}")
+    if not PROFILE_ID_RE.match(perfil_id) or not os.path.exists(ruta):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+
+    media_type = "application/json" if formato == "json" else "text/plain; charset=utf-8"
+    return FileResponse(ruta, media_type=media_type, filename=os.path.basename(ruta))
@@ -1,14 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, selectinload, noload
+from typing import Optional
 from app.database import get_db
 from app.models.generated import Empresa, EmpresaSocio, EmpresaSeguridad, EmpresaTipo, Usuario
 from app.schemas.register_company import EmpresaUpdateRequest, EmpresaFullResponse
-from app.services.dependencies import get_current_user
+from app.services.permissions import require_permission
+from app.services import empresa_cache
 router = APIRouter(prefix="/empresa", tags=["empresa"])
 
+# Relaciones escalares (uno a uno / muchos a uno) van en el mismo SELECT con joinedload.
+# Las colecciones (uno a muchos) van con selectinload: una consulta "WHERE fk IN (...)"
+# por colección, así el resultado no es el producto cartesiano socios × pagos ×
+# representantes × usuarios × logins que antes había que deduplicar en el ORM.
+# Total: 1 consulta principal + 5 (socios, pagos, representantes, usuarios, logins).
+# Agrupadas por relación de primer nivel para poder cargar solo las pedidas en ?include=
+EMPRESA_RELATIONS = {
+    "territorial": (
+        joinedload(Empresa.territorial),
+    ),
+    "empresa_parametros": (
+        joinedload(Empresa.empresa_parametros),
+    ),
+    "empresa_seguridad": (
+        joinedload(Empresa.empresa_seguridad).joinedload(EmpresaSeguridad.caja_compensaciones),
+        joinedload(Empresa.empresa_seguridad).joinedload(EmpresaSeguridad.mutual_seguridad),
+    ),
+    "empresa_tipo": (
+        joinedload(Empresa.empresa_tipo).joinedload(EmpresaTipo.regimen_tributario),
+        joinedload(Empresa.empresa_tipo).joinedload(EmpresaTipo.tipo_actividad),
+        joinedload(Empresa.empresa_tipo).joinedload(EmpresaTipo.tipo_sociedad),
+    ),
+    "empresa_socio": (
+        selectinload(Empresa.empresa_socio).selectinload(EmpresaSocio.pago_acciones),
+    ),
+    "empresa_representante": (
+        selectinload(Empresa.empresa_representante),
+    ),
+    "usuario": (
+        selectinload(Empresa.usuario).joinedload(Usuario.territorial),
+        selectinload(Empresa.usuario).selectinload(Usuario.login_usuario),
+    ),
+}
+EMPRESA_FULL_OPTIONS = tuple(opt for opts in EMPRESA_RELATIONS.values() for opt in opts)
+
+# Campos propios de la empresa, siempre incluidos en la respuesta
+EMPRESA_HEADER_FIELDS = frozenset(EmpresaFullResponse.model_fields) - EMPRESA_RELATIONS.keys()
+
+
+def _parse_include(include: Optional[str]) -> frozenset[str]:
+    if include is None:
+        return frozenset(EMPRESA_RELATIONS)
+    requested = frozenset(name.strip() for name in include.split(",") if name.strip())
+    unknown = requested - EMPRESA_RELATIONS.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Relaciones desconocidas en include: {', '.join(sorted(unknown))}. "
+                   f"Válidas: {', '.join(EMPRESA_RELATIONS)}"
+        )
+    return requested
+
+
+def _loader_options(relations: frozenset[str]) -> list:
+    options = []
+    for name, opts in EMPRESA_RELATIONS.items():
+        if name in relations:
+            options.extend(opts)
+        else:
+            # Sin noload, la serialización dispararía un lazy load por cada relación omitida
+            options.append(noload(getattr(Empresa, name)))
+    return options
+
 @router.put("/{empresa_id}")
-def actualizar_empresa(empresa_id: int, data: EmpresaUpdateRequest, db: Session = Depends(get_db)):
+def actualizar_empresa(
+    empresa_id: int,
+    data: EmpresaUpdateRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_permission("empresa:editar"))   # valida que empresa_id sea la del token
+    ):
     empresa = db.query(Empresa).filter(Empresa.id_empresa == empresa_id).first()
     if not empresa:
         raise HTTPException(status_code=404, detail="Empresa no encontrada")
@@ -35,31 +105,45 @@ def actualizar_empresa(empresa_id: int, data: EmpresaUpdateRequest, db: Session
 
 @router.get("/full", response_model=EmpresaFullResponse)
 def obtener_empresa(
+    request: Request,
+    include: Optional[str] = Query(
+        None,
+        description="Relaciones a incluir separadas por coma (ej: empresa_seguridad,usuario). "
+                    "Sin este parámetro se incluyen todas; los datos propios de la empresa siempre van."
+    ),
     db: Session = Depends(get_db),
-    user=Depends(get_current_user)   # 👈 empresa_id viene del token
+    user=Depends(require_permission("empresa:ver"))   # 👈 empresa_id viene del token
     ):
-    empresa = (
-        db.query(Empresa)
-        .options(
-            joinedload(Empresa.territorial),
-            joinedload(Empresa.empresa_socio),
-            joinedload(Empresa.empresa_socio).joinedload(EmpresaSocio.pago_acciones),
-            joinedload(Empresa.empresa_parametros),
-            joinedload(Empresa.empresa_representante),
-            joinedload(Empresa.empresa_seguridad),
-            joinedload(Empresa.empresa_seguridad).joinedload(EmpresaSeguridad.caja_compensaciones),
-            joinedload(Empresa.empresa_seguridad).joinedload(EmpresaSeguridad.mutual_seguridad),
-            joinedload(Empresa.empresa_tipo),
-            joinedload(Empresa.empresa_tipo).joinedload(EmpresaTipo.regimen_tributario),
-            joinedload(Empresa.empresa_tipo).joinedload(EmpresaTipo.tipo_actividad),
-            joinedload(Empresa.empresa_tipo).joinedload(EmpresaTipo.tipo_sociedad),
-            joinedload(Empresa.usuario),
-            joinedload(Empresa.usuario).joinedload(Usuario.territorial),
-            joinedload(Empresa.usuario).joinedload(Usuario.login_usuario),
+    """
+    Perfil completo de la empresa. La respuesta serializada se cachea por
+    empresa con un ETag; si el cliente envía If-None-Match vigente se responde
+    304 sin consultar la DB. Cualquier escritura sobre las tablas de la empresa
+    invalida la entrada (ver app/services/empresa_cache.py).
+
+    Con ?include= solo se cargan y serializan las relaciones pedidas.
+    """
+    empresa_id = user["empresa_id"]
+    relations = _parse_include(include)
+    variant = ",".join(sorted(relations))
+
+    cached = empresa_cache.cache.get(empresa_id, variant)
+    if cached is None:
+        generation = empresa_cache.cache.generation(empresa_id)
+        empresa = (
+            db.query(Empresa)
+            .options(*_loader_options(relations))
+            .filter(Empresa.id_empresa == empresa_id)
+            .first()
         )
-        .filter(Empresa.id_empresa == user["empresa_id"])
-        .first()
-    )
-    if not empresa:
-        raise HTTPException(status_code=404, detail="Empresa no encontrada")
-    return empresa
\ No newline at end of file
+        if not empresa:
+            raise HTTPException(status_code=404, detail="Empresa no encontrada")
+        body = EmpresaFullResponse.model_validate(empresa).model_dump_json(
+            include=EMPRESA_HEADER_FIELDS | relations
+        ).encode()
+        cached = empresa_cache.cache.put(empresa_id, body, generation, variant)
+
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if empresa_cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
\ No newline at end of file
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas.territorial import TerritorialResponse
+from app.services.catalog_cache import CATALOG_HTTP_MAX_AGE_SECONDS, cache as catalogos
+from app.services.permissions import require_permission
+
+router = APIRouter(prefix="/territorial", tags=["Territorial"])
+
+
+@router.get("/comunas", response_model=list[TerritorialResponse])
+def autocomplete_comunas(
+    response: Response,
+    prefix: str = Query(..., min_length=1, max_length=100, description="Inicio del nombre de la comuna"),
+    region: Optional[str] = Query(None, description="Restringe a una región"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_permission("catalogos:ver"))
+):
+    """
+    Autocompletado de comunas por prefijo, sin distinguir mayúsculas ni tildes
+    ("nun" encuentra "Ñuñoa"). Se resuelve en memoria desde el cache de catálogos.
+    """
+    filtros = {"region": region} if region else {}
+    response.headers["Cache-Control"] = f"private, max-age={CATALOG_HTTP_MAX_AGE_SECONDS}"
+    return catalogos.get("territorial", db).startswith("comuna", prefix, limit, **filtros)
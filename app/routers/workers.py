@@ -1,115 +1,173 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from typing import Optional, List
-
-from app.database import get_db
-from app.models.generated import DatosTrabajador, Trabajador, Cargo, Territorial, Salud,Afp
-from app.services.dependencies import get_current_user
-from app.schemas.workers import TrabajadorCreate, TrabajadorResponse
+from sqlalchemy import Integer, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from types import SimpleNamespace
+from typing import Literal, Optional, List
+
+from app.database import engine, get_db
+from app.models.generated import DatosTrabajador, Trabajador, Cargo
+from app.services import bulkheads, worker_export, worker_import, worker_search
+from app.services.catalog_cache import cache as catalogos
+from app.services.fast_json import model_response
+from app.services.pagination import PageParams, decode_cursor, page_params, page_result
+from app.services.permissions import require_permission
+from app.services.rut_validation import calcular_dvs, separar_rut, validar_ruts
+from app.schemas.workers import (
+    BuscarPorRutsRequest,
+    BuscarPorRutsResponse,
+    ImportTrabajadoresResponse,
+    TrabajadorBusquedaItem,
+    TrabajadorCreate,
+    TrabajadorDetalle,
+    TrabajadorResponse,
+)
+from app.schemas.pagination import Pagina
 
 router = APIRouter(prefix="/trabajadores", tags=["Trabajadores"])
 
+# Máximo de RUT por consulta en /by-ruts
+MAX_RUTS_POR_CONSULTA = 5000
+
+
+def _trabajador_dict(datos, cargo, afp: dict | None, salud: dict | None) -> dict:
+    """
+    Formato común de las búsquedas. `datos` y `cargo` pueden ser objetos ORM o
+    filas con los mismos nombres de columna; `afp` y `salud` son filas del
+    cache de catálogos.
+    """
+    return {
+        "id_trabajador": datos.id_trabajador,
+        "nombre": datos.nombre,
+        "apellido_paterno": datos.apellido_paterno,
+        "apellido_materno": datos.apellido_materno,
+        "rut": f"{datos.rut}-{datos.DV_rut}",
+        "fecha_nacimiento": datos.fecha_nacimiento,
+        "nacionalidad": datos.nacionalidad,
+        "direccion_real": datos.direccion_real,
+        "cargo": {
+            "id_cargo": cargo.id_cargo,
+            "nombre": cargo.nombre
+        } if cargo else None,
+        "afp": {
+            "id_afp": afp["id_afp"],
+            "nombre": afp["nombre"]
+        } if afp else None,
+        "salud": {
+            "id_salud": salud["id_salud"],
+            "nombre": salud["nombre"]
+        } if salud else None
+    }
+
+
+def _select_trabajadores(empresa_id: int):
+    """datos_trabajador de la empresa con los ids de afp/salud y el cargo (LEFT JOIN)."""
+    datos, trabajador, cargo = DatosTrabajador.__table__, Trabajador.__table__, Cargo.__table__
+    return (
+        select(
+            datos,
+            trabajador.c.id_afp,
+            trabajador.c.id_salud,
+            cargo.c.id_cargo,
+            cargo.c.nombre.label("cargo_nombre"),
+        )
+        .join_from(datos, trabajador, trabajador.c.id_trabajador == datos.c.id_trabajador)
+        .outerjoin(cargo, cargo.c.id_cargo == trabajador.c.id_cargo)
+        .where(trabajador.c.id_empresa == empresa_id)
+    )
+
+
+def _filas_a_dicts(rows, db: Session) -> list[dict]:
+    afps = catalogos.get("afp", db)
+    saludes = catalogos.get("salud", db)
+    return [
+        _trabajador_dict(
+            r,
+            SimpleNamespace(id_cargo=r.id_cargo, nombre=r.cargo_nombre) if r.id_cargo else None,
+            afps.get(r.id_afp),
+            saludes.get(r.id_salud),
+        )
+        for r in rows
+    ]
+
 
-@router.get("/search")
+@router.get("/search", response_model=Pagina[TrabajadorDetalle])
 def search_trabajadores(
     nombre: Optional[str] = Query(None, description="Nombre del trabajador"),
     apellido_paterno: Optional[str] = Query(None, description="Apellido paterno del trabajador"),
     apellido_materno: Optional[str] = Query(None, description="Apellido materno del trabajador"),
     cargo: Optional[str] = Query(None, description="Nombre del cargo"),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("trabajadores:buscar"))
 ):
     """
     Busca trabajadores por nombre, apellidos y/o cargo.
-    Puede recibir 1, 2, 3 o los 4 parametros.
+    Puede recibir 1, 2, 3 o los 4 parametros. Paginado por id_trabajador.
     """
-    # Verificar que el usuario tenga rol 1 (admin) o 2 (contador)
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para buscar trabajadores"
-        )
-
-    # Obtener empresa_id del usuario autenticado
-    empresa_id = current_user["empresa_id"]
-
-    # Buscar trabajadores con ORM
-    trabajadores_query = db.execute(
-        select(Trabajador).where(
-            Trabajador.id_empresa == empresa_id
-        )
-    ).scalars().all()
-
-    trabajadores = []
-    for t in trabajadores_query:
-        datos = db.query(DatosTrabajador).filter(
-            DatosTrabajador.id_trabajador == t.id_trabajador
-        ).first()
-
-        if datos:
-            # Aplicar filtros opcionales
-            if nombre and nombre.lower() not in datos.nombre.lower():
-                continue
-            if apellido_paterno and apellido_paterno.lower() not in datos.apellido_paterno.lower():
-                continue
-            if apellido_materno and apellido_materno.lower() not in datos.apellido_materno.lower():
-                continue
-
-            cargo_obj = db.query(Cargo).filter(Cargo.id_cargo == t.id_cargo).first() if t.id_cargo else None
-
-            # Filtro de cargo
-            if cargo and (not cargo_obj or cargo.lower() not in cargo_obj.nombre.lower()):
-                continue
-
-            afp = db.query(Afp).filter(Afp.id_afp == t.id_afp).first() if t.id_afp else None
-            salud = db.query(Salud).filter(Salud.id_salud == t.id_salud).first() if t.id_salud else None
-
-            trabajadores.append({
-                "id_trabajador": datos.id_trabajador,
-                "nombre": datos.nombre,
-                "apellido_paterno": datos.apellido_paterno,
-                "apellido_materno": datos.apellido_materno,
-                "rut": f"{datos.rut}-{datos.DV_rut}",
-                "fecha_nacimiento": datos.fecha_nacimiento,
-                "nacionalidad": datos.nacionalidad,
-                "direccion_real": datos.direccion_real,
-                "cargo": {
-                    "id_cargo": cargo_obj.id_cargo,
-                    "nombre": cargo_obj.nombre
-                } if cargo_obj else None,
-                "afp": {
-                    "id_afp": afp.id_afp,
-                    "nombre": afp.nombre
-                } if afp else None,
-                "salud": {
-                    "id_salud": salud.id_salud,
-                    "nombre": salud.nombre
-                } if salud else None
-            })
-
-    return {
-        "total": len(trabajadores),
-        "trabajadores": trabajadores
-    }
+    datos, cargo_t = DatosTrabajador.__table__, Cargo.__table__
+    query = _select_trabajadores(current_user["empresa_id"])
+
+    # Filtros opcionales (contiene, sin distinguir mayúsculas)
+    if nombre:
+        query = query.where(datos.c.nombre.icontains(nombre, autoescape=True))
+    if apellido_paterno:
+        query = query.where(datos.c.apellido_paterno.icontains(apellido_paterno, autoescape=True))
+    if apellido_materno:
+        query = query.where(datos.c.apellido_materno.icontains(apellido_materno, autoescape=True))
+    if cargo:
+        query = query.where(cargo_t.c.nombre.icontains(cargo, autoescape=True))
+
+    after = decode_cursor(page.cursor, int)
+    if after is not None:
+        query = query.where(datos.c.id_trabajador > after[0])
+    rows = db.execute(query.order_by(datos.c.id_trabajador).limit(page.limit + 1)).all()
+
+    pagina = page_result(rows, page.limit, lambda r: (r.id_trabajador,))
+    pagina["items"] = _filas_a_dicts(pagina["items"], db)
+    return model_response(Pagina[TrabajadorDetalle], pagina)
+
+
+@router.get("/buscar", response_model=Pagina[TrabajadorBusquedaItem])
+def buscar_trabajadores(
+    q: str = Query(..., min_length=2, max_length=120, description="Nombre y/o apellidos, ej: juan perez"),
+    page: PageParams = Depends(page_params),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_permission("trabajadores:buscar"))
+):
+    """
+    Búsqueda difusa por nombre completo, sin distinguir mayúsculas ni tildes,
+    ordenada por relevancia. Usa el índice trigram de `worker_search`.
+    """
+    after = decode_cursor(page.cursor, (int, float), int)
+    rows = worker_search.search(db, current_user["empresa_id"], q, page.limit + 1, after)
+
+    pagina = page_result(rows, page.limit, lambda r: (r.score, r.id_trabajador))
+    pagina["items"] = [
+        {
+            "id_trabajador": r.id_trabajador,
+            "nombre": r.nombre,
+            "apellido_paterno": r.apellido_paterno,
+            "apellido_materno": r.apellido_materno,
+            "rut": f"{r.rut}-{r.DV_rut}",
+            "cargo": r.cargo,
+            "score": r.score,
+        }
+        for r in pagina["items"]
+    ]
+    return model_response(Pagina[TrabajadorBusquedaItem], pagina)
 
 
 @router.get("/search-by-rut")
 def search_trabajadores_by_rut(
     rut: str = Query(..., description="RUT del trabajador (sin digito verificador)"),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("trabajadores:buscar"))
 ):
     """
     Busca un trabajador por RUT.
     """
-    # Verificar que el usuario tenga rol 1 (admin) o 2 (contador)
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permisos para buscar trabajadores"
-        )
-
     # Obtener empresa_id del usuario autenticado
     empresa_id = current_user["empresa_id"]
 
@@ -137,46 +195,117 @@ def search_trabajadores_by_rut(
 
         if datos:
             cargo = db.query(Cargo).filter(Cargo.id_cargo == t.id_cargo).first() if t.id_cargo else None
-            afp = db.query(Afp).filter(Afp.id_afp == t.id_afp).first() if t.id_afp else None
-            salud = db.query(Salud).filter(Salud.id_salud == t.id_salud).first() if t.id_salud else None
-
-            trabajadores.append({
-                "id_trabajador": datos.id_trabajador,
-                "nombre": datos.nombre,
-                "apellido_paterno": datos.apellido_paterno,
-                "apellido_materno": datos.apellido_materno,
-                "rut": f"{datos.rut}-{datos.DV_rut}",
-                "fecha_nacimiento": datos.fecha_nacimiento,
-                "nacionalidad": datos.nacionalidad,
-                "direccion_real": datos.direccion_real,
-                "cargo": {
-                    "id_cargo": cargo.id_cargo,
-                    "nombre": cargo.nombre
-                } if cargo else None,
-                "afp": {
-                    "id_afp": afp.id_afp,
-                    "nombre": afp.nombre
-                } if afp else None,
-                "salud": {
-                    "id_salud": salud.id_salud,
-                    "nombre": salud.nombre
-                } if salud else None
-            })
+
+            trabajadores.append(_trabajador_dict(
+                datos,
+                cargo,
+                catalogos.get("afp", db).get(t.id_afp),
+                catalogos.get("salud", db).get(t.id_salud),
+            ))
 
     return {
         "total": len(trabajadores),
         "trabajadores": trabajadores
     }
 
+@router.post("/by-ruts", response_model=BuscarPorRutsResponse)
+def search_trabajadores_by_ruts(
+    body: BuscarPorRutsRequest,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_permission("trabajadores:buscar"))
+):
+    """
+    Resuelve muchos RUT en una sola consulta. Acepta RUT con DV separado por
+    guión o sin DV ("12.345.678-5" o "12345678"); los que no corresponden a un trabajador de
+    la empresa, o no son RUT válidos (formato o DV incorrecto), vuelven en `no_encontrados`.
+    """
+    if len(body.ruts) > MAX_RUTS_POR_CONSULTA:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {MAX_RUTS_POR_CONSULTA} RUT por consulta"
+        )
+
+    # Con DV ("12.345.678-5") se valida el DV; sin DV ("12345678") se calcula.
+    # Ambos quedan como (número, DV) y el resto va directo a no_encontrados.
+    con_dv, sin_dv, no_encontrados = [], [], []
+    for rut in body.ruts:
+        limpio = rut.replace(".", "").strip()
+        if limpio.count("-") == 1 and limpio.index("-") == len(limpio) - 2:
+            con_dv.append(rut)
+        elif limpio.isascii() and limpio.isdigit() and len(limpio) in (7, 8):
+            sin_dv.append(rut)
+        else:
+            no_encontrados.append(rut)
+
+    # (número, DV) → texto tal como vino en la consulta
+    pedidos: dict[tuple[int, str], str] = {}
+    for rut, normalizado in zip(con_dv, validar_ruts(con_dv).normalizados):
+        if normalizado is None:
+            no_encontrados.append(rut)
+        else:
+            pedidos.setdefault(normalizado, rut)
+    numeros_sin_dv = [int(rut.replace(".", "").strip()) for rut in sin_dv]
+    for rut, numero, dv in zip(sin_dv, numeros_sin_dv, calcular_dvs(numeros_sin_dv)):
+        pedidos.setdefault((numero, dv), rut)
+
+    datos = DatosTrabajador.__table__
+    rows = db.execute(
+        _select_trabajadores(current_user["empresa_id"])
+        .where(datos.c.rut == any_(bindparam("ruts", list({n for n, _ in pedidos}), type_=ARRAY(Integer))))
+        .order_by(datos.c.rut)
+    ).all()
+    # Mismo número con otro DV no es el mismo RUT
+    rows = [r for r in rows if (r.rut, r.DV_rut.upper()) in pedidos]
+
+    trabajadores = _filas_a_dicts(rows, db)
+    encontrados = {(r.rut, r.DV_rut.upper()) for r in rows}
+    no_encontrados.extend(rut for clave, rut in pedidos.items() if clave not in encontrados)
+
+    return model_response(BuscarPorRutsResponse, {
+        "total": len(trabajadores),
+        "trabajadores": trabajadores,
+        "no_encontrados": no_encontrados,
+    })
+
+
+@router.get("/export")
+def export_trabajadores(
+    formato: Literal["ndjson", "csv"] = Query("ndjson", description="ndjson (una línea JSON por trabajador) o csv"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_permission("trabajadores:exportar"))
+):
+    """
+    Nómina completa de la empresa con cargo, AFP, salud y territorial. Se envía
+    a medida que se lee de la DB, sin armar la respuesta completa en memoria.
+    """
+    empresa_id = current_user["empresa_id"]
+    catalogos_export = (
+        catalogos.get("afp", db),
+        catalogos.get("salud", db),
+        catalogos.get("territorial", db),
+    )
+
+    if formato == "csv":
+        contenido = worker_export.iter_csv(engine, empresa_id, *catalogos_export)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        contenido = worker_export.iter_ndjson(engine, empresa_id, *catalogos_export)
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        # Cada bloque se genera en el pool de exportaciones
+        bulkheads.pools["exportaciones"].streaming(contenido),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="trabajadores_{empresa_id}.{formato}"'},
+    )
+
+
 @router.post("/create_worker", response_model=TrabajadorResponse, status_code=status.HTTP_201_CREATED)
 def create_trabajador(
     trabajador: TrabajadorCreate,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_permission("trabajadores:crear"))
 ):
-    if current_user["rol"] not in [1, 2]:
-        raise HTTPException(status_code=403, detail="No tienes permisos")
-
     empresa_id = current_user["empresa_id"]
 
     # ------------------------
@@ -194,23 +323,21 @@ def create_trabajador(
             raise HTTPException(404, f"Cargo '{trabajador.cargo}' no encontrado")
         id_cargo = cargo.id_cargo
 
-    afp = db.execute(select(Afp).where(Afp.nombre.ilike(trabajador.afp))).scalar_one_or_none()
+    afp = catalogos.get("afp", db).find(nombre=trabajador.afp)
     if not afp:
         raise HTTPException(404, f"AFP '{trabajador.afp}' no encontrada")
 
     id_salud = None
     if trabajador.salud:
-        salud = db.execute(select(Salud).where(Salud.nombre.ilike(trabajador.salud))).scalar_one_or_none()
+        salud = catalogos.get("salud", db).find(nombre=trabajador.salud)
         if not salud:
             raise HTTPException(404, f"Salud '{trabajador.salud}' no encontrada")
-        id_salud = salud.id_salud
+        id_salud = salud["id_salud"]
 
-    territorial = db.execute(
-        select(Territorial).where(
-            Territorial.region.ilike(trabajador.region),
-            Territorial.comuna.ilike(trabajador.comuna)
-        )
-    ).scalar_one_or_none()
+    territorial = catalogos.get("territorial", db).find(
+        region=trabajador.region,
+        comuna=trabajador.comuna
+    )
     if not territorial:
         raise HTTPException(404, f"Territorial '{trabajador.region} - {trabajador.comuna}' no encontrado")
 
@@ -219,8 +346,8 @@ def create_trabajador(
     # ------------------------
     nuevo_trabajador = Trabajador(
         id_empresa=empresa_id,
-        id_afp=afp.id_afp,
-        id_territorial=territorial.id_territorial,
+        id_afp=afp["id_afp"],
+        id_territorial=territorial["id_territorial"],
         id_cargo=id_cargo,
         id_salud=id_salud,
     )
@@ -228,11 +355,7 @@ def create_trabajador(
     db.flush()  # ahora nuevo_trabajador.id_trabajador ya existe
 
     # separar rut y DV (ej: "21402714-3" -> rut_num="21402714", dv="3")
-    rut_limpio = trabajador.rut.replace(".", "").upper()
-    if "-" in rut_limpio:
-        rut_num, dv = rut_limpio.split("-")
-    else:
-        rut_num, dv = rut_limpio[:-1], rut_limpio[-1]
+    rut_num, dv = separar_rut(trabajador.rut)
 
     datos = DatosTrabajador(
         id_trabajador=nuevo_trabajador.id_trabajador,  # FK obligatoria
@@ -251,3 +374,28 @@ def create_trabajador(
     db.refresh(nuevo_trabajador)
 
     return nuevo_trabajador
+
+
+@router.post("/import", response_model=ImportTrabajadoresResponse)
+def import_trabajadores(
+    archivo: UploadFile = File(..., description="Planilla .xlsx o .csv con una fila por trabajador"),
+    dry_run: bool = Query(False, description="Solo validar, sin insertar"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_permission("trabajadores:crear"))
+):
+    """
+    Crea trabajadores en lote. La primera fila es la cabecera, con las mismas
+    columnas que /create_worker (nombre, apellido_paterno, rut, afp, comuna, ...).
+    Las filas válidas se insertan y las demás se informan en `errores`.
+    """
+    try:
+        filas = worker_import.leer_filas(archivo.file, archivo.filename)
+        resultado = worker_import.importar_trabajadores(
+            db, current_user["empresa_id"], filas, dry_run
+        )
+    except worker_import.ImportFileError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not dry_run:
+        db.commit()
+    return resultado
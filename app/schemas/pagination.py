@@ -0,0 +1,12 @@
+from typing import Generic, Optional, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class Pagina(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = Field(
+        None, description="Pasar como `cursor` para pedir la página siguiente; null si no hay más"
+    )
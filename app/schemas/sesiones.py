@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class SesionActivaResponse(BaseModel):
+    id: int
+    id_usuario: int
+    fecha_sesion: datetime
+    limite_sesion: datetime
+    ultima_actividad: Optional[datetime] = None
+    ip: Optional[str] = None
+    user_agent: Optional[str] = None
+    actual: bool = False
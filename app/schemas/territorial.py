@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class TerritorialResponse(BaseModel):
+    id_territorial: int
+    region: str
+    provincia: str
+    comuna: str
+
+    class Config:
+        from_attributes = True
@@ -69,7 +69,8 @@ class DatosTrabajadorBase(BaseModel):
 # ------------------------
 
 
-class TrabajadorCreate(BaseModel):
+class TrabajadorCreateBase(BaseModel):
+    """Campos de alta de un trabajador, sin validar el RUT (ver `worker_import`)."""
     cargo: Optional[str] = Field(None, description="Nombre del cargo")
     afp: str = Field(..., description="Nombre de la AFP")
     salud: Optional[str] = Field(None, description="Nombre de la institución de salud")
@@ -85,6 +86,7 @@ class TrabajadorCreate(BaseModel):
     direccion_real: str
 
 
+class TrabajadorCreate(TrabajadorCreateBase):
     @field_validator("rut")
     @classmethod
     def validar_rut(cls, v):
@@ -127,3 +129,63 @@ class TrabajadorResponse(TrabajadorBase):
 
     class Config:
         from_attributes = True
+
+
+# ------------------------
+# Búsqueda por nombre
+# ------------------------
+
+class TrabajadorBusquedaItem(BaseModel):
+    id_trabajador: int
+    nombre: str
+    apellido_paterno: str
+    apellido_materno: str
+    rut: str
+    cargo: Optional[str] = None
+    score: float
+
+
+
+# ------------------------
+# Importación masiva
+# ------------------------
+
+class ImportErrorFila(BaseModel):
+    fila: int = Field(..., description="Número de fila en el archivo (la cabecera es la fila 1)")
+    rut: Optional[str] = None
+    errores: list[str]
+
+
+class ImportTrabajadoresResponse(BaseModel):
+    total: int
+    importados: int
+    dry_run: bool
+    errores: list[ImportErrorFila]
+
+
+# ------------------------
+# Búsqueda por lote de RUT
+# ------------------------
+
+class BuscarPorRutsRequest(BaseModel):
+    ruts: list[str] = Field(..., min_length=1, description="RUT con DV separado por guión o sin DV, ej: 12.345.678-5 o 12345678")
+
+
+class TrabajadorDetalle(BaseModel):
+    id_trabajador: int
+    nombre: str
+    apellido_paterno: str
+    apellido_materno: str
+    rut: str
+    fecha_nacimiento: date
+    nacionalidad: str
+    direccion_real: str
+    cargo: Optional[dict] = None
+    afp: Optional[dict] = None
+    salud: Optional[dict] = None
+
+
+class BuscarPorRutsResponse(BaseModel):
+    total: int
+    trabajadores: list[TrabajadorDetalle]
+    no_encontrados: list[str]
@@ -1,36 +1,93 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from functools import cache
+from hashlib import sha256
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
-load_dotenv()  # 👈 cargar variables .env
+from app.services.metrics import Counter, Histogram
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+load_dotenv()  # 👈 cargar variables .env
 
 # Configuración JWT desde .env
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS"))
+# Access tokens ya decodificados que se recuerdan (0 = sin cache)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "2048"))
+
+bcrypt_seconds = Histogram(
+    "auth_bcrypt_seconds",
+    "Tiempo de bcrypt por operación",
+    ("op",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+jwt_cache = Counter("jwt_cache_total", "Decodificaciones de access token por resultado del cache", ("result",))
 
 
 # --- Password hashing ---
+# passlib y python-jose se importan en el primer uso y no al levantar la app
+
+@cache
+def _pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    inicio = time.perf_counter()
+    try:
+        return _pwd_context().hash(password)
+    finally:
+        bcrypt_seconds.observe(time.perf_counter() - inicio, op="hash")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    inicio = time.perf_counter()
+    try:
+        return _pwd_context().verify(plain_password, hashed_password)
+    finally:
+        bcrypt_seconds.observe(time.perf_counter() - inicio, op="verify")
+
+def hash_token(token: str) -> str:
+    """Digest que se guarda en la DB en vez del token enviado al usuario."""
+    return sha256(token.encode()).hexdigest()
 
 # --- JWT ---
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+# token → payload; el mismo token llega en cada request de la sesión, así que
+# se evita verificar la firma cada vez. Solo guarda tokens válidos y no expirados.
+_token_cache: OrderedDict[str, dict] = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 def decode_access_token(token: str):
+    with _token_cache_lock:
+        payload = _token_cache.get(token)
+        if payload is not None:
+            if payload.get("exp", 0) > time.time():
+                _token_cache.move_to_end(token)
+                jwt_cache.inc(result="hit")
+                return dict(payload)
+            del _token_cache[token]
+
+    jwt_cache.inc(result="miss")
+    from jose import JWTError, jwt
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+
+    if JWT_CACHE_SIZE > 0:
+        with _token_cache_lock:
+            _token_cache[token] = payload
+            if len(_token_cache) > JWT_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return dict(payload)
@@ -0,0 +1,260 @@
+"""
+Pools de hilos separados (bulkheads) para el trabajo sync pesado.
+
+Los endpoints sync de FastAPI comparten el threadpool por defecto de AnyIO; una
+ráfaga de PDFs o exportaciones, o bcrypt en el login, podía ocupar todos sus
+tokens y dejar a endpoints baratos como `/nacionalidad/list` esperando en la
+cola. Cada pool tiene su propio límite de hilos y de cola:
+
+- documentos: PDFs de EPP, ODI y contratos
+- hash: bcrypt en login y registro
+- exportaciones: Excel de contratos y exportación NDJSON/CSV de trabajadores
+- default: el threadpool de AnyIO, para todo lo demás (solo se ajusta su tamaño)
+
+Un endpoint se asigna a un pool con `@en_pool("documentos")` (debajo del
+decorador del router); para mandar solo una parte, un endpoint sync usa
+`correr_en_pool("hash", func, *args)`. Si el pool tiene todos sus hilos
+ocupados y ya hay BULKHEAD_<POOL>_MAX_QUEUE requests esperando, o la espera
+pasa de BULKHEAD_<POOL>_MAX_WAIT_SECONDS, se responde 503 con Retry-After en
+vez de seguir encolando. Las respuestas en streaming usan `pools[...].streaming()`:
+cada stream ocupa un cupo desde que se admite hasta que termina o el cliente
+se desconecta, con a lo sumo SIZE + MAX_QUEUE streams abiertos por pool.
+
+Métricas: bulkhead_in_use{pool}, bulkhead_queue_depth{pool},
+bulkhead_streams{pool}, bulkhead_rejected_total{pool,reason} y
+bulkhead_wait_seconds{pool}.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+
+import anyio
+import anyio.from_thread
+import anyio.to_thread
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+from app.services.metrics import Counter, Gauge, Histogram
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn")
+
+# pool → (hilos, máximo en cola, espera máxima en segundos)
+POOLS_POR_DEFECTO = {
+    "documentos": (4, 16, 10.0),
+    "hash": (4, 32, 5.0),
+    "exportaciones": (2, 4, 10.0),
+}
+# Tamaño del threadpool por defecto de AnyIO (su valor de fábrica es 40)
+BULKHEAD_DEFAULT_SIZE = int(os.getenv("BULKHEAD_DEFAULT_SIZE", "40"))
+BULKHEAD_RETRY_AFTER_SECONDS = os.getenv("BULKHEAD_RETRY_AFTER_SECONDS", "2")
+
+bulkhead_in_use = Gauge("bulkhead_in_use", "Hilos ocupados por pool", ("pool",))
+bulkhead_queue = Gauge("bulkhead_queue_depth", "Requests esperando un hilo por pool", ("pool",))
+bulkhead_streams = Gauge("bulkhead_streams", "Respuestas en streaming abiertas por pool", ("pool",))
+bulkhead_rejected = Counter(
+    "bulkhead_rejected_total",
+    "Requests rechazados con 503 por pool saturado",
+    ("pool", "reason"),
+)
+bulkhead_wait = Histogram(
+    "bulkhead_wait_seconds",
+    "Espera en la cola del pool antes de obtener un hilo",
+    ("pool",),
+    buckets=(0.001, 0.005, 0.025, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+class Bulkhead:
+    def __init__(self, nombre: str, hilos: int, max_cola: int, max_espera: float):
+        self.nombre = nombre
+        self.max_cola = max_cola
+        self.max_espera = max_espera
+        # Admisión: se toma en el event loop, así la cola son corrutinas y no hilos
+        self.limiter = anyio.CapacityLimiter(hilos)
+        # Hilos del pool: nunca se disputa porque la admisión ya limita a `hilos`
+        self._hilos = anyio.CapacityLimiter(hilos)
+        self.en_cola = 0
+        # Streams abiertos: cada uno pide a lo sumo un bloque a la vez, así que
+        # con este tope nunca hay más de `max_cola` bloques esperando un hilo.
+        # streaming() se llama desde el hilo del endpoint y el cupo se libera en
+        # el event loop, por eso un lock de threading y no un CapacityLimiter.
+        self.max_streams = hilos + max_cola
+        self.streams = 0
+        self._streams_lock = threading.Lock()
+
+    def _rechazar(self, motivo: str):
+        bulkhead_rejected.inc(pool=self.nombre, reason=motivo)
+        logger.warning("Pool %s saturado (%s): %d en uso, %d en cola",
+                       self.nombre, motivo, self.limiter.borrowed_tokens, self.en_cola)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, reintente en unos segundos",
+            headers={"Retry-After": BULKHEAD_RETRY_AFTER_SECONDS},
+        )
+
+    def _publicar(self):
+        bulkhead_in_use.set(self.limiter.borrowed_tokens, pool=self.nombre)
+        bulkhead_queue.set(self.en_cola, pool=self.nombre)
+
+    async def _adquirir(self, rechazar: bool = True):
+        try:
+            self.limiter.acquire_nowait()
+            bulkhead_wait.observe(0.0, pool=self.nombre)
+            return
+        except anyio.WouldBlock:
+            pass
+        if rechazar and self.en_cola >= self.max_cola:
+            self._rechazar("cola_llena")
+
+        self.en_cola += 1
+        self._publicar()
+        inicio = time.perf_counter()
+        try:
+            if rechazar:
+                with anyio.fail_after(self.max_espera):
+                    await self.limiter.acquire()
+            else:
+                await self.limiter.acquire()
+        except TimeoutError:
+            self._rechazar("espera")
+        finally:
+            self.en_cola -= 1
+            bulkhead_wait.observe(time.perf_counter() - inicio, pool=self.nombre)
+
+    async def run(self, func, *args, rechazar: bool = True):
+        """Ejecuta `func(*args)` en un hilo del pool (o 503 si está saturado)."""
+        await self._adquirir(rechazar)
+        self._publicar()
+        try:
+            return await anyio.to_thread.run_sync(func, *args, limiter=self._hilos)
+        finally:
+            self.limiter.release()
+            self._publicar()
+
+    def streaming(self, iterador):
+        """
+        Para StreamingResponse: reserva un cupo de stream ahora, antes de enviar
+        los headers (503 si no queda), y devuelve un iterador async que genera
+        cada bloque en un hilo del pool. Los bloques ya no se rechazan (la
+        respuesta ya empezó): si el pool está lleno esperan su turno. El cupo se
+        libera al terminar, si falla o si el cliente se desconecta.
+        """
+        with self._streams_lock:
+            if self.streams >= self.max_streams:
+                disponible = False
+            else:
+                disponible = True
+                self.streams += 1
+        if not disponible:
+            self._rechazar("streams")
+        bulkhead_streams.set(self.streams, pool=self.nombre)
+        return _Stream(self, iterador)
+
+    def _liberar_stream(self):
+        with self._streams_lock:
+            self.streams -= 1
+        bulkhead_streams.set(self.streams, pool=self.nombre)
+
+
+_FIN = object()
+
+
+class _Stream:
+    """
+    Iterador async de `Bulkhead.streaming()` que devuelve el cupo una sola vez.
+    Es una clase y no un generador porque el `finally` de un generador async
+    que nunca se empezó a iterar (p. ej. el cliente se fue antes de recibir los
+    headers) no corre. StreamingResponse tampoco llama a `aclose()` si la
+    desconexión la cancela fuera de `__anext__`; `__del__` cubre ambos casos
+    al descartarse la respuesta.
+    """
+
+    def __init__(self, pool: Bulkhead, iterador):
+        self._pool = pool
+        self._iterador = iterador
+        self._abierto = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._abierto:
+            raise StopAsyncIteration
+        try:
+            bloque = await self._pool.run(next, self._iterador, _FIN, rechazar=False)
+        except BaseException:
+            # Error del generador o cancelación por desconexión del cliente
+            self._liberar()
+            raise
+        if bloque is _FIN:
+            self._liberar()
+            raise StopAsyncIteration
+        return bloque
+
+    async def aclose(self):
+        self._liberar()
+
+    def _liberar(self):
+        if self._abierto:
+            self._abierto = False
+            self._pool._liberar_stream()
+
+    def __del__(self):
+        self._liberar()
+
+
+def _config(nombre: str, hilos: int, max_cola: int, max_espera: float) -> Bulkhead:
+    prefijo = f"BULKHEAD_{nombre.upper()}_"
+    return Bulkhead(
+        nombre,
+        int(os.getenv(prefijo + "SIZE", str(hilos))),
+        int(os.getenv(prefijo + "MAX_QUEUE", str(max_cola))),
+        float(os.getenv(prefijo + "MAX_WAIT_SECONDS", str(max_espera))),
+    )
+
+
+pools: dict[str, Bulkhead] = {
+    nombre: _config(nombre, *valores) for nombre, valores in POOLS_POR_DEFECTO.items()
+}
+
+
+def en_pool(nombre: str):
+    """
+    Convierte un endpoint sync en uno async que corre su cuerpo en el pool
+    `nombre`. La firma se conserva (functools.wraps), así FastAPI resuelve las
+    dependencias igual que antes; estas siguen corriendo en el pool por defecto.
+    """
+    pool = pools[nombre]
+
+    def decorador(func):
+        @functools.wraps(func)
+        async def endpoint(*args, **kwargs):
+            return await pool.run(functools.partial(func, *args, **kwargs))
+        return endpoint
+
+    return decorador
+
+
+def correr_en_pool(nombre: str, func, *args):
+    """
+    Desde un endpoint sync (hilo del pool por defecto): ejecuta `func(*args)` en
+    el pool `nombre` y espera el resultado. Solo esa llamada cuenta para el
+    pool, no el resto del endpoint (DB, correos, ...).
+    """
+    return anyio.from_thread.run(pools[nombre].run, func, *args)
+
+
+def configurar_default():
+    """Ajusta el tamaño del threadpool por defecto (al iniciar la app)."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = BULKHEAD_DEFAULT_SIZE
+
+
+def publicar_default():
+    """Uso y cola del threadpool por defecto; se muestrea al llegar cada request."""
+    estadisticas = anyio.to_thread.current_default_thread_limiter().statistics()
+    bulkhead_in_use.set(estadisticas.borrowed_tokens, pool="default")
+    bulkhead_queue.set(estadisticas.tasks_waiting, pool="default")
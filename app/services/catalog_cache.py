@@ -0,0 +1,221 @@
+"""
+Cache en memoria de las tablas de catálogo (nacionalidad, afp, salud, ...).
+
+Son tablas chicas que casi nunca cambian, pero se consultaban en cada request
+(`/nacionalidad/list`, resolución de nombres en `create_trabajador`). Cada
+catálogo se carga completo una vez, se guarda como tuplas de dicts (no
+instancias ORM, que quedarían atadas a la sesión que las cargó) junto con su
+JSON ya serializado y un ETag, y se recarga cuando:
+
+- pasa CATALOG_CACHE_TTL_SECONDS desde la última carga (otro worker pudo
+  haberlo modificado), o
+- se hace commit de una escritura ORM sobre el modelo en este proceso.
+
+Las búsquedas por nombre (`Catalog.find`, `Catalog.startswith`) comparan con
+`normalize`, sin mayúsculas ni tildes, sobre índices armados la primera vez que
+se usan; al recargar el catálogo se descartan junto con él.
+
+El cache se precarga al iniciar la app (ver `lifespan` en app/main.py).
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models.generated import (
+    Afp,
+    CajaCompensaciones,
+    MutualSeguridad,
+    Nacionalidad,
+    RegimenTributario,
+    Salud,
+    Territorial,
+    TipoActividad,
+    TipoSociedad,
+)
+from app.services.fast_json import dumps
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn")
+
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "3600"))
+# max-age que se informa al cliente en los endpoints de catálogos
+CATALOG_HTTP_MAX_AGE_SECONDS = int(os.getenv("CATALOG_HTTP_MAX_AGE_SECONDS", "300"))
+
+CATALOGS = {
+    "nacionalidad": Nacionalidad,
+    "afp": Afp,
+    "salud": Salud,
+    "territorial": Territorial,
+    "caja_compensaciones": CajaCompensaciones,
+    "mutual_seguridad": MutualSeguridad,
+    "regimen_tributario": RegimenTributario,
+    "tipo_actividad": TipoActividad,
+    "tipo_sociedad": TipoSociedad,
+}
+
+_NOMBRE_POR_MODELO = {model: nombre for nombre, model in CATALOGS.items()}
+
+
+def normalize(value) -> str:
+    """
+    Clave de comparación sin mayúsculas ni tildes: "Ñuñoa", "ÑUÑOA" y "nunoa"
+    quedan iguales. Equivale a `unaccent(lower(columna))` en Postgres.
+    """
+    texto = unicodedata.normalize("NFKD", str(value).strip())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.casefold().split())
+
+
+@dataclass
+class Catalog:
+    nombre: str
+    rows: tuple[dict, ...]
+    body: bytes
+    etag: str
+    expires: float
+    _by_id: dict = field(default_factory=dict, repr=False)
+    _indexes: dict = field(default_factory=dict, repr=False)
+    _sorted: dict = field(default_factory=dict, repr=False)
+    _ids: list | None = field(default=None, repr=False)
+
+    def get(self, id_):
+        return self._by_id.get(id_)
+
+    def page(self, after_id, limit: int) -> list[dict]:
+        """`limit` filas con id mayor que `after_id` (None = desde el inicio), en orden de id."""
+        if self._ids is None:
+            self._ids = list(self._by_id)
+        inicio = 0 if after_id is None else bisect_right(self._ids, after_id)
+        return [self._by_id[id_] for id_ in self._ids[inicio:inicio + limit]]
+
+    def find(self, **campos) -> dict | None:
+        """
+        Busca la fila cuyas columnas coinciden (sin distinguir mayúsculas ni
+        tildes) con los valores dados, p. ej. `find(region="Maule", comuna="Talca")`.
+        """
+        columnas = tuple(sorted(campos))
+        index = self._indexes.get(columnas)
+        if index is None:
+            index = {}
+            for row in self.rows:
+                # Ante valores repetidos se queda la fila de menor id
+                index.setdefault(tuple(normalize(row[c] or "") for c in columnas), row)
+            self._indexes[columnas] = index
+        return index.get(tuple(normalize(campos[c]) for c in columnas))
+
+    def startswith(self, columna: str, prefijo: str, limit: int = 10, **filtros) -> list[dict]:
+        """
+        Filas cuya `columna` empieza con `prefijo` (sin mayúsculas ni tildes), en
+        orden alfabético. `filtros` restringe por igualdad, como en `find`.
+        """
+        keys_rows = self._sorted.get(columna)
+        if keys_rows is None:
+            keys_rows = sorted((normalize(row[columna] or ""), i) for i, row in enumerate(self.rows))
+            self._sorted[columna] = keys_rows
+
+        prefijo = normalize(prefijo)
+        filtros = {c: normalize(v) for c, v in filtros.items()}
+        resultado = []
+        for key, i in keys_rows[bisect_left(keys_rows, (prefijo, -1)):]:
+            if not key.startswith(prefijo) or len(resultado) >= limit:
+                break
+            row = self.rows[i]
+            if all(normalize(row[c] or "") == v for c, v in filtros.items()):
+                resultado.append(row)
+        return resultado
+
+
+class CatalogCache:
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._catalogs: dict[str, Catalog] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session, nombre: str) -> Catalog:
+        model = CATALOGS[nombre]
+        mapper = inspect(model)
+        pk = mapper.primary_key[0]
+        pk_attr = mapper.get_property_by_column(pk).key
+        columnas = [c.key for c in mapper.column_attrs]
+
+        objetos = db.execute(select(model).order_by(pk)).scalars().all()
+        rows = tuple({c: getattr(obj, c) for c in columnas} for obj in objetos)
+        body = dumps(rows)
+
+        catalog = Catalog(
+            nombre=nombre,
+            rows=rows,
+            body=body,
+            etag='"' + hashlib.sha256(body).hexdigest() + '"',
+            expires=time.monotonic() + self.ttl,
+        )
+        catalog._by_id = {row[pk_attr]: row for row in rows}
+        return catalog
+
+    def get(self, nombre: str, db: Session) -> Catalog:
+        """Catálogo `nombre`; si no está o expiró se carga con la sesión `db`."""
+        catalog = self._catalogs.get(nombre)
+        if catalog is not None and catalog.expires > time.monotonic():
+            return catalog
+        with self._lock:
+            catalog = self._catalogs.get(nombre)
+            if catalog is None or catalog.expires <= time.monotonic():
+                catalog = self._load(db, nombre)
+                self._catalogs[nombre] = catalog
+        return catalog
+
+    def warm(self, session_factory):
+        """Carga todos los catálogos (al iniciar la app)."""
+        db = session_factory()
+        try:
+            for nombre in CATALOGS:
+                self.get(nombre, db)
+        except Exception as e:
+            # Sin DB al arrancar no se bloquea el inicio: se cargan en el primer uso
+            logger.warning("No se pudieron precargar los catálogos: %s", e)
+        finally:
+            db.close()
+
+    def invalidate(self, nombre: str | None = None):
+        with self._lock:
+            if nombre is None:
+                self._catalogs.clear()
+            else:
+                self._catalogs.pop(nombre, None)
+
+
+cache = CatalogCache()
+
+
+# ---------------------------
+# Invalidación al hacer commit
+# ---------------------------
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changed = session.info.setdefault("catalogos_modificados", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        nombre = _NOMBRE_POR_MODELO.get(type(obj))
+        if nombre is not None:
+            changed.add(nombre)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    for nombre in session.info.pop("catalogos_modificados", ()):
+        cache.invalidate(nombre)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop("catalogos_modificados", None)
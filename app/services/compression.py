@@ -0,0 +1,167 @@
+"""
+Compresión de respuestas (brotli o gzip) negociada con Accept-Encoding.
+
+Middleware ASGI puro: comprime a medida que el endpoint envía, así que las
+respuestas en streaming (exportación NDJSON/CSV) se siguen enviando por
+bloques. Solo se comprimen tipos de texto (JSON, NDJSON, CSV, HTML, ...); PDF,
+XLSX e imágenes ya vienen comprimidos y pasan tal cual, igual que las
+respuestas que ya traen Content-Encoding.
+
+- Respuestas completas bajo COMPRESSION_MIN_BYTES no se comprimen: el
+  encabezado de gzip/brotli y el CPU no se pagan por unos pocos bytes.
+- brotli (dependencia del proyecto) se prefiere si el cliente lo acepta; si
+  el paquete no está instalado se ofrece solo gzip.
+- Un ETag fuerte pasa a débil (W/"...") en la respuesta comprimida; el chequeo
+  de If-None-Match de los endpoints ya acepta ambas formas.
+"""
+import os
+import zlib
+
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.services.metrics import Counter
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - entorno sin las dependencias del lock
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+TIPOS_COMPRIMIBLES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+})
+
+compression_bytes = Counter(
+    "http_compression_bytes_total",
+    "Bytes de respuestas comprimidas, antes y después de comprimir",
+    ("encoding", "kind"),
+)
+
+
+def negociar(accept_encoding: str) -> str | None:
+    """"br", "gzip" o None según Accept-Encoding (respeta q=0)."""
+    aceptados = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, params = parte.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        aceptados[nombre.strip()] = q
+    comodin = aceptados.get("*", 0.0)
+    if brotli is not None and aceptados.get("br", comodin) > 0:
+        return "br"
+    if aceptados.get("gzip", comodin) > 0:
+        return "gzip"
+    return None
+
+
+def comprimible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    tipo = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    return (
+        tipo.startswith("text/")
+        or tipo in TIPOS_COMPRIMIBLES
+        or tipo.endswith("+json")
+        or tipo.endswith("+xml")
+    )
+
+
+class _Compresor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY, mode=brotli.MODE_TEXT)
+        else:
+            self._c = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, datos: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            salida = self._c.process(datos)
+            return salida + (self._c.finish() if final else self._c.flush())
+        salida = self._c.compress(datos)
+        # SYNC_FLUSH: el bloque sale al cliente ahora y no cuando se llene el buffer
+        return salida + self._c.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negociar(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compresor = None
+        pasar = False
+
+        async def send_wrapper(message):
+            nonlocal inicio, compresor, pasar
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el primer bloque del cuerpo
+                inicio = message
+                inicio["headers"] = list(message.get("headers", []))
+                pasar = inicio["status"] in (204, 304) or not comprimible(Headers(raw=inicio["headers"]))
+                if pasar:
+                    await send(inicio)
+                return
+
+            if message["type"] != "http.response.body" or pasar:
+                await send(message)
+                return
+
+            cuerpo = message.get("body", b"")
+            hay_mas = message.get("more_body", False)
+
+            if compresor is None:
+                if not hay_mas and len(cuerpo) < self.minimum_size:
+                    pasar = True
+                    await send(inicio)
+                    await send(message)
+                    return
+
+                compresor = _Compresor(encoding)
+                headers = MutableHeaders(raw=inicio["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = "W/" + etag
+                del headers["Content-Length"]
+                if not hay_mas:
+                    comprimido = compresor.comprimir(cuerpo, final=True)
+                    headers["Content-Length"] = str(len(comprimido))
+                    await send(inicio)
+                    await send({"type": "http.response.body", "body": comprimido})
+                    compression_bytes.inc(len(cuerpo), encoding=encoding, kind="original")
+                    compression_bytes.inc(len(comprimido), encoding=encoding, kind="comprimido")
+                    return
+                await send(inicio)
+
+            comprimido = compresor.comprimir(cuerpo, final=not hay_mas)
+            compression_bytes.inc(len(cuerpo), encoding=encoding, kind="original")
+            compression_bytes.inc(len(comprimido), encoding=encoding, kind="comprimido")
+            await send({"type": "http.response.body", "body": comprimido, "more_body": hay_mas})
+
+        await self.app(scope, receive, send_wrapper)
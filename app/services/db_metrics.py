@@ -0,0 +1,46 @@
+"""
+Métricas del pool de conexiones de `app.database.engine`.
+
+- db_pool_checked_out: conexiones entregadas y aún no devueltas.
+- db_pool_checkout_wait_seconds: tiempo que espera un request para obtener
+  una conexión (incluye abrir una nueva si el pool aún no está lleno).
+- db_pool_timeouts_total: esperas que terminaron en TimeoutError.
+"""
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.services import tracing
+from app.services.metrics import Counter, Gauge, Histogram
+
+pool_size = Gauge("db_pool_size", "Tamaño configurado del pool (sin overflow)")
+pool_checked_out = Gauge("db_pool_checked_out", "Conexiones del pool en uso")
+pool_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Espera para obtener una conexión del pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+pool_timeouts = Counter("db_pool_timeouts_total", "Esperas por conexión que agotaron pool_timeout")
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cuánto se espera por cada conexión."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            with tracing.span("db.pool_checkout"):
+                return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_wait.observe(time.perf_counter() - inicio)
+
+
+def instrument(engine):
+    pool_size.set(engine.pool.size())
+    event.listen(engine, "checkout", lambda *args: pool_checked_out.inc())
+    event.listen(engine, "checkin", lambda *args: pool_checked_out.dec())
@@ -1,6 +1,7 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.services import auth
+from app.services.session_activity import tracker as session_tracker
 
 bearer_scheme = HTTPBearer()
 
@@ -27,10 +28,11 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_
         )
 
     try:
-        return {
+        current_user = {
             "usuario_id": int(payload["sub"]),
             "empresa_id": int(payload["empresa_id"]),
-            "rol": int(payload["rol"])
+            "rol": int(payload["rol"]),
+            "sesion_id": int(payload["sid"]) if payload.get("sid") else None
         }
     except (ValueError, TypeError):
         raise HTTPException(
@@ -38,3 +40,13 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_
             detail="Los datos del token no son válidos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Registrar actividad en memoria (se vuelca a la DB en lote)
+    if current_user["sesion_id"] is not None and not session_tracker.touch(current_user["sesion_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sesión revocada o expirada por inactividad",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return current_user
@@ -1,15 +1,25 @@
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 from dotenv import load_dotenv
 
+from app.services import tracing
+from app.services.metrics import Counter, Gauge
+
 load_dotenv()
 
+# No hay cola de envío: el correo se manda dentro del request, así que lo
+# pendiente son los envíos en curso
+emails_in_flight = Gauge("email_envios_en_curso", "Correos enviándose en este momento")
+emails_sent = Counter("email_envios_total", "Correos enviados por resultado", ("result",))
+
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 MAIL_FROM = os.getenv("MAIL_FROM")
 BASE_URL = os.getenv("BASE_URL")
 
 def send_verification_email(to_email: str, token: str):
+    # sendgrid se importa en el primer envío, no al levantar la app
+    from sendgrid import SendGridAPIClient
+    from sendgrid.helpers.mail import Mail
+
     verification_link = f"{BASE_URL}/auth/verify-email/{token}"  # 👈 armamos link dinámico
 
     subject = "Verifica tu cuenta en Mi Contaplus"
@@ -35,11 +45,19 @@ def send_verification_email(to_email: str, token: str):
         html_content=html_body,
     )
 
+    emails_in_flight.inc()
     try:
         sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
+        with tracing.span("email.sendgrid") as span:
+            response = sg.send(message)
+            if span is not None:
+                span.set(status=response.status_code)
         print(f"[SendGrid] Email enviado a {to_email}, status {response.status_code}")
+        emails_sent.inc(result="ok")
         return True
     except Exception as e:
         print(f"[SendGrid] Error: {e}")
+        emails_sent.inc(result="error")
         return False
+    finally:
+        emails_in_flight.dec()
@@ -0,0 +1,164 @@
+"""
+Cache por empresa (y por variante de ?include=) de la respuesta de /empresa/full.
+
+El perfil de la empresa cambia poco pero el frontend lo pide en casi todas las
+pantallas. Se guarda el JSON ya serializado junto con un ETag fuerte (sha256
+del cuerpo), así que una petición con `If-None-Match` vigente se responde con
+304 sin tocar la DB.
+
+Las entradas se invalidan al hacer commit de cualquier escritura ORM sobre las
+tablas que componen la respuesta (ver `_collect_changes`). Como el cache es
+por proceso, cada entrada además expira tras EMPRESA_CACHE_TTL_SECONDS para
+acotar cuánto puede quedar desactualizado otro worker.
+"""
+import hashlib
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.models.generated import (
+    CajaCompensaciones,
+    Empresa,
+    EmpresaParametros,
+    EmpresaRepresentante,
+    EmpresaSeguridad,
+    EmpresaSocio,
+    EmpresaTipo,
+    LoginUsuario,
+    MutualSeguridad,
+    PagoAcciones,
+    RegimenTributario,
+    Territorial,
+    TipoActividad,
+    TipoSociedad,
+    Usuario,
+)
+
+load_dotenv()
+
+EMPRESA_CACHE_TTL_SECONDS = float(os.getenv("EMPRESA_CACHE_TTL_SECONDS", "300"))
+
+# Modelos con columna id_empresa: se invalida solo esa empresa
+_POR_EMPRESA = (Empresa, EmpresaSocio, EmpresaParametros, EmpresaRepresentante,
+                EmpresaSeguridad, EmpresaTipo, Usuario)
+# Modelos sin id_empresa directo: (columna del padre, padre con id_empresa)
+_POR_PADRE = {
+    LoginUsuario: ("id_usuario", Usuario),
+    PagoAcciones: ("id_socio", EmpresaSocio),
+}
+# Catálogos compartidos: se invalida todo
+_GLOBALES = (Territorial, CajaCompensaciones, MutualSeguridad, RegimenTributario,
+             TipoActividad, TipoSociedad)
+
+_TODAS = "*"
+
+
+class EmpresaFullCache:
+    def __init__(self, ttl: float = EMPRESA_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        # empresa_id → variante (relaciones incluidas) → (expira, cuerpo, etag)
+        self._entries: dict[int, dict[str, tuple[float, bytes, str]]] = {}
+        self._generations: dict[int, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+
+    def generation(self, empresa_id: int) -> tuple[int, int]:
+        """Versión actual de la empresa; tomarla antes de consultar la DB."""
+        return self._global_generation, self._generations.get(empresa_id, 0)
+
+    def get(self, empresa_id: int, variant: str = "") -> tuple[bytes, str] | None:
+        entry = self._entries.get(empresa_id, {}).get(variant)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1], entry[2]
+
+    def put(
+        self, empresa_id: int, body: bytes, generation: tuple[int, int], variant: str = ""
+    ) -> tuple[bytes, str]:
+        etag = '"' + hashlib.sha256(body).hexdigest() + '"'
+        with self._lock:
+            # Si hubo una escritura mientras se armaba la respuesta no se guarda
+            if self.generation(empresa_id) == generation:
+                variants = self._entries.setdefault(empresa_id, {})
+                variants[variant] = (time.monotonic() + self.ttl, body, etag)
+        return body, etag
+
+    def invalidate(self, empresa_id: int):
+        with self._lock:
+            self._generations[empresa_id] = self._generations.get(empresa_id, 0) + 1
+            self._entries.pop(empresa_id, None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._global_generation += 1
+            self._entries.clear()
+
+
+cache = EmpresaFullCache()
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+# ---------------------------
+# Invalidación al hacer commit
+# ---------------------------
+
+def _empresas_de_padres(session, padres: dict[type, set[int]]) -> set:
+    """id_empresa de los usuarios/socios tocados (una consulta por modelo)."""
+    empresas = set()
+    for modelo, ids in padres.items():
+        tabla = modelo.__table__
+        pk = tabla.primary_key.columns[0]
+        filas = session.connection().execute(select(pk, tabla.c.id_empresa).where(pk.in_(ids))).all()
+        empresas.update(id_empresa for _, id_empresa in filas)
+        # Padre borrado en el mismo flush: no se sabe la empresa, se invalida todo
+        if len(filas) < len(ids):
+            empresas.add(_TODAS)
+    return empresas
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changed = session.info.setdefault("empresas_modificadas", set())
+    padres: dict[type, set[int]] = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _POR_EMPRESA):
+            changed.add(obj.id_empresa)
+        elif type(obj) in _POR_PADRE:
+            columna, padre = _POR_PADRE[type(obj)]
+            id_padre = getattr(obj, columna)
+            if id_padre is not None:
+                padres.setdefault(padre, set()).add(id_padre)
+        elif isinstance(obj, _GLOBALES):
+            changed.add(_TODAS)
+    if padres:
+        changed.update(_empresas_de_padres(session, padres))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    changed = session.info.pop("empresas_modificadas", None)
+    if not changed:
+        return
+    if _TODAS in changed:
+        cache.invalidate_all()
+        return
+    for empresa_id in changed:
+        if empresa_id is not None:
+            cache.invalidate(empresa_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop("empresas_modificadas", None)
@@ -0,0 +1,104 @@
+"""
+Tiempo de importación de la app (`python -X importtime -c "import app.main"`).
+
+Cada worker de uvicorn y cada reinicio con `--reload` paga este tiempo antes de
+atender el primer request. El reporte muestra el total, los módulos más caros
+y si alguno de LAZY_MODULES (los que se importan recién en el primer uso) se
+coló en el arranque. Sale con código 1 si se pasa del presupuesto
+(STARTUP_IMPORT_BUDGET_MS) o si hay un módulo perezoso importado al arrancar,
+para poder usarlo en CI:
+
+    poetry run python -m app.services.import_time report --top 15
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1500"))
+
+# Se importan dentro de las funciones que los usan (PDF, Excel, correo, JWT,
+# bcrypt, validación de RUT por lotes)
+LAZY_MODULES = ("reportlab", "openpyxl", "sendgrid", "jose", "passlib", "numpy")
+
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def medir(modulo: str = "app.main") -> list[dict]:
+    """Filas de `-X importtime` en un intérprete nuevo: módulo, self_ms, acumulado_ms, nivel."""
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True,
+        text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+
+    filas = []
+    for linea in proceso.stderr.splitlines():
+        m = _LINEA.match(linea)
+        if m:
+            filas.append({
+                "modulo": m.group(4),
+                "self_ms": int(m.group(1)) / 1000,
+                "acumulado_ms": int(m.group(2)) / 1000,
+                "nivel": len(m.group(3)) // 2,
+            })
+    return filas
+
+
+def report(modulo: str = "app.main", top: int = 15, budget_ms: float = STARTUP_IMPORT_BUDGET_MS) -> dict:
+    filas = medir(modulo)
+    total = next(f["acumulado_ms"] for f in filas if f["modulo"] == modulo)
+
+    # Costo por paquete de primer nivel (sqlalchemy, fastapi, pydantic, ...)
+    por_paquete: dict[str, float] = {}
+    for f in filas:
+        paquete = f["modulo"].split(".", 1)[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0.0) + f["self_ms"]
+
+    modulos_app = sorted(
+        (f for f in filas if f["modulo"].startswith("app.") and f["modulo"] != modulo),
+        key=lambda f: -f["acumulado_ms"],
+    )
+    importados = {f["modulo"].split(".", 1)[0] for f in filas}
+    perezosos_en_arranque = [m for m in LAZY_MODULES if m in importados]
+    return {
+        "modulo": modulo,
+        "total_ms": round(total, 1),
+        "presupuesto_ms": budget_ms,
+        "dentro_del_presupuesto": total <= budget_ms,
+        "perezosos_en_arranque": perezosos_en_arranque,
+        "paquetes_ms": {
+            k: round(v, 1) for k, v in sorted(por_paquete.items(), key=lambda kv: -kv[1])[:top]
+        },
+        "modulos_app_ms": {
+            f["modulo"]: round(f["acumulado_ms"], 1) for f in modulos_app[:top]
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importación de la app")
+    sub = parser.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("report", help="Reporte de -X importtime y chequeo del presupuesto")
+    r.add_argument("--modulo", default="app.main")
+    r.add_argument("--top", type=int, default=15)
+    r.add_argument("--budget-ms", type=float, default=STARTUP_IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    if args.command == "report":
+        resultado = report(args.modulo, args.top, args.budget_ms)
+        print(json.dumps(resultado, indent=2, ensure_ascii=False))
+        if not resultado["dentro_del_presupuesto"] or resultado["perezosos_en_arranque"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
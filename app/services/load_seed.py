@@ -0,0 +1,278 @@
+"""
+Datos sintéticos multiempresa para pruebas de carga en una base local.
+
+Crea N empresas con un usuario administrador cada una (correo verificado) y,
+por empresa, M trabajadores con RUT válidos, un contrato por trabajador,
+cargos, EPP, ODI, cláusulas y sesiones (activas, revocadas y expiradas). Los
+datos salen de un generador con semilla, así que dos corridas con los mismos
+parámetros producen la misma base y los resultados de carga se pueden comparar
+entre commits.
+
+Las empresas se marcan con razón social `LOADTEST ...`; `clean` borra solo esas.
+`seed` escribe además un JSON con credenciales e ids de cada empresa que usa
+`app.services.load_test`.
+
+Uso (nunca contra producción):
+    poetry run python -m app.services.load_seed seed --empresas 20 --trabajadores 500
+    poetry run python -m app.services.load_seed clean
+"""
+import argparse
+import json
+import os
+import random
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.models.generated import (
+    Afp,
+    Cargo,
+    Clausulas,
+    Contrato,
+    DatosTrabajador,
+    Empresa,
+    Epp,
+    LoginUsuario,
+    Odi,
+    Salud,
+    Sesiones,
+    Territorial,
+    Trabajador,
+    Usuario,
+)
+from app.services import auth
+from app.services.permissions import ADMIN
+from app.services.rut_validation import calcular_dvs
+
+MARCA = "LOADTEST"
+PASSWORD_POR_DEFECTO = "Carga1234"
+LOTE = 1000
+
+NOMBRES = ("Juan", "María", "José", "Ana", "Pedro", "Camila", "Luis", "Valentina", "Diego", "Francisca",
+           "Carlos", "Javiera", "Jorge", "Constanza", "Matías", "Catalina", "Felipe", "Fernanda")
+APELLIDOS = ("González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez",
+             "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres", "Araya")
+CARGOS = ("Operario", "Supervisor", "Jornal", "Maestro de obra", "Bodeguero", "Administrativo", "Prevencionista")
+NACIONALIDADES = ("Chilena", "Chilena", "Chilena", "Peruana", "Venezolana", "Colombiana", "Haitiana")
+
+
+def _insertar(conn: Connection, tabla, filas: list[dict], columna_id=None) -> list:
+    """INSERT multi-fila por lotes; retorna los ids generados si se pide `columna_id`."""
+    ids = []
+    for inicio in range(0, len(filas), LOTE):
+        lote = filas[inicio:inicio + LOTE]
+        if columna_id is None:
+            conn.execute(insert(tabla), lote)
+        else:
+            ids.extend(conn.execute(
+                insert(tabla).returning(columna_id, sort_by_parameter_order=True), lote
+            ).scalars())
+    return ids
+
+
+def _catalogo(conn: Connection, columna) -> list[int]:
+    ids = list(conn.execute(select(columna)).scalars())
+    if not ids:
+        raise RuntimeError(f"La tabla {columna.table.name} está vacía; cargar los catálogos antes de sembrar")
+    return ids
+
+
+def seed(engine: Engine, empresas: int, trabajadores: int, semilla: int = 42,
+         password: str = PASSWORD_POR_DEFECTO) -> list[dict]:
+    rnd = random.Random(semilla)
+    hash_password = auth.get_password_hash(password)
+    ahora = datetime.now(timezone.utc)
+    t_empresa, t_trabajador, t_datos = Empresa.__table__, Trabajador.__table__, DatosTrabajador.__table__
+
+    with engine.begin() as conn:
+        afps = _catalogo(conn, Afp.__table__.c.id_afp)
+        saludes = _catalogo(conn, Salud.__table__.c.id_salud)
+        territoriales = _catalogo(conn, Territorial.__table__.c.id_territorial)
+
+        # RUT únicos para toda la corrida
+        numeros_rut = rnd.sample(range(5_000_000, 26_000_000), empresas * (trabajadores + 2))
+        dvs = calcular_dvs(numeros_rut)
+        ruts = iter(zip(numeros_rut, dvs))
+
+        # Marca propia de la corrida: los nombres únicos de EPP y ODI son globales
+        corrida = f"{semilla}-{ahora:%Y%m%d%H%M%S}"
+
+        resultado = []
+        for n in range(empresas):
+            rut_empresa, dv_empresa = next(ruts)
+            id_empresa = conn.execute(insert(t_empresa).returning(t_empresa.c.id_empresa), {
+                "id_territorial": rnd.choice(territoriales),
+                "rut_empresa": rut_empresa,
+                "DV_rut": dv_empresa,
+                "nombre_real": f"Empresa de carga {n + 1}",
+                "nombre_fantasia": f"Carga {n + 1}",
+                "razon_social": f"{MARCA} {corrida} {n + 1}",
+                "giro": "Construcción",
+                "fecha_constitucion": date(2015, 1, 1) + timedelta(days=rnd.randrange(3000)),
+                "estado_suscripcion": 1,
+                "direccion_fisica": f"Av. Prueba {rnd.randrange(1, 9999)}",
+                "correo": f"empresa{n + 1}@loadtest.example.com",
+            }).scalar_one()
+
+            rut_usuario, dv_usuario = next(ruts)
+            id_usuario = conn.execute(insert(Usuario.__table__).returning(Usuario.__table__.c.id_usuario), {
+                "id_empresa": id_empresa,
+                "id_territorial": rnd.choice(territoriales),
+                "nombre": rnd.choice(NOMBRES),
+                "apellido_paterno": rnd.choice(APELLIDOS),
+                "apellido_materno": rnd.choice(APELLIDOS),
+                "rut": rut_usuario,
+                "rut_dv": dv_usuario,
+            }).scalar_one()
+            correo = f"admin+{corrida}-{n + 1}@loadtest.example.com"
+            id_login = conn.execute(insert(LoginUsuario.__table__).returning(LoginUsuario.__table__.c.id_login), {
+                "telefono": "+56900000000",
+                "correo": correo,
+                "password": hash_password,
+                "id_usuario": id_usuario,
+                "tipo_usuario": ADMIN,
+                "email_verificado_at": ahora,
+            }).scalar_one()
+
+            # Sesiones: activas, revocadas y expiradas (para /auth/sessions y la limpieza)
+            sesiones = []
+            for s in range(10):
+                inicio = ahora - timedelta(days=rnd.randrange(0, 60))
+                sesiones.append({
+                    "idusuario": id_login,
+                    "tokenrefresh_hash": os.urandom(32).hex(),
+                    "fecha_sesion": inicio,
+                    "limite_sesion": inicio + timedelta(days=7),
+                    "revoked_at": inicio + timedelta(hours=1) if s % 3 == 1 else None,
+                    "user_agent": "load_seed",
+                    "ip": "127.0.0.1",
+                    "ultima_actividad": inicio,
+                })
+            _insertar(conn, Sesiones.__table__, sesiones)
+
+            id_cargos = _insertar(conn, Cargo.__table__, [
+                {"nombre": nombre, "descripcion": f"Cargo {nombre.lower()}", "id_empresa": id_empresa}
+                for nombre in CARGOS
+            ], Cargo.__table__.c.id_cargo)
+
+            id_trabajadores = _insertar(conn, t_trabajador, [
+                {
+                    "id_empresa": id_empresa,
+                    "id_afp": rnd.choice(afps),
+                    "id_territorial": rnd.choice(territoriales),
+                    "id_cargo": rnd.choice(id_cargos),
+                    "id_salud": rnd.choice(saludes),
+                }
+                for _ in range(trabajadores)
+            ], t_trabajador.c.id_trabajador)
+            ruts_empresa = [next(ruts) for _ in id_trabajadores]
+            _insertar(conn, t_datos, [
+                {
+                    "id_trabajador": id_trabajador,
+                    "nombre": rnd.choice(NOMBRES),
+                    "apellido_paterno": rnd.choice(APELLIDOS),
+                    "apellido_materno": rnd.choice(APELLIDOS),
+                    "fecha_nacimiento": date(1960, 1, 1) + timedelta(days=rnd.randrange(15000)),
+                    "rut": rut,
+                    "DV_rut": dv,
+                    "nacionalidad": rnd.choice(NACIONALIDADES),
+                    "direccion_real": f"Pasaje {rnd.choice(APELLIDOS)} {rnd.randrange(1, 3000)}",
+                }
+                for id_trabajador, (rut, dv) in zip(id_trabajadores, ruts_empresa)
+            ])
+
+            contratos = []
+            for id_trabajador in id_trabajadores:
+                inicial = ahora - timedelta(days=rnd.randrange(30, 1500))
+                contratos.append({
+                    "id_trabajador": id_trabajador,
+                    "direccion_contrato": f"Obra {rnd.randrange(1, 50)}",
+                    "fecha_subida": inicial,
+                    "fecha_inicial": inicial,
+                    "fecha_termino": inicial + timedelta(days=rnd.randrange(90, 720)) if rnd.random() < 0.7 else None,
+                })
+            _insertar(conn, Contrato.__table__, contratos)
+
+            id_epps = _insertar(conn, Epp.__table__, [
+                {"epp": f"EPP {k + 1} {corrida}-{n + 1}", "descripcion": f"Elemento de protección {k + 1} ({corrida}-{n + 1})",
+                 "id_empresa": id_empresa}
+                for k in range(10)
+            ], Epp.__table__.c.id_epp)
+            id_odis = _insertar(conn, Odi.__table__, [
+                {
+                    "tarea": f"Tarea {k + 1} {corrida}-{n + 1}",
+                    "riesgo": "Caída de altura",
+                    "consecuencias": "Lesiones, fracturas",
+                    "precaucion": "Uso de arnés y línea de vida",
+                    "id_empresa": id_empresa,
+                }
+                for k in range(10)
+            ], Odi.__table__.c.id_odi)
+            _insertar(conn, Clausulas.__table__, [
+                {"id_empresa": id_empresa, "titulo": f"Cláusula {k + 1}", "clausula": "Texto de la cláusula " * 20}
+                for k in range(5)
+            ])
+
+            resultado.append({
+                "empresa_id": id_empresa,
+                "empresa_rut": f"{rut_empresa}-{dv_empresa}",
+                "email": correo,
+                "password": password,
+                "ruts": [rut for rut, _ in rnd.sample(ruts_empresa, min(50, len(ruts_empresa)))],
+                "epp_ids": id_epps,
+                "odi_ids": id_odis,
+            })
+            print(f"Empresa {n + 1}/{empresas} (id {id_empresa}): {len(id_trabajadores)} trabajadores")
+
+    return resultado
+
+
+def clean(engine: Engine) -> int:
+    """Borra las empresas sembradas y todo lo que cuelga de ellas."""
+    t_empresa, t_trabajador = Empresa.__table__, Trabajador.__table__
+    with engine.begin() as conn:
+        empresas = list(conn.execute(
+            select(t_empresa.c.id_empresa).where(t_empresa.c.razon_social.like(f"{MARCA} %"))
+        ).scalars())
+        if not empresas:
+            return 0
+        trabajadores = select(t_trabajador.c.id_trabajador).where(t_trabajador.c.id_empresa.in_(empresas))
+        conn.execute(delete(Contrato.__table__).where(Contrato.__table__.c.id_trabajador.in_(trabajadores)))
+        conn.execute(delete(DatosTrabajador.__table__).where(DatosTrabajador.__table__.c.id_trabajador.in_(trabajadores)))
+        conn.execute(delete(t_trabajador).where(t_trabajador.c.id_empresa.in_(empresas)))
+        for tabla in (Cargo.__table__, Epp.__table__, Clausulas.__table__):
+            conn.execute(delete(tabla).where(tabla.c.id_empresa.in_(empresas)))
+        # usuario, login_usuario, sesiones y odi se borran en cascada
+        conn.execute(delete(t_empresa).where(t_empresa.c.id_empresa.in_(empresas)))
+    return len(empresas)
+
+
+def main():
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Datos sintéticos para pruebas de carga")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    s = sub.add_parser("seed", help="Crea empresas, usuarios y trabajadores de prueba")
+    s.add_argument("--empresas", type=int, default=10)
+    s.add_argument("--trabajadores", type=int, default=200, help="Trabajadores por empresa")
+    s.add_argument("--semilla", type=int, default=42)
+    s.add_argument("--password", default=PASSWORD_POR_DEFECTO)
+    s.add_argument("--out", default="loadtest_usuarios.json", help="JSON con credenciales e ids para load_test")
+
+    sub.add_parser("clean", help="Borra las empresas sembradas")
+
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        usuarios = seed(engine, args.empresas, args.trabajadores, args.semilla, args.password)
+        with open(args.out, "w") as f:
+            json.dump(usuarios, f, indent=2, ensure_ascii=False)
+        print(f"Credenciales en {args.out}")
+    elif args.command == "clean":
+        print("Empresas borradas:", clean(engine))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Prueba de carga contra una instancia local sembrada con `load_seed`.
+
+Cada usuario virtual es una corrutina con su propio login (una empresa del
+JSON de `load_seed`, en orden circular) que elige operaciones según MEZCLA
+hasta que se acaba el tiempo: búsquedas, búsqueda por RUT, /empresa/full,
+catálogos, PDF de EPP y ODI, listado Excel de contratos y exportación CSV.
+
+El resultado es un JSON con latencias p50/p95/p99, throughput y códigos de
+estado por operación, más el commit actual, pensado para guardarse y
+compararse entre commits con `compare`.
+
+Requiere httpx (dependencia de desarrollo). Con muchos usuarios virtuales por
+empresa conviene subir LOGIN_RATE_EMAIL_CAPACITY en el servidor de pruebas,
+si no los logins repetidos terminan en 429.
+
+Uso:
+    poetry run python -m app.services.load_test run --usuarios 20 --duracion 60 --out carga.json
+    poetry run python -m app.services.load_test compare base.json carga.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+# operación → peso relativo
+MEZCLA = {
+    "login": 2,
+    "buscar": 20,
+    "search_by_rut": 20,
+    "empresa_full": 15,
+    "nacionalidad": 10,
+    "epp_list": 10,
+    "epp_pdf": 6,
+    "odi_pdf": 4,
+    "contratos_excel": 3,
+    "export_csv": 2,
+}
+
+
+def percentil(ordenados: list[float], p: float) -> float | None:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenados:
+        return None
+    indice = min(len(ordenados) - 1, max(0, math.ceil(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Resultados:
+    def __init__(self):
+        self.latencias: dict[str, list[float]] = {op: [] for op in MEZCLA}
+        self.estados: dict[str, dict[str, int]] = {op: {} for op in MEZCLA}
+        self.bytes: dict[str, int] = {op: 0 for op in MEZCLA}
+
+    def registrar(self, op: str, segundos: float, estado: str, tamano: int = 0):
+        self.latencias[op].append(segundos * 1000)
+        self.estados[op][estado] = self.estados[op].get(estado, 0) + 1
+        self.bytes[op] += tamano
+
+    def resumen(self, duracion: float) -> dict:
+        operaciones = {}
+        for op, latencias in self.latencias.items():
+            if not latencias:
+                continue
+            ordenadas = sorted(latencias)
+            errores = sum(n for estado, n in self.estados[op].items() if not estado.startswith(("2", "3")))
+            operaciones[op] = {
+                "n": len(ordenadas),
+                "errores": errores,
+                "estados": self.estados[op],
+                "rps": round(len(ordenadas) / duracion, 2),
+                "p50_ms": round(percentil(ordenadas, 50), 1),
+                "p95_ms": round(percentil(ordenadas, 95), 1),
+                "p99_ms": round(percentil(ordenadas, 99), 1),
+                "max_ms": round(ordenadas[-1], 1),
+                "bytes_promedio": self.bytes[op] // len(ordenadas),
+            }
+        total = sum(o["n"] for o in operaciones.values())
+        return {
+            "total": total,
+            "errores": sum(o["errores"] for o in operaciones.values()),
+            "rps": round(total / duracion, 2),
+            "operaciones": operaciones,
+        }
+
+
+class UsuarioVirtual:
+    def __init__(self, cliente: httpx.AsyncClient, empresa: dict, resultados: Resultados, rnd: random.Random):
+        self.cliente = cliente
+        self.empresa = empresa
+        self.resultados = resultados
+        self.rnd = rnd
+        self.headers: dict[str, str] = {}
+
+    async def _medir(self, op: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self.cliente.request(method, url, headers=self.headers, **kwargs)
+            # Los cuerpos en streaming (CSV) se leen completos: cuenta el último byte
+            await respuesta.aread()
+        except httpx.HTTPError as e:
+            self.resultados.registrar(op, time.perf_counter() - inicio, type(e).__name__)
+            return None
+        self.resultados.registrar(op, time.perf_counter() - inicio, str(respuesta.status_code), len(respuesta.content))
+        return respuesta
+
+    async def login(self):
+        respuesta = await self._medir("login", "POST", "/auth/login_api", json={
+            "email": self.empresa["email"], "password": self.empresa["password"],
+        })
+        if respuesta is not None and respuesta.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+    async def ejecutar(self, op: str):
+        rnd, empresa = self.rnd, self.empresa
+        rut = str(rnd.choice(empresa["ruts"]))
+        if op == "login":
+            await self.login()
+        elif op == "buscar":
+            q = rnd.choice(("juan", "maría gonzález", "pedro soto", "camila", "rojas", "diaz muñoz"))
+            await self._medir(op, "GET", "/trabajadores/buscar", params={"q": q, "limit": 20})
+        elif op == "search_by_rut":
+            await self._medir(op, "GET", "/trabajadores/search-by-rut", params={"rut": rut})
+        elif op == "empresa_full":
+            await self._medir(op, "GET", "/empresa/full")
+        elif op == "nacionalidad":
+            await self._medir(op, "GET", "/nacionalidad/list")
+        elif op == "epp_list":
+            await self._medir(op, "GET", "/epp/list", params={"limit": 100})
+        elif op == "epp_pdf":
+            ids = rnd.sample(empresa["epp_ids"], min(4, len(empresa["epp_ids"])))
+            await self._medir(op, "POST", "/epp/generate-pdf", json={
+                "rut": rut, "elementos": [{"id_epp": i, "cantidad": 1} for i in ids],
+            })
+        elif op == "odi_pdf":
+            await self._medir(op, "POST", "/odi/generate-pdf", json={
+                "nombre": "Trabajador de carga",
+                "rut": rut,
+                "cargo": "Operario",
+                "empresa_nombre": "Empresa de carga",
+                "empresa_rut": empresa["empresa_rut"],
+                "elementos": rnd.sample(empresa["odi_ids"], min(5, len(empresa["odi_ids"]))),
+            })
+        elif op == "contratos_excel":
+            await self._medir(op, "GET", "/contrato/generate-list-contracts")
+        elif op == "export_csv":
+            await self._medir(op, "GET", "/trabajadores/export", params={"formato": "csv"})
+
+    async def correr(self, hasta: float):
+        await self.login()
+        operaciones, pesos = list(MEZCLA), list(MEZCLA.values())
+        while time.monotonic() < hasta:
+            await self.ejecutar(self.rnd.choices(operaciones, pesos)[0])
+
+
+def _commit_actual() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(base_url: str, empresas: list[dict], usuarios: int, duracion: float, semilla: int = 1) -> dict:
+    resultados = Resultados()
+    limites = httpx.Limits(max_connections=usuarios, max_keepalive_connections=usuarios)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limites) as cliente:
+        hasta = time.monotonic() + duracion
+        inicio = time.perf_counter()
+        await asyncio.gather(*(
+            UsuarioVirtual(cliente, empresas[i % len(empresas)], resultados, random.Random(semilla + i)).correr(hasta)
+            for i in range(usuarios)
+        ))
+        transcurrido = time.perf_counter() - inicio
+
+    return {
+        "commit": _commit_actual(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"base_url": base_url, "usuarios": usuarios, "duracion_s": duracion,
+                   "empresas": len(empresas), "mezcla": MEZCLA},
+        "duracion_real_s": round(transcurrido, 2),
+        **resultados.resumen(transcurrido),
+    }
+
+
+def compare(base: dict, nuevo: dict) -> dict:
+    """Diferencias por operación (nuevo - base) de latencias y throughput."""
+    diferencias = {}
+    for op, n in nuevo["operaciones"].items():
+        b = base["operaciones"].get(op)
+        if b is None:
+            continue
+        diferencias[op] = {
+            campo: round(n[campo] - b[campo], 1) for campo in ("p50_ms", "p95_ms", "p99_ms", "rps", "errores")
+        }
+        diferencias[op]["p95_cambio_pct"] = round(100 * (n["p95_ms"] - b["p95_ms"]) / b["p95_ms"], 1) if b["p95_ms"] else None
+    return {"base": base.get("commit"), "nuevo": nuevo.get("commit"), "operaciones": diferencias}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="Ejecuta la mezcla de operaciones contra el servidor")
+    r.add_argument("--base-url", default="http://127.0.0.1:8000")
+    r.add_argument("--datos", default="loadtest_usuarios.json", help="JSON generado por load_seed")
+    r.add_argument("--usuarios", type=int, default=20, help="Usuarios virtuales concurrentes")
+    r.add_argument("--duracion", type=float, default=60, help="Segundos")
+    r.add_argument("--semilla", type=int, default=1)
+    r.add_argument("--out", default=None, help="Archivo JSON de salida (por defecto stdout)")
+
+    c = sub.add_parser("compare", help="Compara dos resultados de run")
+    c.add_argument("base")
+    c.add_argument("nuevo")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        with open(args.datos) as f:
+            empresas = json.load(f)
+        resultado = asyncio.run(run(args.base_url, empresas, args.usuarios, args.duracion, args.semilla))
+        salida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(salida)
+        print(salida)
+    elif args.command == "compare":
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.nuevo) as f:
+            nuevo = json.load(f)
+        print(json.dumps(compare(base, nuevo), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
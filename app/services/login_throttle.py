@@ -0,0 +1,162 @@
+"""
+Limitador de intentos de login (token bucket) por IP y por correo.
+
+Cada intento consume un token del bucket de la IP y otro del bucket del correo.
+Si alguno está vacío se rechaza el intento con 429 antes de buscar el
+LoginUsuario y de ejecutar bcrypt, que es lo que satura la CPU durante un
+ataque de credential stuffing.
+
+Por defecto los buckets viven en memoria del proceso. Si se define
+LOGIN_RATE_REDIS_URL se comparten entre workers usando Redis (opcional).
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+from app.services.metrics import Counter, as_dict
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn")
+
+# Configuración desde .env (capacidad = ráfaga permitida, por minuto = recarga)
+LOGIN_RATE_IP_CAPACITY = int(os.getenv("LOGIN_RATE_IP_CAPACITY", "20"))
+LOGIN_RATE_IP_PER_MINUTE = float(os.getenv("LOGIN_RATE_IP_PER_MINUTE", "10"))
+LOGIN_RATE_EMAIL_CAPACITY = int(os.getenv("LOGIN_RATE_EMAIL_CAPACITY", "5"))
+LOGIN_RATE_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_RATE_EMAIL_PER_MINUTE", "2"))
+LOGIN_RATE_MAX_KEYS = int(os.getenv("LOGIN_RATE_MAX_KEYS", "100000"))
+LOGIN_RATE_REDIS_URL = os.getenv("LOGIN_RATE_REDIS_URL")
+
+throttle_decisions = Counter(
+    "login_throttle_decisions_total",
+    "Intentos de login evaluados por el limitador",
+    ("scope", "result"),
+)
+
+
+class MemoryBackend:
+    """Buckets en memoria del proceso, con tope de claves (LRU)."""
+
+    def __init__(self, max_keys: int = LOGIN_RATE_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, rate: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(capacity), now]
+                self._buckets[key] = bucket
+                # Bajo ataque con muchas IPs distintas se descartan los buckets más antiguos
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return True, 0.0
+            bucket[0] = tokens
+            return False, (1 - tokens) / rate
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class RedisBackend:
+    """Buckets compartidos entre workers. Requiere el paquete `redis`."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    local allowed = 0
+    local retry = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    else
+        retry = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(retry)}
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def consume(self, key: str, capacity: int, rate: float) -> tuple[bool, float]:
+        allowed, retry = self._script(keys=[f"login_throttle:{key}"], args=[capacity, rate])
+        return bool(allowed), float(retry)
+
+    def size(self) -> int:
+        return -1
+
+
+def _create_backend():
+    if LOGIN_RATE_REDIS_URL:
+        try:
+            return RedisBackend(LOGIN_RATE_REDIS_URL)
+        except Exception as e:
+            logger.warning("Limitador de login: Redis no disponible (%s), usando memoria", e)
+    return MemoryBackend()
+
+
+backend = _create_backend()
+_fallback = MemoryBackend()
+
+
+def _consume(key: str, capacity: int, per_minute: float) -> tuple[bool, float]:
+    try:
+        return backend.consume(key, capacity, per_minute / 60)
+    except Exception as e:
+        # Si el backend compartido falla se sigue limitando en memoria
+        logger.warning("Limitador de login: error en backend (%s)", e)
+        return _fallback.consume(key, capacity, per_minute / 60)
+
+
+def check_login_attempt(ip: str | None, email: str):
+    """
+    Consume un intento para la IP y el correo. Lanza 429 si se excede el límite.
+    Debe llamarse antes de consultar la base de datos o verificar la contraseña.
+    """
+    checks = (
+        ("ip", f"ip:{ip or 'desconocida'}", LOGIN_RATE_IP_CAPACITY, LOGIN_RATE_IP_PER_MINUTE),
+        ("email", f"email:{email.strip().lower()}", LOGIN_RATE_EMAIL_CAPACITY, LOGIN_RATE_EMAIL_PER_MINUTE),
+    )
+    for scope, key, capacity, per_minute in checks:
+        allowed, retry_after = _consume(key, capacity, per_minute)
+        if not allowed:
+            throttle_decisions.inc(scope=scope, result="rejected")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiados intentos de inicio de sesión, intenta nuevamente más tarde",
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+            )
+    throttle_decisions.inc(scope="all", result="allowed")
+
+
+def stats() -> dict:
+    return {
+        "backend": type(backend).__name__,
+        "tracked_keys": backend.size(),
+        "decisions": as_dict(throttle_decisions),
+    }
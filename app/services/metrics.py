@@ -0,0 +1,330 @@
+"""
+Registro de métricas en memoria del proceso.
+
+Cada métrica se registra en REGISTRY al crearse; los valores se guardan por
+combinación de etiquetas y son seguros para usarse desde el threadpool.
+
+Con varios workers de uvicorn cada proceso tiene su propio registro. Si se
+define METRICS_MULTIPROC_DIR, cada proceso escribe su snapshot en
+`<dir>/metrics_<pid>.json` cada METRICS_FLUSH_SECONDS y `/metrics` suma los de
+todos: contadores e histogramas de todos los archivos (también de procesos
+ya terminados, para que los totales no retrocedan), gauges solo de procesos
+vivos. El directorio debe vaciarse al desplegar, antes de levantar los workers.
+"""
+import json
+import logging
+import math
+import os
+import threading
+from bisect import bisect_left
+from itertools import accumulate
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn")
+
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+REGISTRY: list = []
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> dict[tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+
+# Buckets en segundos, pensados para latencias HTTP (de 5 ms a 30 s)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Gauge:
+    """Valor que sube y baja (conexiones en uso, envíos en curso, ...)."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def snapshot(self) -> dict[tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas → [conteo por bucket (no acumulado, el último es +Inf), suma, total]
+        self._values: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self) -> dict[tuple[str, ...], dict]:
+        """Por etiquetas: buckets acumulados (límite → conteo), suma y total."""
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        return {
+            key: {
+                "buckets": dict(zip((*self.buckets, float("inf")), accumulate(counts))),
+                "sum": total,
+                "count": count,
+            }
+            for key, (counts, total, count) in values.items()
+        }
+
+
+def as_dict(metric) -> dict:
+    """Representación JSON simple de una métrica (etiquetas → valor)."""
+    return {
+        ",".join(f"{k}={v}" for k, v in zip(metric.labelnames, key)) or "total": value
+        for key, value in metric.snapshot().items()
+    }
+
+
+# ---------------------------
+# Exportación (formato de texto de Prometheus)
+# ---------------------------
+
+def dump_registry() -> dict:
+    """Snapshot serializable a JSON de todas las métricas del proceso."""
+    families = {}
+    for metric in REGISTRY:
+        family = {
+            "type": metric.type,
+            "help": metric.documentation,
+            "labelnames": list(metric.labelnames),
+            "values": [],
+        }
+        if metric.type == "histogram":
+            family["buckets"] = list(metric.buckets)
+            family["values"] = [
+                [list(key), list(value["buckets"].values()), value["sum"], value["count"]]
+                for key, value in metric.snapshot().items()
+            ]
+        else:
+            family["values"] = [[list(key), value] for key, value in metric.snapshot().items()]
+        families[metric.name] = family
+    return families
+
+
+def merge_dumps(dumps: list[tuple[dict, bool]]) -> dict:
+    """
+    Suma snapshots de varios procesos. `dumps` son pares (snapshot, proceso vivo);
+    los gauges de procesos terminados se descartan.
+    """
+    merged: dict = {}
+    for families, vivo in dumps:
+        for name, family in families.items():
+            if family["type"] == "gauge" and not vivo:
+                continue
+            target = merged.setdefault(name, {**family, "values": {}})
+            for entry in family["values"]:
+                key = tuple(entry[0])
+                if family["type"] == "histogram":
+                    counts, total, count = entry[1:]
+                    actual = target["values"].get(key)
+                    if actual is None:
+                        target["values"][key] = [list(counts), total, count]
+                    else:
+                        actual[0] = [a + b for a, b in zip(actual[0], counts)]
+                        actual[1] += total
+                        actual[2] += count
+                else:
+                    target["values"][key] = target["values"].get(key, 0) + entry[1]
+    for family in merged.values():
+        family["values"] = [[list(key), *value] if isinstance(value, list) else [list(key), value]
+                            for key, value in family["values"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: tuple = ()) -> str:
+    pares = [*zip(names, values), *extra]
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pares) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render_prometheus(families: dict) -> str:
+    lines = []
+    for name, family in sorted(families.items()):
+        ayuda = family["help"].replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {ayuda}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        labelnames = family["labelnames"]
+        for entry in family["values"]:
+            key = entry[0]
+            if family["type"] == "histogram":
+                counts, total, count = entry[1:]
+                for bound, acumulado in zip((*family["buckets"], math.inf), counts):
+                    le = (("le", _number(bound)),)
+                    lines.append(f"{name}_bucket{_labels(labelnames, key, le)} {_number(acumulado)}")
+                lines.append(f"{name}_sum{_labels(labelnames, key)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labelnames, key)} {_number(count)}")
+            else:
+                lines.append(f"{name}{_labels(labelnames, key)} {_number(entry[1])}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# Varios procesos
+# ---------------------------
+
+def _process_file(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics_{pid}.json")
+
+
+def write_process_file(directory: str | None = METRICS_MULTIPROC_DIR):
+    """Escribe el snapshot de este proceso (reemplazo atómico del archivo)."""
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = _process_file(directory, os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(dump_registry(), f)
+    os.replace(tmp, path)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect(directory: str | None = METRICS_MULTIPROC_DIR) -> dict:
+    """Métricas de todos los procesos (o solo de este si no hay directorio)."""
+    if not directory:
+        return dump_registry()
+
+    write_process_file(directory)
+    dumps = []
+    for filename in os.listdir(directory):
+        if not (filename.startswith("metrics_") and filename.endswith(".json")):
+            continue
+        pid = filename[len("metrics_"):-len(".json")]
+        # Otros archivos en el directorio (respaldos, temporales de editores)
+        if not pid.isdigit():
+            continue
+        pid = int(pid)
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                dumps.append((json.load(f), _alive(pid)))
+        except (OSError, ValueError) as e:
+            logger.warning("No se pudo leer %s: %s", filename, e)
+    return merge_dumps(dumps)
+
+
+class ProcessFileWriter:
+    """Hilo que escribe el snapshot del proceso cada METRICS_FLUSH_SECONDS."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self):
+        while not self._stop.wait(METRICS_FLUSH_SECONDS):
+            try:
+                write_process_file()
+            except OSError as e:
+                logger.warning("No se pudieron escribir las métricas del proceso: %s", e)
+
+    def start(self):
+        if not METRICS_MULTIPROC_DIR or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            write_process_file()
+        except OSError as e:
+            logger.warning("No se pudieron escribir las métricas del proceso: %s", e)
+
+
+writer = ProcessFileWriter()
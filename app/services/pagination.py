@@ -0,0 +1,94 @@
+"""
+Cursores opacos para paginación por keyset.
+
+El cursor es la clave de orden de la última fila entregada, serializada en
+JSON y codificada en base64 url-safe. El cliente lo devuelve tal cual para
+pedir la página siguiente; la consulta filtra `WHERE (orden) > (cursor)` en
+vez de usar OFFSET, así que el costo no crece con el número de página.
+
+Los endpoints de listado reciben `limit` y `cursor` con la dependencia
+`page_params` y responden `Pagina[T]` (`{"items": [...], "next_cursor": ...}`).
+"""
+import base64
+import binascii
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Query, status
+
+load_dotenv()
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None, *tipos: type | tuple[type, ...]) -> list | None:
+    """
+    Valores del cursor; 400 si no es un cursor válido con un valor de cada
+    uno de los `tipos`, p. ej. `decode_cursor(cursor, (int, float), int)`.
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != len(tipos)
+        or not all(isinstance(v, t) for v, t in zip(values, tipos))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return values
+
+
+# ---------------------------
+# Parámetros y consultas paginadas
+# ---------------------------
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: str | None
+
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Elementos por página"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+) -> PageParams:
+    """Dependencia con los parámetros comunes `limit` y `cursor`."""
+    return PageParams(limit=limit, cursor=cursor)
+
+
+def paginate(query, key, page: PageParams) -> dict:
+    """
+    Aplica keyset sobre la columna única `key` (normalmente la PK) a una
+    consulta ORM y retorna `{"items", "next_cursor"}` (ver `schemas.pagination.Pagina`).
+    Se pide una fila extra para saber si hay página siguiente.
+    """
+    after = decode_cursor(page.cursor, key.type.python_type)
+    if after is not None:
+        query = query.filter(key > after[0])
+    rows = query.order_by(key).limit(page.limit + 1).all()
+    return page_result(rows, page.limit, lambda row: (getattr(row, key.key),))
+
+
+def page_result(rows: list, limit: int, cursor_values) -> dict:
+    """Corta `rows` (limit + 1 filas) y arma el cursor con `cursor_values(última fila)`."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*cursor_values(rows[-1]))
+    return {"items": rows, "next_cursor": next_cursor}
@@ -9,13 +9,69 @@ from reportlab.platypus.frames import Frame
 from datetime import datetime
 from typing import List
 from collections import defaultdict
+from functools import wraps
 import os
+import time
 
 
 from app.schemas.pdf_epp import PDFEppRequest
 from app.schemas.pdf_odi import PDFOdiRequest
 from app.schemas.pdf_contrato import PDFContratoRequest
 from app.schemas.pdf_termino_contrato import PDFTerminoContratoRequest
+from app.services import tracing
+from app.services.metrics import Histogram
+
+pdf_render_seconds = Histogram(
+    "pdf_render_seconds",
+    "Tiempo de generación de PDF por generador",
+    ("generator",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+pdf_pages = Histogram(
+    "pdf_pages",
+    "Páginas por PDF generado",
+    ("generator",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+
+
+def medir_render(generate_pdf):
+    """
+    Registra tiempo y páginas de `generate_pdf` (las deja en `self.paginas`) y
+    abre los spans pdf.render y pdf.story; `construir_pdf` cierra el segundo
+    y mide doc.build en pdf.build.
+    """
+    @wraps(generate_pdf)
+    def wrapper(self, data):
+        inicio = time.perf_counter()
+        self.paginas = None
+        generador = type(self).__name__
+        try:
+            with tracing.span("pdf.render", generator=generador) as render:
+                self._span_story = tracing.iniciar("pdf.story")
+                try:
+                    filepath = generate_pdf(self, data)
+                finally:
+                    if self._span_story is not None:
+                        self._span_story.terminar()
+                if render is not None:
+                    render.set(paginas=self.paginas)
+        finally:
+            # También los renders que fallan: suelen ser los lentos
+            pdf_render_seconds.observe(time.perf_counter() - inicio, generator=generador)
+        if self.paginas:
+            pdf_pages.observe(self.paginas, generator=generador)
+        return filepath
+    return wrapper
+
+
+def construir_pdf(generador, doc, story: List, **kwargs):
+    """`doc.build(story)` separando en la traza el armado del story del layout."""
+    if generador._span_story is not None:
+        generador._span_story.terminar()
+    with tracing.span("pdf.build", elementos=len(story)):
+        doc.build(story, **kwargs)
+    generador.paginas = doc.page
 
 
 class PDFEppGenerator:
@@ -71,6 +127,7 @@ class PDFEppGenerator:
             spaceAfter=6
         )
 
+    @medir_render
     def generate_pdf(self, data: PDFEppRequest) -> str:
         # Crear directorio para PDFs si no existe
         pdf_dir = "generated_pdfs"
@@ -129,8 +186,8 @@ class PDFEppGenerator:
         story.extend(self._create_certification())
         
         # Construir el PDF con footer personalizado
-        doc.build(story, onFirstPage=lambda c, d: create_footer(c, d, data), 
-                 onLaterPages=lambda c, d: create_footer(c, d, data))
+        construir_pdf(self, doc, story, onFirstPage=lambda c, d: create_footer(c, d, data), 
+                      onLaterPages=lambda c, d: create_footer(c, d, data))
         
         return filepath
 
@@ -274,6 +331,7 @@ class PDFOdiGenerator:
         from xml.sax.saxutils import escape as xml_escape
         return Paragraph(xml_escape(text or ""), self.table_cell_style)
 
+    @medir_render
     def generate_pdf(self, data: PDFOdiRequest) -> str:
         # Crear directorio para PDFs si no existe
         pdf_dir = "generated_pdfs"
@@ -312,8 +370,8 @@ class PDFOdiGenerator:
         story.extend(self._create_table_by_task(data.elementos, content_width))
         story.extend(self._create_certification())
         
-        doc.build(story, onFirstPage=lambda c, d: create_footer(c, d, data), 
-                  onLaterPages=lambda c, d: create_footer(c, d, data))
+        construir_pdf(self, doc, story, onFirstPage=lambda c, d: create_footer(c, d, data), 
+                      onLaterPages=lambda c, d: create_footer(c, d, data))
         return filepath
 
     def _create_header(self, data: PDFOdiRequest) -> List:
@@ -437,6 +495,7 @@ class PDFContratoGenerator:
             spaceAfter=6
         )
 
+    @medir_render
     def generate_pdf(self, data: PDFContratoRequest) -> str:
         # Crear directorio para PDFs si no existe
         pdf_dir = "generated_pdfs"
@@ -636,7 +695,7 @@ class PDFContratoGenerator:
         story.append(signature_block)
 
         # Construir el PDF
-        doc.build(story)
+        construir_pdf(self, doc, story)
 
         return filepath
 
@@ -736,6 +795,7 @@ class PDFTerminoContratoGenerator:
 
         return f"{day_name} {date_obj.day} de {month_name} del {date_obj.year}"
 
+    @medir_render
     def generate_pdf(self, data):
         """Genera el PDF de carta de término de contrato"""
         # Crear directorio para PDFs si no existe
@@ -856,6 +916,6 @@ class PDFTerminoContratoGenerator:
         story.append(signature_block)
 
         # Construir el PDF
-        doc.build(story)
+        construir_pdf(self, doc, story)
 
         return filepath
@@ -0,0 +1,98 @@
+"""
+Permisos por rol y acción.
+
+La tabla PERMISSIONS declara qué roles pueden ejecutar cada acción. Al importar
+el módulo se construye la matriz rol → acciones permitidas, así que cada
+chequeo en un request es una búsqueda en un frozenset.
+
+Uso en un router:
+
+    @router.get("/list")
+    def list_epp(current_user: dict = Depends(require_permission("epp:listar"))):
+        ...
+
+Si la ruta tiene el parámetro `empresa_id`, además se valida que coincida con
+la empresa del token.
+"""
+from fastapi import Depends, HTTPException, Request, status
+
+from app.services.dependencies import get_current_user
+from app.services.metrics import Counter
+
+ADMIN = 1
+CONTADOR = 2
+RRHH = 3
+
+ROLES = (ADMIN, CONTADOR, RRHH)
+
+# acción → (roles permitidos, texto para el mensaje de error)
+PERMISSIONS: dict[str, tuple[frozenset[int], str]] = {
+    "empresa:ver": (frozenset({ADMIN, CONTADOR, RRHH}), "ver los datos de la empresa"),
+    "empresa:editar": (frozenset({ADMIN}), "editar los datos de la empresa"),
+    "catalogos:ver": (frozenset({ADMIN, CONTADOR, RRHH}), "ver catálogos"),
+    "trabajadores:buscar": (frozenset({ADMIN, CONTADOR}), "buscar trabajadores"),
+    "trabajadores:crear": (frozenset({ADMIN, CONTADOR}), "crear trabajadores"),
+    "trabajadores:exportar": (frozenset({ADMIN, CONTADOR}), "exportar la nómina de trabajadores"),
+    "epp:listar": (frozenset({ADMIN, CONTADOR}), "listar EPP"),
+    "epp:crear": (frozenset({ADMIN, CONTADOR}), "crear EPP"),
+    "epp:pdf": (frozenset({ADMIN, CONTADOR}), "generar PDF de EPP"),
+    "odi:listar": (frozenset({ADMIN, CONTADOR}), "listar ODI"),
+    "odi:crear": (frozenset({ADMIN, CONTADOR}), "crear ODI"),
+    "odi:eliminar": (frozenset({ADMIN, CONTADOR}), "eliminar ODI"),
+    "odi:pdf": (frozenset({ADMIN, CONTADOR}), "generar PDF de ODI"),
+    "clausulas:listar": (frozenset({ADMIN, CONTADOR}), "listar cláusulas"),
+    "clausulas:crear": (frozenset({ADMIN, CONTADOR}), "crear cláusulas"),
+    "contrato:pdf": (frozenset({ADMIN, CONTADOR}), "generar contratos"),
+    "contrato:termino_pdf": (frozenset({ADMIN, CONTADOR}), "generar cartas de término"),
+    "contrato:listado": (frozenset({ADMIN, CONTADOR}), "generar listado de contratos"),
+    "sesiones:empresa": (frozenset({ADMIN}), "ver las sesiones de la empresa"),
+    "metricas:ver": (frozenset({ADMIN}), "ver métricas"),
+    "perfilado:usar": (frozenset({ADMIN}), "perfilar requests"),
+}
+
+auth_decisions = Counter(
+    "auth_decisions_total",
+    "Chequeos de permisos por acción y resultado",
+    ("action", "result"),
+)
+
+
+def build_matrix() -> dict[int, frozenset[str]]:
+    return {
+        rol: frozenset(action for action, (roles, _) in PERMISSIONS.items() if rol in roles)
+        for rol in ROLES
+    }
+
+
+PERMISSION_MATRIX = build_matrix()
+
+
+def has_permission(rol: int, action: str) -> bool:
+    return action in PERMISSION_MATRIX.get(rol, frozenset())
+
+
+def require_permission(action: str):
+    """Dependencia que exige el permiso `action` y devuelve el usuario actual."""
+    # Falla al importar el router si la acción no está declarada
+    _, descripcion = PERMISSIONS[action]
+
+    def dependency(request: Request, current_user: dict = Depends(get_current_user)) -> dict:
+        if not has_permission(current_user["rol"], action):
+            auth_decisions.inc(action=action, result="denied")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"No tienes permisos para {descripcion}"
+            )
+
+        empresa_id = request.path_params.get("empresa_id")
+        if empresa_id is not None and str(empresa_id) != str(current_user["empresa_id"]):
+            auth_decisions.inc(action=action, result="other_tenant")
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes acceso a esta empresa"
+            )
+
+        auth_decisions.inc(action=action, result="allowed")
+        return current_user
+
+    return dependency
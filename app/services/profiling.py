@@ -0,0 +1,270 @@
+"""
+Perfilado bajo demanda de un request, solo para administradores.
+
+Se activa con el header `X-Profile: 1` o el parámetro `?__profile=1`. El
+usuario se valida con `get_current_user` (mismo token que el resto de la API)
+y debe tener el permiso `perfilado:usar`.
+
+Mientras dura el request se instala un hook de `sys.setprofile` en todos los
+hilos; el hook solo registra eventos del contexto (contextvar) del request
+perfilado, lo que incluye el código que FastAPI ejecuta en el threadpool. El
+tiempo entre eventos se asigna a la pila de llamadas activa, así que el
+resultado incluye lo que se pasa dentro de SQLAlchemy/psycopg2, ReportLab y
+openpyxl. Es un perfilador determinista: el request perfilado corre varias
+veces más lento, pero los demás requests solo pagan un chequeo del contextvar
+por evento y nada cuando no hay perfilado activo.
+
+Se guardan dos archivos en PROFILE_DIR, con el id que vuelve en el header
+`X-Profile-Id`:
+- `<id>.folded`: pilas colapsadas (formato de flamegraph.pl / speedscope), en µs.
+- `<id>.json`: resumen con tiempo total, por paquete y funciones más costosas.
+
+Se descargan con GET /perfiles/{id}. Solo se conservan los últimos
+PROFILE_MAX_FILES perfiles y ninguno con más de PROFILE_MAX_AGE_HOURS; los
+demás se borran al guardar uno nuevo.
+"""
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.responses import JSONResponse
+
+from app.services.dependencies import get_current_user
+from app.services.permissions import has_permission
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn")
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "generated_profiles")
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", "80"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_MAX_AGE_HOURS = float(os.getenv("PROFILE_MAX_AGE_HOURS", "72"))
+
+PROFILE_ID_RE = re.compile(r"^perfil_\d{8}_\d{6}_[0-9a-f]{8}$")
+
+_perfil_actual: contextvars.ContextVar["Perfil | None"] = contextvars.ContextVar("perfil_actual", default=None)
+
+
+class Perfil:
+    def __init__(self, perfil_id: str, method: str, path: str):
+        self.id = perfil_id
+        self.method = method
+        self.path = path
+        self.pilas: dict[str, int] = defaultdict(int)
+        # El hook corre en todos los hilos del request (event loop y threadpool)
+        self._lock = threading.Lock()
+        self._ultimo: dict[int, int] = {}
+        self._inicio = time.perf_counter_ns()
+        self.total_ns = 0
+
+    def reiniciar(self, ident: int):
+        """El hilo vuelve a este contexto: no contar el tiempo en que corrió otra cosa."""
+        self._ultimo.pop(ident, None)
+
+    def evento(self, frame, event: str, arg, ident: int):
+        ahora = time.perf_counter_ns()
+        previo = self._ultimo.get(ident)
+        if previo is not None:
+            if event == "call":
+                # Hasta la llamada el tiempo corrió en quien llama
+                clave = _pila(frame.f_back)
+            elif event in ("c_return", "c_exception"):
+                clave = _pila(frame) + ";" + _nombre_c(arg)
+            else:
+                clave = _pila(frame)
+            with self._lock:
+                self.pilas[clave] += ahora - previo
+        self._ultimo[ident] = time.perf_counter_ns()
+
+    def _copia(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.pilas)
+
+    def resumen(self, pilas: dict[str, int] | None = None) -> dict:
+        pilas = self._copia() if pilas is None else pilas
+        por_paquete: dict[str, int] = defaultdict(int)
+        por_funcion: dict[str, int] = defaultdict(int)
+        for pila, ns in pilas.items():
+            marcos = pila.split(";")
+            # Tiempo propio de la función en la cima de la pila
+            por_funcion[marcos[-1]] += ns
+            # Tiempo inclusivo por paquete (una vez por pila)
+            for paquete in {m.split(":", 1)[0].split(".", 1)[0] for m in marcos}:
+                por_paquete[paquete] += ns
+        return {
+            "id": self.id,
+            "request": f"{self.method} {self.path}",
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "muestreado_ms": round(sum(pilas.values()) / 1e6, 3),
+            "por_paquete_ms": {
+                k: round(v / 1e6, 3) for k, v in sorted(por_paquete.items(), key=lambda kv: -kv[1])[:20]
+            },
+            "funciones_ms": {
+                k: round(v / 1e6, 3) for k, v in sorted(por_funcion.items(), key=lambda kv: -kv[1])[:30]
+            },
+        }
+
+    def guardar(self, directorio: str = PROFILE_DIR):
+        self.total_ns = time.perf_counter_ns() - self._inicio
+        pilas = self._copia()
+        os.makedirs(directorio, exist_ok=True)
+        with open(os.path.join(directorio, f"{self.id}.folded"), "w") as f:
+            for pila, ns in sorted(pilas.items()):
+                if ns >= 1000:
+                    f.write(f"{pila} {ns // 1000}\n")
+        with open(os.path.join(directorio, f"{self.id}.json"), "w") as f:
+            json.dump(self.resumen(pilas), f, indent=2, ensure_ascii=False)
+
+
+def limpiar(
+    directorio: str = PROFILE_DIR,
+    max_perfiles: int = PROFILE_MAX_FILES,
+    max_horas: float = PROFILE_MAX_AGE_HOURS,
+) -> int:
+    """Borra los perfiles más antiguos que `max_horas` o que excedan `max_perfiles`."""
+    perfiles = []
+    for nombre in os.listdir(directorio):
+        perfil_id, extension = os.path.splitext(nombre)
+        if extension == ".json" and PROFILE_ID_RE.match(perfil_id):
+            perfiles.append((os.path.getmtime(os.path.join(directorio, nombre)), perfil_id))
+    perfiles.sort(reverse=True)
+
+    corte = time.time() - max_horas * 3600
+    borrar = [pid for i, (mtime, pid) in enumerate(perfiles) if i >= max_perfiles or mtime < corte]
+    for perfil_id in borrar:
+        for extension in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(directorio, perfil_id + extension))
+            except FileNotFoundError:
+                pass
+    return len(borrar)
+
+
+def _marco(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _pila(frame) -> str:
+    marcos = []
+    while frame is not None and len(marcos) < PROFILE_MAX_DEPTH:
+        marcos.append(_marco(frame))
+        frame = frame.f_back
+    return ";".join(reversed(marcos))
+
+
+def _nombre_c(func) -> str:
+    modulo = getattr(func, "__module__", None) or type(getattr(func, "__self__", None)).__module__
+    return f"{modulo}:{getattr(func, '__qualname__', repr(func))}"
+
+
+# ---------------------------
+# Hook global (solo mientras haya perfiles activos)
+# ---------------------------
+
+_contexto_por_hilo: dict[int, "Perfil | None"] = {}
+_activos = 0
+_activos_lock = threading.Lock()
+
+
+def _hook(frame, event, arg):
+    perfil = _perfil_actual.get()
+    ident = threading.get_ident()
+    if _contexto_por_hilo.get(ident) is not perfil:
+        _contexto_por_hilo[ident] = perfil
+        if perfil is not None:
+            perfil.reiniciar(ident)
+    if perfil is not None:
+        perfil.evento(frame, event, arg, ident)
+
+
+def _activar():
+    global _activos
+    with _activos_lock:
+        _activos += 1
+        if _activos == 1:
+            threading.setprofile_all_threads(_hook)
+
+
+def _desactivar():
+    global _activos
+    with _activos_lock:
+        _activos -= 1
+        if _activos == 0:
+            threading.setprofile_all_threads(None)
+            _contexto_por_hilo.clear()
+
+
+# ---------------------------
+# Middleware
+# ---------------------------
+
+def _solicitado(scope) -> bool:
+    for nombre, valor in scope["headers"]:
+        if nombre == b"x-profile" and valor in (b"1", b"true"):
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("__profile", [""])[0] in ("1", "true")
+
+
+def _autorizar(scope) -> str | None:
+    """None si el usuario puede perfilar; si no, el motivo del rechazo."""
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return "Se requiere un token de administrador para perfilar"
+    try:
+        user = get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+    except HTTPException as e:
+        return e.detail
+    if not has_permission(user["rol"], "perfilado:usar"):
+        return "No tienes permisos para perfilar requests"
+    return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _solicitado(scope):
+            await self.app(scope, receive, send)
+            return
+
+        rechazo = _autorizar(scope)
+        if rechazo is not None:
+            await JSONResponse({"detail": rechazo}, status_code=403)(scope, receive, send)
+            return
+
+        perfil_id = f"perfil_{datetime.now():%Y%m%d_%H%M%S}_{os.urandom(4).hex()}"
+        perfil = Perfil(perfil_id, scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", perfil_id.encode())]
+            await send(message)
+
+        token = _perfil_actual.set(perfil)
+        _activar()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _desactivar()
+            _perfil_actual.reset(token)
+            try:
+                perfil.guardar()
+                logger.info("Perfil %s guardado (%s %s)", perfil_id, scope["method"], scope["path"])
+                limpiar()
+            except OSError as e:
+                logger.warning("No se pudo guardar el perfil %s: %s", perfil_id, e)
@@ -0,0 +1,223 @@
+"""
+Mantención de registros pendientes de verificación de correo.
+
+Los tokens de verificación se guardan como digest (sha256) en
+`login_usuario.email_verificacion_hash`, bajo un índice parcial que solo
+contiene las filas no verificadas, así que la búsqueda de `verify_email` es
+un lookup O(log n) sobre un índice pequeño.
+
+Los registros que nunca se verifican se barren en lotes:
+- refresh: genera un token nuevo y reenvía el correo, UNA sola vez
+  (`email_verificacion_reenviado_at`), a los registros expirados hace menos de
+  `--grace-days` días;
+- purge: borra, junto con su usuario y la empresa vacía creada al registrarse,
+  los registros con más de 2 × TOKEN_TTL + `--grace-days` de antigüedad
+  (`registrado_at`): para entonces ya expiró también el token reenviado.
+
+Uso:
+    poetry run python -m app.services.registration_maintenance ensure-schema
+    poetry run python -m app.services.registration_maintenance refresh --grace-days 7
+    poetry run python -m app.services.registration_maintenance purge --grace-days 7
+"""
+import argparse
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.services import auth
+
+TOKEN_TTL = timedelta(hours=24)
+
+# CONCURRENTLY no bloquea escrituras sobre login_usuario mientras se crea el índice
+SCHEMA_DDL = [
+    "ALTER TABLE login_usuario ADD COLUMN IF NOT EXISTS email_verificacion_reenviado_at timestamptz",
+    # Sin default al agregarla: las filas existentes quedan en NULL y usan la expiración original
+    "ALTER TABLE login_usuario ADD COLUMN IF NOT EXISTS registrado_at timestamptz",
+    "ALTER TABLE login_usuario ALTER COLUMN registrado_at SET DEFAULT now()",
+]
+
+INDEX_DDL = [
+    """CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_login_usuario_verificacion_pendiente
+       ON login_usuario (email_verificacion_hash) WHERE email_verificado_at IS NULL""",
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_login_usuario_verificacion_expira
+       ON login_usuario (email_verificacion_expira) WHERE email_verificado_at IS NULL""",
+]
+
+# Solo para el despliegue: los tokens emitidos antes se guardaban en claro.
+# Ejecutar UNA vez, aplicarlo dos veces invalidaría los enlaces pendientes.
+HASH_LEGACY_TOKENS_SQL = text("""
+    UPDATE login_usuario
+    SET email_verificacion_hash = encode(sha256(convert_to(email_verificacion_hash, 'UTF8')), 'hex')
+    WHERE email_verificado_at IS NULL AND email_verificacion_hash IS NOT NULL
+""")
+
+SELECT_TO_REFRESH_SQL = text("""
+    SELECT l.id_login, l.correo
+    FROM login_usuario l
+    WHERE l.email_verificado_at IS NULL
+      AND l.email_verificacion_reenviado_at IS NULL
+      AND l.email_verificacion_expira < :hasta
+      AND l.email_verificacion_expira >= :desde
+    ORDER BY l.email_verificacion_expira
+    LIMIT :batch_size
+    FOR UPDATE OF l SKIP LOCKED
+""")
+
+# Registros anteriores a la columna registrado_at: la fecha sale del primer token
+SELECT_TO_PURGE_SQL = text("""
+    SELECT l.id_login, l.id_usuario, u.id_empresa
+    FROM login_usuario l
+    LEFT JOIN usuario u ON u.id_usuario = l.id_usuario
+    WHERE l.email_verificado_at IS NULL
+      AND l.email_verificacion_expira < now()
+      AND coalesce(
+            l.registrado_at,
+            CASE WHEN l.email_verificacion_reenviado_at IS NULL
+                 THEN l.email_verificacion_expira - :ttl END,
+            l.email_verificacion_reenviado_at - :ttl
+          ) < :registrado_antes
+    LIMIT :batch_size
+    FOR UPDATE OF l SKIP LOCKED
+""")
+
+REFRESH_TOKENS_SQL = text("""
+    UPDATE login_usuario AS l
+    SET email_verificacion_hash = v.hash,
+        email_verificacion_expira = :expira,
+        email_verificacion_reenviado_at = :ahora
+    FROM unnest(CAST(:ids AS integer[]), CAST(:hashes AS text[])) AS v(id, hash)
+    WHERE l.id_login = v.id
+""")
+
+DELETE_USERS_SQL = text("DELETE FROM usuario WHERE id_usuario = ANY(CAST(:ids AS integer[]))")
+DELETE_LOGINS_SQL = text("DELETE FROM login_usuario WHERE id_login = ANY(CAST(:ids AS integer[]))")
+
+# Solo empresas que quedaron sin usuarios y que nunca se completaron tras el registro
+DELETE_EMPTY_COMPANIES_SQL = text("""
+    DELETE FROM empresa e
+    WHERE e.id_empresa = ANY(CAST(:ids AS integer[]))
+      AND e.rut_empresa IS NULL
+      AND NOT EXISTS (SELECT 1 FROM usuario u WHERE u.id_empresa = e.id_empresa)
+""")
+
+
+def ensure_schema(engine: Engine):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for ddl in (*SCHEMA_DDL, *INDEX_DDL):
+            conn.execute(text(ddl))
+
+
+def hash_legacy_tokens(engine: Engine) -> int:
+    with engine.begin() as conn:
+        return conn.execute(HASH_LEGACY_TOKENS_SQL).rowcount
+
+
+def refresh_expired(
+    engine: Engine,
+    grace: timedelta = timedelta(days=7),
+    batch_size: int = 500,
+    send_email=None,
+) -> int:
+    """
+    Reemite el token de los registros expirados dentro del período de gracia
+    que todavía no recibieron un reenvío.
+    """
+    if send_email is None:
+        from app.services.email_validation import send_verification_email as send_email
+
+    total = 0
+    while True:
+        now = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            rows = conn.execute(SELECT_TO_REFRESH_SQL, {
+                "hasta": now, "desde": now - grace, "batch_size": batch_size
+            }).all()
+            if not rows:
+                break
+            tokens = {row.id_login: secrets.token_urlsafe(32) for row in rows}
+            conn.execute(REFRESH_TOKENS_SQL, {
+                "ids": list(tokens.keys()),
+                "hashes": [auth.hash_token(t) for t in tokens.values()],
+                "expira": now + TOKEN_TTL,
+                "ahora": now,
+            })
+
+        # Los correos se envían después del commit para no mantener los locks
+        for row in rows:
+            send_email(row.correo, tokens[row.id_login])
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
+
+
+def purge_expired(
+    engine: Engine,
+    grace: timedelta = timedelta(days=7),
+    batch_size: int = 1000,
+    pause: float = 0.0,
+) -> int:
+    """
+    Borra registros sin verificar con más de 2 × TOKEN_TTL + `grace` de
+    antigüedad (token original, un reenvío y el período de gracia). Al borrar el
+    usuario se eliminan en cascada su login_usuario y sus sesiones.
+    """
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(SELECT_TO_PURGE_SQL, {
+                "registrado_antes": datetime.now(timezone.utc) - 2 * TOKEN_TTL - grace,
+                "ttl": TOKEN_TTL,
+                "batch_size": batch_size,
+            }).all()
+            if not rows:
+                break
+            conn.execute(DELETE_USERS_SQL, {"ids": [r.id_usuario for r in rows if r.id_usuario]})
+            conn.execute(DELETE_LOGINS_SQL, {"ids": [r.id_login for r in rows]})
+            conn.execute(DELETE_EMPTY_COMPANIES_SQL, {"ids": list({r.id_empresa for r in rows if r.id_empresa})})
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def main():
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Mantención de registros pendientes de verificación")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("ensure-schema", help="Crea las columnas de reenvío/antigüedad y los índices parciales")
+    sub.add_parser("hash-legacy-tokens", help="Convierte a digest los tokens guardados en claro (una sola vez)")
+
+    refresh = sub.add_parser("refresh", help="Reenvía el correo a registros expirados recientemente")
+    refresh.add_argument("--grace-days", type=int, default=7)
+    refresh.add_argument("--batch-size", type=int, default=500)
+
+    purge = sub.add_parser("purge", help="Borra registros sin verificar con más de 2 días + --grace-days")
+    purge.add_argument("--grace-days", type=int, default=7)
+    purge.add_argument("--batch-size", type=int, default=1000)
+    purge.add_argument("--pause", type=float, default=0.0, help="Segundos de espera entre lotes")
+
+    args = parser.parse_args()
+
+    if args.command == "ensure-schema":
+        ensure_schema(engine)
+        print("Índices de verificación al día")
+    elif args.command == "hash-legacy-tokens":
+        print(f"Tokens convertidos: {hash_legacy_tokens(engine)}")
+    elif args.command == "refresh":
+        total = refresh_expired(engine, timedelta(days=args.grace_days), args.batch_size)
+        print(f"Tokens reenviados: {total}")
+    elif args.command == "purge":
+        total = purge_expired(engine, timedelta(days=args.grace_days), args.batch_size, args.pause)
+        print(f"Registros eliminados: {total}")
+
+
+if __name__ == "__main__":
+    main()
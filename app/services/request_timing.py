@@ -0,0 +1,113 @@
+"""
+Middleware ASGI de tiempos por request.
+
+Reemplaza al antiguo `@app.middleware("http")`: al ser ASGI puro no envuelve
+la respuesta en un BaseHTTPMiddleware, así que los cuerpos en streaming (PDF,
+Excel, exportaciones) pasan sin buffer. Por cada request registra, con la
+plantilla de la ruta (`/empresa/{empresa_id}`, no la URL concreta):
+
+- http_requests_total{method,route,status}
+- http_request_duration_seconds{method,route}: hasta el último byte
+- http_time_to_first_byte_seconds{method,route}: hasta el inicio de la respuesta
+
+Solo se loguean los requests lentos (REQUEST_SLOW_MS), los 5xx y una muestra
+de REQUEST_LOG_SAMPLE_RATE del resto.
+
+También abre el span raíz de la traza del request (ver `tracing`) y devuelve
+su id en el header `X-Trace-Id`, y publica la ocupación del threadpool por
+defecto (ver `bulkheads`).
+"""
+import logging
+import os
+import random
+import time
+
+from dotenv import load_dotenv
+
+from app.services import bulkheads, tracing
+from app.services.metrics import Counter, Histogram
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn")
+
+REQUEST_SLOW_MS = float(os.getenv("REQUEST_SLOW_MS", "1000"))
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.01"))
+
+# Requests que no calzan con ninguna ruta: se agrupan para no crear una serie por URL
+SIN_RUTA = "<sin_ruta>"
+
+http_requests = Counter(
+    "http_requests_total",
+    "Requests HTTP por método, ruta y status",
+    ("method", "route", "status"),
+)
+http_duration = Histogram(
+    "http_request_duration_seconds",
+    "Tiempo total de respuesta por ruta",
+    ("method", "route"),
+)
+http_ttfb = Histogram(
+    "http_time_to_first_byte_seconds",
+    "Tiempo hasta el inicio de la respuesta por ruta",
+    ("method", "route"),
+)
+
+
+class RequestTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Ocupación del threadpool por defecto al llegar el request
+        bulkheads.publicar_default()
+        inicio = time.perf_counter()
+        primer_byte = None
+        status = 500
+        method = scope["method"]
+
+        with tracing.trace("http.request", method=method, path=scope["path"]) as raiz:
+
+            async def send_wrapper(message):
+                nonlocal primer_byte, status
+                if message["type"] == "http.response.start":
+                    primer_byte = time.perf_counter()
+                    status = message["status"]
+                    if raiz is not None:
+                        message["headers"] = [*message.get("headers", []), (b"x-trace-id", raiz.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                fin = time.perf_counter()
+                # FastAPI deja la ruta resuelta en el scope (APIRoute.matches)
+                route = scope.get("route")
+                plantilla = getattr(route, "path", None) or SIN_RUTA
+
+                http_requests.inc(method=method, route=plantilla, status=status)
+                http_duration.observe(fin - inicio, method=method, route=plantilla)
+                if primer_byte is not None:
+                    http_ttfb.observe(primer_byte - inicio, method=method, route=plantilla)
+
+                if raiz is not None:
+                    raiz.nombre = f"{method} {plantilla}"
+                    raiz.set(route=plantilla, status=status,
+                             primer_byte_ms=round(((primer_byte or fin) - inicio) * 1000, 3))
+
+                total_ms = (fin - inicio) * 1000
+                if total_ms >= REQUEST_SLOW_MS or status >= 500 or random.random() < REQUEST_LOG_SAMPLE_RATE:
+                    client = scope.get("client")
+                    logger.info(
+                        "%s %s -> %d en %.1f ms (primer byte %.1f ms) desde %s",
+                        method,
+                        scope["path"],
+                        status,
+                        total_ms,
+                        ((primer_byte or fin) - inicio) * 1000,
+                        client[0] if client else "-",
+                    )
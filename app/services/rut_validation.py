@@ -1,7 +1,38 @@
+"""
+Validación de RUT chileno.
+
+`validar_rut_chileno` valida un RUT a la vez y es la que usan los validadores
+de Pydantic. Para lotes grandes (importaciones, conciliaciones) está
+`validar_ruts`, que calcula todos los dígitos verificadores juntos sobre una
+matriz de dígitos de NumPy (dependencia del proyecto, importada en el primer
+lote). Si NumPy no está instalado se usa un loop en Python con el mismo
+resultado.
+
+Los dígitos se aceptan solo en ASCII: `\d` de `re` también acepta dígitos
+Unicode ("１２３…"), que no son un RUT válido.
+
+Comparación de rendimiento:
+    poetry run python -m app.services.rut_validation bench --n 200000
+"""
+import argparse
+import random
 import re
+import timeit
+from functools import cache
+from operator import mul
+from typing import Iterable, NamedTuple, Sequence
+
+_FORMATO_RUT = re.compile(r"[0-9]{7,8}[0-9K]")
+
+# Factores 2..7 desde la derecha, para un cuerpo de 8 dígitos (rellenado con ceros)
+_FACTORES = (3, 2, 7, 6, 5, 4, 3, 2)
+# 11 - resto → DV (el índice 0 no ocurre)
+_DV_POR_VALOR = "?123456789K0"
+
+
 def validar_rut_chileno(rut: str) -> bool:
     rut = rut.upper().replace(".", "").replace("-", "")
-    if not re.match(r"^\d{7,8}[0-9K]$", rut):
+    if not _FORMATO_RUT.fullmatch(rut):
         return False
 
     cuerpo, dv = rut[:-1], rut[-1]
@@ -18,3 +49,132 @@ def validar_rut_chileno(rut: str) -> bool:
     )
 
     return dv == dv_calculado
+
+
+def separar_rut(rut: str) -> tuple[str, str]:
+    """Separa número y DV: "21.402.714-3" -> ("21402714", "3")."""
+    rut_limpio = rut.replace(".", "").strip().upper()
+    if "-" in rut_limpio:
+        rut_num, dv = rut_limpio.split("-")
+    else:
+        rut_num, dv = rut_limpio[:-1], rut_limpio[-1]
+    return rut_num, dv
+
+
+# ---------------------------
+# Validación por lotes
+# ---------------------------
+
+class RutsValidados(NamedTuple):
+    validos: list[bool]
+    # (número, DV) normalizado para los válidos, None para los inválidos
+    normalizados: list[tuple[int, str] | None]
+
+
+@cache
+def _numpy():
+    """NumPy; se importa en el primer lote y no al levantar la app."""
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - entorno sin las dependencias del lock
+        return None
+    return numpy
+
+
+def _dvs_numpy(cuerpos: Sequence[str]) -> tuple[list[str], list[int]]:
+    np = _numpy()
+    digitos = np.frombuffer("".join(c.rjust(8, "0") for c in cuerpos).encode("ascii"), dtype=np.uint8)
+    digitos = digitos.reshape(len(cuerpos), 8).astype(np.int64) - ord("0")
+    valores = 11 - (digitos @ np.array(_FACTORES, dtype=np.int64)) % 11
+    numeros = digitos @ (10 ** np.arange(7, -1, -1, dtype=np.int64))
+    return [_DV_POR_VALOR[v] for v in valores.tolist()], numeros.tolist()
+
+
+def _dvs_python(cuerpos: Sequence[str]) -> tuple[list[str], list[int]]:
+    # Suma ponderada sobre los códigos ASCII, descontando el aporte de ord("0")
+    ajuste = ord("0") * sum(_FACTORES)
+    dvs = [
+        _DV_POR_VALOR[11 - (sum(map(mul, cuerpo.rjust(8, "0").encode(), _FACTORES)) - ajuste) % 11]
+        for cuerpo in cuerpos
+    ]
+    return dvs, [int(c) for c in cuerpos]
+
+
+def _calcular(cuerpos: Sequence[str]) -> tuple[list[str], list[int]]:
+    if not cuerpos:
+        return [], []
+    return _dvs_numpy(cuerpos) if _numpy() is not None else _dvs_python(cuerpos)
+
+
+def calcular_dvs(numeros: Iterable[int | str]) -> list[str]:
+    """Dígito verificador de cada número de RUT (hasta 8 dígitos)."""
+    cuerpos = [str(n) for n in numeros]
+    if any(len(c) > 8 or not c.isdigit() for c in cuerpos):
+        raise ValueError("Los números de RUT deben tener entre 1 y 8 dígitos")
+    return _calcular(cuerpos)[0]
+
+
+def validar_ruts(ruts: Iterable[str]) -> RutsValidados:
+    """
+    Valida un lote de RUT con las mismas reglas que `validar_rut_chileno`
+    (puntos y guión opcionales, cuerpo de 7 u 8 dígitos).
+    """
+    limpios = [str(rut).upper().replace(".", "").replace("-", "") for rut in ruts]
+    con_formato = [i for i, rut in enumerate(limpios) if _FORMATO_RUT.fullmatch(rut)]
+    dvs, numeros = _calcular([limpios[i][:-1] for i in con_formato])
+
+    validos = [False] * len(limpios)
+    normalizados: list[tuple[int, str] | None] = [None] * len(limpios)
+    for i, dv, numero in zip(con_formato, dvs, numeros):
+        if limpios[i][-1] == dv:
+            validos[i] = True
+            normalizados[i] = (numero, dv)
+    return RutsValidados(validos, normalizados)
+
+
+# ---------------------------
+# Benchmark
+# ---------------------------
+
+def _ruts_aleatorios(n: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+    numeros = [rnd.randint(1_000_000, 29_999_999) for _ in range(n)]
+    dvs = _dvs_python([str(x) for x in numeros])[0]
+    # ~10% con DV incorrecto
+    return [
+        f"{x}-{dv if rnd.random() > 0.1 else ('0' if dv != '0' else '1')}"
+        for x, dv in zip(numeros, dvs)
+    ]
+
+
+def bench(n: int = 200_000, repeat: int = 3) -> dict:
+    ruts = _ruts_aleatorios(n)
+    assert validar_ruts(ruts).validos == [validar_rut_chileno(r) for r in ruts]
+    numeros = [int(r.split("-")[0]) for r in ruts]
+    assert calcular_dvs(numeros) == _dvs_python([str(x) for x in numeros])[0]
+
+    escalar = min(timeit.repeat(lambda: [validar_rut_chileno(r) for r in ruts], number=1, repeat=repeat))
+    lote = min(timeit.repeat(lambda: validar_ruts(ruts), number=1, repeat=repeat))
+    return {
+        "n": n,
+        "numpy": _numpy() is not None,
+        "escalar_s": round(escalar, 4),
+        "lote_s": round(lote, 4),
+        "aceleracion": round(escalar / lote, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validación de RUT")
+    sub = parser.add_subparsers(dest="command", required=True)
+    b = sub.add_parser("bench", help="Compara validar_rut_chileno con validar_ruts")
+    b.add_argument("--n", type=int, default=200_000)
+    b.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        print(bench(args.n, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Registro de última actividad de sesiones con escritura diferida (write-behind).
+
+`get_current_user` solo anota en memoria el momento en que se usó cada sesión.
+Un hilo en segundo plano vuelca esas marcas a `sesiones.ultima_actividad` cada
+SESSION_ACTIVITY_FLUSH_SECONDS con un único UPDATE por lote, en vez de
+escribir en la DB en cada request autenticado.
+
+En el mismo ciclo se revocan las sesiones inactivas por más de
+SESSION_IDLE_TIMEOUT_MINUTES (0 = deshabilitado) y se cargan las sesiones
+revocadas recientemente, para rechazar sus access tokens sin consultar la DB.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn")
+
+SESSION_ACTIVITY_FLUSH_SECONDS = float(os.getenv("SESSION_ACTIVITY_FLUSH_SECONDS", "30"))
+SESSION_IDLE_TIMEOUT_MINUTES = int(os.getenv("SESSION_IDLE_TIMEOUT_MINUTES", "0"))
+# Un access token no vive más que esto, así que no hace falta recordar revocaciones más antiguas
+REVOKED_MEMORY_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+
+FLUSH_SQL = text("""
+    UPDATE sesiones AS s
+    SET ultima_actividad = GREATEST(coalesce(s.ultima_actividad, v.ts), v.ts)
+    FROM unnest(CAST(:ids AS integer[]), CAST(:ts AS timestamptz[])) AS v(id, ts)
+    WHERE s.id = v.id
+""")
+
+REVOKE_IDLE_SQL = text("""
+    UPDATE sesiones
+    SET revoked_at = now()
+    WHERE revoked_at IS NULL
+      AND (
+        ultima_actividad < :corte
+        -- Sesiones anteriores a la columna que no se han vuelto a usar
+        OR (ultima_actividad IS NULL AND fecha_sesion < :corte)
+      )
+      AND limite_sesion > now()
+    RETURNING id
+""")
+
+RECENTLY_REVOKED_SQL = text("""
+    SELECT id, revoked_at FROM sesiones WHERE revoked_at > :desde
+""")
+
+
+class SessionActivityTracker:
+    def __init__(self):
+        self._pending: dict[int, datetime] = {}
+        self._revoked: dict[int, datetime] = {}
+        self._last_revoked_poll = datetime.now(timezone.utc) - timedelta(minutes=REVOKED_MEMORY_MINUTES)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def touch(self, sesion_id: int) -> bool:
+        """Anota el uso de la sesión. Retorna False si la sesión está revocada."""
+        if sesion_id in self._revoked:
+            return False
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self._pending[sesion_id] = now
+        return True
+
+    def pending(self, sesion_id: int) -> datetime | None:
+        """Actividad aún no volcada a la DB (para mostrar datos al día)."""
+        return self._pending.get(sesion_id)
+
+    def flush(self, engine):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        try:
+            with engine.begin() as conn:
+                if pending:
+                    conn.execute(FLUSH_SQL, {"ids": list(pending.keys()), "ts": list(pending.values())})
+        except Exception:
+            # Devolver las marcas para reintentar en el próximo ciclo
+            with self._lock:
+                for sesion_id, ts in pending.items():
+                    self._pending.setdefault(sesion_id, ts)
+            raise
+
+        with engine.begin() as conn:
+            if SESSION_IDLE_TIMEOUT_MINUTES > 0:
+                corte = datetime.now(timezone.utc) - timedelta(minutes=SESSION_IDLE_TIMEOUT_MINUTES)
+                revoked_idle = conn.execute(REVOKE_IDLE_SQL, {"corte": corte}).scalars().all()
+                if revoked_idle:
+                    logger.info("Sesiones revocadas por inactividad: %d", len(revoked_idle))
+
+            # Revocaciones hechas por cualquier worker (o por logout) desde el último ciclo,
+            # con un margen por diferencias de reloj entre la app y la DB
+            desde = self._last_revoked_poll - timedelta(seconds=SESSION_ACTIVITY_FLUSH_SECONDS)
+            self._last_revoked_poll = datetime.now(timezone.utc)
+            for sesion_id, revoked_at in conn.execute(RECENTLY_REVOKED_SQL, {"desde": desde}).all():
+                self._revoked[sesion_id] = revoked_at
+
+        olvido = datetime.now(timezone.utc) - timedelta(minutes=REVOKED_MEMORY_MINUTES)
+        self._revoked = {k: v for k, v in self._revoked.items() if v > olvido}
+
+    def _run(self, engine):
+        while not self._stop.wait(SESSION_ACTIVITY_FLUSH_SECONDS):
+            try:
+                self.flush(engine)
+            except Exception as e:
+                logger.warning("No se pudo volcar la actividad de sesiones: %s", e)
+
+    def start(self, engine):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(engine,), name="session-activity-flush", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, engine):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.flush(engine)
+        except Exception as e:
+            logger.warning("No se pudo volcar la actividad de sesiones: %s", e)
+
+
+tracker = SessionActivityTracker()
@@ -0,0 +1,279 @@
+"""
+Mantención de la tabla `sesiones`.
+
+Se genera una fila por login y nada las elimina, así que el índice del refresh
+token crece sin límite. Este módulo borra sesiones expiradas o revocadas en
+lotes acotados, reporta el tamaño de la tabla y sus índices, y opcionalmente
+administra el particionado mensual por `fecha_sesion`.
+
+Uso:
+    poetry run python -m app.services.session_maintenance cleanup
+    poetry run python -m app.services.session_maintenance sizes
+    poetry run python -m app.services.session_maintenance ensure-schema
+    poetry run python -m app.services.session_maintenance partition --print-ddl
+    poetry run python -m app.services.session_maintenance partition --months-ahead 3
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.services import auth
+
+# Columnas e índices que necesitan la limpieza y el registro de actividad
+INDEX_DDL = [
+    "ALTER TABLE sesiones ADD COLUMN IF NOT EXISTS ultima_actividad timestamptz",
+    "CREATE INDEX IF NOT EXISTS ix_sesiones_limite_sesion ON sesiones (limite_sesion)",
+    "CREATE INDEX IF NOT EXISTS ix_sesiones_revoked_at ON sesiones (revoked_at) WHERE revoked_at IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS ix_sesiones_ultima_actividad ON sesiones (ultima_actividad) WHERE revoked_at IS NULL",
+]
+
+CLEANUP_SQL = text("""
+    DELETE FROM sesiones
+    WHERE id IN (
+        SELECT id FROM sesiones
+        WHERE limite_sesion < :corte OR revoked_at < :corte
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+""")
+
+
+def ensure_indexes(engine: Engine):
+    with engine.begin() as conn:
+        for ddl in INDEX_DDL:
+            conn.execute(text(ddl))
+
+
+def cleanup_sessions(
+    engine: Engine,
+    batch_size: int = 5000,
+    max_batches: int | None = None,
+    retention: timedelta = timedelta(0),
+    pause: float = 0.0,
+) -> int:
+    """
+    Borra sesiones con `limite_sesion` vencido o con `revoked_at` definido, en
+    lotes de `batch_size` filas (una transacción por lote para no bloquear la
+    tabla). `retention` conserva las filas recientes para auditoría.
+    Retorna la cantidad de filas eliminadas.
+    """
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        corte = datetime.now(timezone.utc) - retention
+        with engine.begin() as conn:
+            deleted = conn.execute(CLEANUP_SQL, {"corte": corte, "batch_size": batch_size}).rowcount
+        total += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def table_sizes(engine: Engine) -> dict:
+    """Tamaño de `sesiones` (incluye particiones si las hay) y de cada índice."""
+    with engine.connect() as conn:
+        relations = conn.execute(text("""
+            SELECT c.oid, c.relname
+            FROM pg_class c
+            WHERE c.oid IN (
+                SELECT relid FROM pg_partition_tree('sesiones'::regclass) WHERE isleaf
+            )
+        """)).all()
+        oids = [r.oid for r in relations]
+
+        totals = conn.execute(text("""
+            SELECT
+                coalesce(sum(pg_total_relation_size(oid)), 0) AS total_bytes,
+                coalesce(sum(pg_relation_size(oid)), 0) AS table_bytes,
+                coalesce(sum(pg_indexes_size(oid)), 0) AS index_bytes,
+                coalesce(sum(c.reltuples), 0)::bigint AS estimated_rows
+            FROM pg_class c
+            WHERE c.oid = ANY(CAST(:oids AS oid[]))
+        """), {"oids": oids}).one()
+
+        indexes = conn.execute(text("""
+            SELECT indexrelname, sum(pg_relation_size(indexrelid)) AS bytes
+            FROM pg_stat_user_indexes
+            WHERE relid = ANY(CAST(:oids AS oid[]))
+            GROUP BY indexrelname
+            ORDER BY bytes DESC
+        """), {"oids": oids}).all()
+
+    return {
+        "partitions": len(relations),
+        "estimated_rows": totals.estimated_rows,
+        "total_bytes": totals.total_bytes,
+        "table_bytes": totals.table_bytes,
+        "index_bytes": totals.index_bytes,
+        "indexes": {row.indexrelname: row.bytes for row in indexes},
+    }
+
+
+# ---------------------------
+# Particionado por fecha_sesion (opcional)
+# ---------------------------
+
+def is_partitioned(engine: Engine) -> bool:
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'sesiones'::regclass)"
+        )).scalar()
+
+
+def partition_ddl() -> list[str]:
+    """
+    DDL para convertir `sesiones` en una tabla particionada por mes.
+
+    No se ejecuta automáticamente: requiere una ventana de mantención. En una
+    tabla particionada las restricciones únicas deben incluir la clave de
+    partición, por lo que `tokenrefresh_hash` pasa a ser único por
+    (tokenrefresh_hash, fecha_sesion); el token es aleatorio de 64 bytes, así
+    que en la práctica sigue siendo único. No se crea partición DEFAULT, por lo
+    que `ensure_partitions` debe correr periódicamente (lo hace `cleanup`).
+    """
+    return [
+        "BEGIN",
+        "ALTER TABLE sesiones RENAME TO sesiones_old",
+        """CREATE TABLE sesiones (
+            LIKE sesiones_old INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS,
+            CONSTRAINT sesiones_part_pkey PRIMARY KEY (id, fecha_sesion),
+            CONSTRAINT sesiones_part_tokenrefresh_hash_key UNIQUE (tokenrefresh_hash, fecha_sesion),
+            CONSTRAINT fk_sesiones_part_usuario FOREIGN KEY (idusuario)
+                REFERENCES login_usuario (id_login) ON DELETE CASCADE
+        ) PARTITION BY RANGE (fecha_sesion)""",
+        # Una partición por mes desde la sesión más antigua hasta 3 meses adelante
+        """DO $$
+        DECLARE
+            inicio date;
+            fin date := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '4 months')::date;
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(fecha_sesion), now()) AT TIME ZONE 'UTC')::date
+            INTO inicio FROM sesiones_old;
+            WHILE inicio < fin LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF sesiones FOR VALUES FROM (%L) TO (%L)',
+                    'sesiones_y' || to_char(inicio, 'YYYY"m"MM'),
+                    inicio::text || ' 00:00:00+00',
+                    (inicio + interval '1 month')::date::text || ' 00:00:00+00'
+                );
+                inicio := (inicio + interval '1 month')::date;
+            END LOOP;
+        END $$""",
+        "INSERT INTO sesiones OVERRIDING SYSTEM VALUE SELECT * FROM sesiones_old",
+        "SELECT setval(pg_get_serial_sequence('sesiones', 'id'), coalesce(max(id), 1)) FROM sesiones",
+        "DROP TABLE sesiones_old",
+        *INDEX_DDL[1:],
+        "COMMIT",
+    ]
+
+
+def _month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(moment: datetime) -> datetime:
+    return (moment.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def ensure_partitions(engine: Engine, months_ahead: int = 3) -> list[str]:
+    """Crea las particiones mensuales del mes actual y los siguientes."""
+    created = []
+    start = _month_start(datetime.now(timezone.utc))
+    with engine.begin() as conn:
+        for _ in range(months_ahead + 1):
+            end = _next_month(start)
+            name = f"sesiones_y{start:%Y}m{start:%m}"
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF sesiones "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            created.append(name)
+            start = end
+    return created
+
+
+def drop_expired_partitions(engine: Engine) -> list[str]:
+    """
+    Elimina particiones mensuales cuyas sesiones ya expiraron todas: una sesión
+    dura REFRESH_TOKEN_EXPIRE_DAYS desde `fecha_sesion`, así que si el fin de la
+    partición más esa duración ya pasó, la partición completa es descartable.
+    Es mucho más barato que borrar fila por fila.
+    """
+    limite = datetime.now(timezone.utc) - timedelta(days=auth.REFRESH_TOKEN_EXPIRE_DAYS)
+    dropped = []
+    with engine.begin() as conn:
+        partitions = conn.execute(text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'sesiones'::regclass
+        """)).all()
+        for name, _bound in partitions:
+            if not name.startswith("sesiones_y"):
+                continue
+            start = datetime.strptime(name, "sesiones_y%Ym%m").replace(tzinfo=timezone.utc)
+            if _next_month(start) < limite:
+                conn.execute(text(f"ALTER TABLE sesiones DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+    return dropped
+
+
+def main():
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Mantención de la tabla sesiones")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    cleanup = sub.add_parser("cleanup", help="Borra sesiones expiradas o revocadas")
+    cleanup.add_argument("--batch-size", type=int, default=5000)
+    cleanup.add_argument("--max-batches", type=int, default=None)
+    cleanup.add_argument("--retention-days", type=int, default=0)
+    cleanup.add_argument("--pause", type=float, default=0.0, help="Segundos de espera entre lotes")
+
+    sub.add_parser("sizes", help="Reporta el tamaño de la tabla y sus índices")
+    sub.add_parser("ensure-schema", help="Crea la columna ultima_actividad y los índices")
+
+    partition = sub.add_parser("partition", help="Particionado mensual por fecha_sesion")
+    partition.add_argument("--print-ddl", action="store_true", help="Solo imprime el DDL de conversión")
+    partition.add_argument("--months-ahead", type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.command == "cleanup":
+        ensure_indexes(engine)
+        if is_partitioned(engine):
+            ensure_partitions(engine)
+            print("Particiones eliminadas:", drop_expired_partitions(engine))
+        deleted = cleanup_sessions(
+            engine,
+            batch_size=args.batch_size,
+            max_batches=args.max_batches,
+            retention=timedelta(days=args.retention_days),
+            pause=args.pause,
+        )
+        print(f"Sesiones eliminadas: {deleted}")
+    elif args.command == "ensure-schema":
+        ensure_indexes(engine)
+        print("Esquema de sesiones al día")
+    elif args.command == "sizes":
+        print(json.dumps(table_sizes(engine), indent=2))
+    elif args.command == "partition":
+        if args.print_ddl:
+            print(";\n".join(partition_ddl()) + ";")
+        elif not is_partitioned(engine):
+            print("La tabla sesiones no está particionada, usa --print-ddl para ver la conversión")
+        else:
+            print("Particiones:", ensure_partitions(engine, args.months_ahead))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Trazas livianas por request (spans) con propagación por contextvar.
+
+Cada request abre un span raíz en `RequestTimingMiddleware`; dentro de él se
+abren spans hijos en los puntos que interesan para desglosar el tiempo:
+
+- db.pool_checkout / db.query: espera por conexión y cada sentencia SQL
+  (eventos del engine, ver `instrument_engine`);
+- pdf.render / pdf.story / pdf.build: armado del story y layout de ReportLab;
+- excel.save: escritura del libro de openpyxl;
+- email.sendgrid: envío del correo.
+
+El span actual vive en un contextvar, así que el código que FastAPI ejecuta
+en el threadpool queda colgando del span del request sin pasar nada a mano.
+Sin exportador (TRACING_EXPORTER=none, el valor por defecto) no se crea
+ningún span y `span()` solo consulta el contextvar.
+
+Exportadores (TRACING_EXPORTER):
+- jsonl: un span por línea en TRACING_FILE.
+- otlp: lotes en el formato OTLP/HTTP JSON a TRACING_OTLP_ENDPOINT (Jaeger,
+  Tempo o un OpenTelemetry Collector lo reciben tal cual).
+
+Cualquier objeto con `export(spans)` sirve como exportador (`set_exporter`).
+La traza se exporta completa cuando termina el span raíz, desde un hilo en
+segundo plano.
+"""
+import abc
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Iterator, Protocol
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn")
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "contaplus-backend")
+TRACING_SQL_MAX_CHARS = int(os.getenv("TRACING_SQL_MAX_CHARS", "300"))
+
+_span_actual: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("span_actual", default=None)
+
+
+class Span:
+    __slots__ = ("traza", "span_id", "parent_id", "nombre", "atributos", "inicio_ns", "fin_ns", "error")
+
+    def __init__(self, traza: "Traza", nombre: str, parent_id: str | None, atributos: dict):
+        self.traza = traza
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.nombre = nombre
+        self.atributos = atributos
+        self.inicio_ns = time.time_ns()
+        self.fin_ns = None
+        self.error = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.traza.trace_id
+
+    def set(self, **atributos):
+        self.atributos.update(atributos)
+
+    def terminar(self, error: str | None = None):
+        if self.fin_ns is not None:
+            return
+        self.fin_ns = time.time_ns()
+        if error:
+            self.error = error
+        self.traza.cerrar(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "nombre": self.nombre,
+            "inicio": self.inicio_ns / 1e9,
+            "duracion_ms": round((self.fin_ns - self.inicio_ns) / 1e6, 3),
+            "atributos": self.atributos,
+            "error": self.error,
+        }
+
+
+class Traza:
+    def __init__(self, exporter: "Exporter"):
+        self.trace_id = os.urandom(16).hex()
+        self.exporter = exporter
+        self.raiz: Span | None = None
+        self.spans: list[Span] = []
+
+    def cerrar(self, span: Span):
+        # list.append es atómico: los spans del threadpool se agregan sin lock
+        self.spans.append(span)
+        if span is self.raiz:
+            # Copia: un span que cierre después de la raíz (p. ej. un hilo del
+            # threadpool que sigue tras cancelarse el request) no debe tocar la
+            # lista que el hilo del exportador está serializando
+            self.exporter.export(list(self.spans))
+
+
+# ---------------------------
+# API
+# ---------------------------
+
+def current_span() -> Span | None:
+    return _span_actual.get()
+
+
+def iniciar(nombre: str, **atributos) -> Span | None:
+    """
+    Abre un span hijo del actual sin volverlo el span actual (para eventos con
+    inicio y fin separados, como los del engine). None si no hay traza activa;
+    el llamador debe cerrarlo con `terminar()`.
+    """
+    padre = _span_actual.get()
+    if padre is None:
+        return None
+    return Span(padre.traza, nombre, padre.span_id, atributos)
+
+
+@contextmanager
+def _activar(s: Span) -> Iterator[Span]:
+    token = _span_actual.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _span_actual.reset(token)
+        s.terminar()
+
+
+@contextmanager
+def span(nombre: str, **atributos) -> Iterator[Span | None]:
+    """Span hijo del actual durante el bloque `with`; no hace nada sin traza activa."""
+    s = iniciar(nombre, **atributos)
+    if s is None:
+        yield None
+        return
+    with _activar(s):
+        yield s
+
+
+@contextmanager
+def trace(nombre: str, **atributos) -> Iterator[Span | None]:
+    """Span raíz de una traza nueva (un request), según exportador y muestreo."""
+    if _exporter is None or random.random() >= TRACING_SAMPLE_RATE:
+        yield None
+        return
+    traza = Traza(_exporter)
+    traza.raiz = Span(traza, nombre, None, atributos)
+    with _activar(traza.raiz):
+        yield traza.raiz
+
+
+# ---------------------------
+# Engine de SQLAlchemy
+# ---------------------------
+
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    s = iniciar("db.query", statement=statement[:TRACING_SQL_MAX_CHARS], executemany=executemany)
+    if s is not None:
+        context._tracing_span = s
+
+
+def _despues_sql(conn, cursor, statement, parameters, context, executemany):
+    s = getattr(context, "_tracing_span", None)
+    if s is not None:
+        s.set(rows=cursor.rowcount)
+        s.terminar()
+
+
+def _error_sql(exception_context):
+    s = getattr(exception_context.execution_context, "_tracing_span", None)
+    if s is not None:
+        s.terminar(error=f"{type(exception_context.original_exception).__name__}")
+
+
+def instrument_engine(engine):
+    """Un span db.query por sentencia ejecutada dentro de una traza."""
+    event.listen(engine, "before_cursor_execute", _antes_sql)
+    event.listen(engine, "after_cursor_execute", _despues_sql)
+    event.listen(engine, "handle_error", _error_sql)
+
+
+# ---------------------------
+# Exportadores
+# ---------------------------
+
+class Exporter(Protocol):
+    def export(self, spans: list[Span]) -> None: ...
+
+
+class BackgroundExporter(abc.ABC):
+    """
+    Encola las trazas terminadas y las escribe desde un hilo daemon; las
+    subclases implementan `write`.
+    """
+
+    def __init__(self, max_trazas: int = 1000):
+        self._cola: queue.Queue[list[Span]] = queue.Queue(maxsize=max_trazas)
+        self._hilo = threading.Thread(target=self._loop, name=type(self).__name__, daemon=True)
+        self._hilo.start()
+
+    def export(self, spans: list[Span]):
+        try:
+            self._cola.put_nowait(spans)
+        except queue.Full:
+            # Se prefiere perder trazas a frenar requests
+            pass
+
+    def _loop(self):
+        while True:
+            lote = [self._cola.get()]
+            while not self._cola.empty() and len(lote) < 100:
+                lote.append(self._cola.get_nowait())
+            try:
+                self.write([s for spans in lote for s in spans])
+            except Exception as e:
+                logger.warning("No se pudieron exportar %d trazas: %s", len(lote), e)
+
+    @abc.abstractmethod
+    def write(self, spans: list[Span]):
+        """Escribe un lote de spans (de una o más trazas)."""
+
+
+class JsonLinesExporter(BackgroundExporter):
+    def __init__(self, path: str = TRACING_FILE):
+        self.path = path
+        super().__init__()
+
+    def write(self, spans: list[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+
+def _otlp_valor(valor) -> dict:
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+def _otlp_span(s: Span) -> dict:
+    span = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.nombre,
+        # 2 = SERVER para la raíz del request, 1 = INTERNAL para el resto
+        "kind": 2 if s.parent_id is None else 1,
+        "startTimeUnixNano": str(s.inicio_ns),
+        "endTimeUnixNano": str(s.fin_ns),
+        "attributes": [{"key": k, "value": _otlp_valor(v)} for k, v in s.atributos.items()],
+        "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+    }
+    if s.parent_id:
+        span["parentSpanId"] = s.parent_id
+    return span
+
+
+class OtlpHttpExporter(BackgroundExporter):
+    def __init__(self, endpoint: str = TRACING_OTLP_ENDPOINT, service_name: str = TRACING_SERVICE_NAME):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        super().__init__()
+
+    def write(self, spans: list[Span]):
+        cuerpo = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [_otlp_span(s) for s in spans],
+                }],
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(cuerpo, default=str).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=5):
+            pass
+
+
+def _crear_exporter() -> Exporter | None:
+    if TRACING_EXPORTER == "jsonl":
+        return JsonLinesExporter()
+    if TRACING_EXPORTER == "otlp":
+        return OtlpHttpExporter()
+    if TRACING_EXPORTER != "none":
+        logger.warning("TRACING_EXPORTER desconocido: %s (se desactivan las trazas)", TRACING_EXPORTER)
+    return None
+
+
+_exporter: Exporter | None = _crear_exporter()
+
+
+def set_exporter(exporter: Exporter | None):
+    """Cambia el exportador (None desactiva las trazas)."""
+    global _exporter
+    _exporter = exporter
@@ -0,0 +1,112 @@
+"""
+Exportación de la nómina completa de trabajadores de una empresa (NDJSON o CSV).
+
+Las filas se leen con un cursor del lado del servidor (`stream_results`) en
+bloques de WORKER_EXPORT_CHUNK_SIZE y se emiten a medida que llegan, así que la
+memoria usada no depende del tamaño de la nómina y el primer byte sale apenas
+llega el primer bloque.
+
+Los generadores abren su propia conexión: FastAPI cierra la sesión de `get_db`
+antes de enviar el cuerpo de un StreamingResponse. Afp, salud y territorial se
+resuelven con el cache de catálogos (se pasan ya cargados), solo cargo va en
+el JOIN.
+"""
+import csv
+import io
+import json
+import os
+from typing import Iterator
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.models.generated import Cargo, DatosTrabajador, Trabajador
+from app.services.catalog_cache import Catalog
+
+load_dotenv()
+
+WORKER_EXPORT_CHUNK_SIZE = int(os.getenv("WORKER_EXPORT_CHUNK_SIZE", "1000"))
+
+COLUMNAS_CSV = (
+    "id_trabajador", "rut", "nombre", "apellido_paterno", "apellido_materno",
+    "fecha_nacimiento", "nacionalidad", "direccion_real", "cargo", "afp", "salud",
+    "region", "provincia", "comuna",
+)
+
+
+def _query(empresa_id: int):
+    datos, trabajador, cargo = DatosTrabajador.__table__, Trabajador.__table__, Cargo.__table__
+    return (
+        select(
+            datos,
+            trabajador.c.id_afp,
+            trabajador.c.id_salud,
+            trabajador.c.id_territorial,
+            cargo.c.id_cargo,
+            cargo.c.nombre.label("cargo_nombre"),
+        )
+        .join_from(datos, trabajador, trabajador.c.id_trabajador == datos.c.id_trabajador)
+        .outerjoin(cargo, cargo.c.id_cargo == trabajador.c.id_cargo)
+        .where(trabajador.c.id_empresa == empresa_id)
+        .order_by(datos.c.id_trabajador)
+    )
+
+
+def _filas(engine: Engine, empresa_id: int) -> Iterator[list]:
+    """Bloques de filas leídos con un cursor del lado del servidor."""
+    with engine.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=WORKER_EXPORT_CHUNK_SIZE
+        ).execute(_query(empresa_id))
+        for bloque in result.partitions():
+            yield bloque
+
+
+def _registro(r, afps: Catalog, saludes: Catalog, territoriales: Catalog) -> dict:
+    afp = afps.get(r.id_afp)
+    salud = saludes.get(r.id_salud)
+    territorial = territoriales.get(r.id_territorial) or {}
+    return {
+        "id_trabajador": r.id_trabajador,
+        "rut": f"{r.rut}-{r.DV_rut}",
+        "nombre": r.nombre,
+        "apellido_paterno": r.apellido_paterno,
+        "apellido_materno": r.apellido_materno,
+        "fecha_nacimiento": r.fecha_nacimiento.isoformat() if r.fecha_nacimiento else None,
+        "nacionalidad": r.nacionalidad,
+        "direccion_real": r.direccion_real,
+        "cargo": r.cargo_nombre,
+        "afp": afp["nombre"] if afp else None,
+        "salud": salud["nombre"] if salud else None,
+        "region": territorial.get("region"),
+        "provincia": territorial.get("provincia"),
+        "comuna": territorial.get("comuna"),
+    }
+
+
+def iter_ndjson(engine: Engine, empresa_id: int, afps: Catalog, saludes: Catalog,
+                territoriales: Catalog) -> Iterator[bytes]:
+    for bloque in _filas(engine, empresa_id):
+        yield "".join(
+            json.dumps(_registro(r, afps, saludes, territoriales), ensure_ascii=False) + "\n"
+            for r in bloque
+        ).encode()
+
+
+def iter_csv(engine: Engine, empresa_id: int, afps: Catalog, saludes: Catalog,
+             territoriales: Catalog) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNAS_CSV)
+
+    # BOM para que Excel reconozca UTF-8 (tildes y ñ)
+    buffer.write("\ufeff")
+    writer.writeheader()
+    for bloque in _filas(engine, empresa_id):
+        writer.writerows(_registro(r, afps, saludes, territoriales) for r in bloque)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Nómina vacía: solo la cabecera
+        yield buffer.getvalue().encode()
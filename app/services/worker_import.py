@@ -0,0 +1,250 @@
+"""
+Importación masiva de trabajadores desde XLSX o CSV.
+
+El archivo se lee fila a fila (openpyxl en modo read_only, `csv.reader`
+sobre el archivo subido) y se procesa en tres pasadas sobre las filas ya
+parseadas:
+
+1. Validación de campos con `TrabajadorCreateBase` y de todos los RUT del lote
+   juntos con `validar_ruts`.
+2. Resolución de nombres: afp, salud y territorial desde el cache de catálogos;
+   cargos de la empresa y RUT ya registrados con una consulta cada uno.
+3. Inserción con INSERT multi-fila en lotes de WORKER_IMPORT_BATCH_SIZE; el
+   commit (una sola transacción para todo el archivo) lo hace el router.
+
+Las filas con errores no se insertan y se informan con su número de fila.
+"""
+import csv
+import io
+import os
+import zipfile
+import zlib
+from datetime import datetime
+from typing import IO, Iterator
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.generated import Cargo, DatosTrabajador, Trabajador
+from app.schemas.workers import TrabajadorCreateBase
+from app.services.catalog_cache import cache as catalogos, normalize
+from app.services.rut_validation import validar_ruts
+
+load_dotenv()
+
+WORKER_IMPORT_MAX_ROWS = int(os.getenv("WORKER_IMPORT_MAX_ROWS", "10000"))
+WORKER_IMPORT_BATCH_SIZE = int(os.getenv("WORKER_IMPORT_BATCH_SIZE", "1000"))
+
+COLUMNAS = tuple(TrabajadorCreateBase.model_fields)
+
+
+class ImportFileError(ValueError):
+    """El archivo completo no se puede procesar (formato, cabecera, tamaño)."""
+
+
+# ---------------------------
+# Lectura del archivo
+# ---------------------------
+
+def _columna(nombre) -> str:
+    # "Apellido Paterno" -> "apellido_paterno"
+    return normalize(nombre or "").replace(" ", "_")
+
+
+def _celda(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    valor = str(valor).strip()
+    return valor or None
+
+
+# SyntaxError cubre el XML mal formado (ElementTree.ParseError y lxml)
+_ERRORES_XLSX = (zipfile.BadZipFile, zlib.error, EOFError, KeyError, ValueError, TypeError, OSError, SyntaxError)
+
+
+def _leer_xlsx(archivo: IO[bytes]) -> Iterator[dict]:
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        wb = load_workbook(archivo, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, OSError) as e:
+        raise ImportFileError(f"No se pudo leer el archivo XLSX: {e}")
+    try:
+        # En modo read_only la hoja se descomprime y parsea al iterar, así que
+        # un XLSX dañado también puede fallar aquí (zip, XML o celdas inválidas)
+        filas = wb.active.iter_rows(values_only=True)
+        cabecera = [_columna(c) for c in next(filas, ())]
+        for fila in filas:
+            yield dict(zip(cabecera, (_celda(v) for v in fila)))
+    except _ERRORES_XLSX as e:
+        raise ImportFileError(f"No se pudo leer el archivo XLSX: {e}")
+    finally:
+        wb.close()
+
+
+def _leer_csv(archivo: IO[bytes]) -> Iterator[dict]:
+    texto = io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(texto, dialecto)
+        cabecera = [_columna(c) for c in next(lector, ())]
+        for fila in lector:
+            yield dict(zip(cabecera, (_celda(v) for v in fila)))
+    except UnicodeDecodeError:
+        raise ImportFileError("El CSV debe estar codificado en UTF-8")
+    finally:
+        texto.detach()
+
+
+def leer_filas(archivo: IO[bytes], nombre_archivo: str) -> Iterator[dict]:
+    extension = os.path.splitext(nombre_archivo or "")[1].lower()
+    if extension == ".xlsx":
+        return _leer_xlsx(archivo)
+    if extension == ".csv":
+        return _leer_csv(archivo)
+    raise ImportFileError("Formato no soportado, se espera un archivo .xlsx o .csv")
+
+
+# ---------------------------
+# Importación
+# ---------------------------
+
+def _error_pydantic(e: ValidationError) -> list[str]:
+    return [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+
+
+def importar_trabajadores(
+    db: Session,
+    empresa_id: int,
+    filas: Iterator[dict],
+    dry_run: bool = False,
+) -> dict:
+    validas: list[tuple[int, TrabajadorCreateBase]] = []
+    errores: dict[int, list[str]] = {}
+    ruts: dict[int, str | None] = {}
+    total = 0
+
+    # 1. Validación de campos
+    for numero, fila in enumerate(filas, start=2):
+        if not any(v is not None for v in fila.values()):
+            continue
+        total += 1
+        if total > WORKER_IMPORT_MAX_ROWS:
+            raise ImportFileError(f"El archivo supera el máximo de {WORKER_IMPORT_MAX_ROWS} filas")
+        if total == 1 and not set(COLUMNAS) & fila.keys():
+            raise ImportFileError(f"Cabecera inválida, columnas esperadas: {', '.join(COLUMNAS)}")
+        ruts[numero] = fila.get("rut")
+        try:
+            validas.append((numero, TrabajadorCreateBase.model_validate(fila)))
+        except ValidationError as e:
+            errores[numero] = _error_pydantic(e)
+
+    # RUT: dígito verificador de todo el lote y duplicados dentro del archivo
+    vistos: dict[int, int] = {}
+    separados: dict[int, tuple[int, str]] = {}
+    lote = validar_ruts(t.rut for _, t in validas)
+    for (numero, _), normalizado in zip(validas, lote.normalizados):
+        if normalizado is None:
+            errores.setdefault(numero, []).append("rut: RUT inválido")
+            continue
+        separados[numero] = normalizado
+        rut_num = normalizado[0]
+        if rut_num in vistos:
+            errores.setdefault(numero, []).append(f"rut: repetido en la fila {vistos[rut_num]}")
+        else:
+            vistos[rut_num] = numero
+
+    # 2. Resolución de nombres: una consulta por tabla que no está en el cache
+    afps = catalogos.get("afp", db)
+    saludes = catalogos.get("salud", db)
+    territoriales = catalogos.get("territorial", db)
+    cargos = {
+        normalize(nombre): id_cargo
+        for id_cargo, nombre in db.execute(
+            select(Cargo.id_cargo, Cargo.nombre).where(Cargo.id_empresa == empresa_id)
+        ).all()
+    }
+    datos, trabajador = DatosTrabajador.__table__, Trabajador.__table__
+    existentes = set(db.execute(
+        select(datos.c.rut)
+        .join_from(datos, trabajador, trabajador.c.id_trabajador == datos.c.id_trabajador)
+        .where(trabajador.c.id_empresa == empresa_id, datos.c.rut.in_(list(vistos)))
+    ).scalars())
+
+    nuevos = []
+    for numero, t in validas:
+        if numero not in separados:
+            continue
+        errores_fila = []
+        rut_num, dv = separados[numero]
+        if rut_num in existentes:
+            errores_fila.append("rut: ya existe un trabajador con este RUT")
+
+        afp = afps.find(nombre=t.afp)
+        if not afp:
+            errores_fila.append(f"afp: AFP '{t.afp}' no encontrada")
+        salud = saludes.find(nombre=t.salud) if t.salud else None
+        if t.salud and not salud:
+            errores_fila.append(f"salud: Salud '{t.salud}' no encontrada")
+        territorial = territoriales.find(region=t.region, comuna=t.comuna)
+        if not territorial:
+            errores_fila.append(f"comuna: Territorial '{t.region} - {t.comuna}' no encontrado")
+        id_cargo = cargos.get(normalize(t.cargo)) if t.cargo else None
+        if t.cargo and id_cargo is None:
+            errores_fila.append(f"cargo: Cargo '{t.cargo}' no encontrado")
+
+        if errores_fila:
+            errores.setdefault(numero, []).extend(errores_fila)
+        elif numero not in errores:
+            nuevos.append((t, rut_num, dv, {
+                "id_empresa": empresa_id,
+                "id_afp": afp["id_afp"],
+                "id_territorial": territorial["id_territorial"],
+                "id_cargo": id_cargo,
+                "id_salud": salud["id_salud"] if salud else None,
+            }))
+
+    # 3. Inserción por lotes
+    if nuevos and not dry_run:
+        for inicio in range(0, len(nuevos), WORKER_IMPORT_BATCH_SIZE):
+            lote = nuevos[inicio:inicio + WORKER_IMPORT_BATCH_SIZE]
+            ids = db.execute(
+                insert(trabajador).returning(trabajador.c.id_trabajador, sort_by_parameter_order=True),
+                [valores for *_, valores in lote],
+            ).scalars().all()
+            db.execute(insert(datos), [
+                {
+                    "id_trabajador": id_trabajador,
+                    "nombre": t.nombre,
+                    "apellido_paterno": t.apellido_paterno,
+                    "apellido_materno": t.apellido_materno,
+                    "fecha_nacimiento": t.fecha_nacimiento,
+                    "rut": rut_num,
+                    "DV_rut": dv,
+                    "nacionalidad": t.nacionalidad,
+                    "direccion_real": t.direccion_real,
+                }
+                for id_trabajador, (t, rut_num, dv, _) in zip(ids, lote)
+            ])
+
+    return {
+        "total": total,
+        "importados": 0 if dry_run else len(nuevos),
+        "dry_run": dry_run,
+        "errores": [
+            {"fila": numero, "rut": ruts.get(numero), "errores": mensajes}
+            for numero, mensajes in sorted(errores.items())
+        ],
+    }
@@ -0,0 +1,131 @@
+"""
+Búsqueda difusa de trabajadores por nombre completo.
+
+`datos_trabajador.nombre_busqueda` es una columna generada con
+`lower(f_unaccent(nombre || ' ' || apellido_paterno || ' ' || apellido_materno))`
+indexada con GIN + `gin_trgm_ops`. Así "juan perez" encuentra a "Juan Pérez
+Soto" y también tolera errores de tipeo ("jaun peres"); los resultados se
+ordenan por `word_similarity` y se paginan por keyset sobre (score, id).
+
+`unaccent()` no es IMMUTABLE, por lo que no puede usarse directamente en una
+columna generada; `f_unaccent` es el envoltorio inmutable habitual.
+
+La columna no está mapeada en el modelo ORM: `Base.metadata.create_all` no
+podría crearla sin las extensiones, y las escrituras no deben tocarla.
+
+Uso:
+    poetry run python -m app.services.worker_search ensure-schema
+    poetry run python -m app.services.worker_search explain --empresa-id 1 --q "juan perez"
+"""
+import argparse
+import os
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+load_dotenv()
+
+# Similitud mínima (0..1) para considerar que un trabajador coincide
+WORKER_SEARCH_THRESHOLD = os.getenv("WORKER_SEARCH_THRESHOLD", "0.3")
+
+# Agregar la columna generada reescribe datos_trabajador: correr en ventana de mantención.
+# Los índices se crean CONCURRENTLY para no bloquear escrituras.
+SCHEMA_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+       LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+       AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$""",
+    """ALTER TABLE datos_trabajador ADD COLUMN IF NOT EXISTS nombre_busqueda text
+       GENERATED ALWAYS AS (
+           lower(f_unaccent(nombre || ' ' || apellido_paterno || ' ' || apellido_materno))
+       ) STORED""",
+    """CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_datos_trabajador_nombre_busqueda
+       ON datos_trabajador USING gin (nombre_busqueda gin_trgm_ops)""",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_trabajador_id_empresa ON trabajador (id_empresa)",
+]
+
+SET_THRESHOLD_SQL = text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)")
+
+SEARCH_SQL = text("""
+    WITH consulta AS (SELECT lower(f_unaccent(:q)) AS q)
+    SELECT * FROM (
+        SELECT
+            d.id_trabajador, d.nombre, d.apellido_paterno, d.apellido_materno,
+            d.rut, d."DV_rut", c.nombre AS cargo,
+            word_similarity(consulta.q, d.nombre_busqueda) AS score
+        FROM consulta
+        JOIN datos_trabajador d ON consulta.q <% d.nombre_busqueda
+        JOIN trabajador t ON t.id_trabajador = d.id_trabajador
+        LEFT JOIN cargo c ON c.id_cargo = t.id_cargo
+        WHERE t.id_empresa = :empresa_id
+    ) r
+    WHERE CAST(:after_score AS real) IS NULL
+       OR r.score < CAST(:after_score AS real)
+       OR (r.score = CAST(:after_score AS real) AND r.id_trabajador > :after_id)
+    ORDER BY r.score DESC, r.id_trabajador
+    LIMIT :limit
+""")
+
+
+def search(
+    db: Session,
+    empresa_id: int,
+    q: str,
+    limit: int = 20,
+    after: tuple[float, int] | None = None,
+) -> list:
+    """Trabajadores de la empresa ordenados por similitud con `q`."""
+    after_score, after_id = after if after else (None, None)
+    db.execute(SET_THRESHOLD_SQL, {"threshold": WORKER_SEARCH_THRESHOLD})
+    return db.execute(SEARCH_SQL, {
+        "q": q,
+        "empresa_id": empresa_id,
+        "limit": limit,
+        "after_score": after_score,
+        "after_id": after_id,
+    }).all()
+
+
+def ensure_schema(engine: Engine):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for ddl in SCHEMA_DDL:
+            conn.execute(text(ddl))
+
+
+def explain(engine: Engine, empresa_id: int, q: str, limit: int = 20) -> str:
+    with engine.begin() as conn:
+        conn.execute(SET_THRESHOLD_SQL, {"threshold": WORKER_SEARCH_THRESHOLD})
+        plan = conn.execute(
+            text("EXPLAIN (ANALYZE, BUFFERS) " + SEARCH_SQL.text),
+            {"q": q, "empresa_id": empresa_id, "limit": limit, "after_score": None, "after_id": None},
+        ).scalars().all()
+    return "\n".join(plan)
+
+
+def main():
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Búsqueda de trabajadores por nombre")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("ensure-schema", help="Crea extensiones, columna generada e índice GIN")
+
+    plan = sub.add_parser("explain", help="Muestra el plan y el tiempo de una búsqueda")
+    plan.add_argument("--empresa-id", type=int, required=True)
+    plan.add_argument("--q", required=True)
+    plan.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == "ensure-schema":
+        ensure_schema(engine)
+        print("Esquema de búsqueda de trabajadores al día")
+    elif args.command == "explain":
+        print(explain(engine, args.empresa_id, args.q, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Fixtures compartidas de los tests.
+
+Los tests que usan la DB corren contra la Postgres de DATABASE_URL, con el
+esquema al día (`make workers-search-schema`, `registration_maintenance
+ensure-schema`, ...), y se saltan si no está definida. Cada test corre dentro
+de una transacción que se revierte al terminar, así que no deja datos.
+
+    DATABASE_URL=postgresql+psycopg2://... poetry run pytest
+"""
+import os
+from dataclasses import dataclass, field
+
+import pytest
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    if not DATABASE_URL.startswith("postgresql"):
+        pytest.skip("DATABASE_URL no apunta a una Postgres")
+    # app.database crea el engine al importarse, por eso recién aquí
+    from app.database import engine
+
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    """Sesión dentro de una transacción que se revierte al terminar el test."""
+    from sqlalchemy.orm import Session
+
+    conn = engine.connect()
+    trans = conn.begin()
+    session = Session(bind=conn, autoflush=False, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        trans.rollback()
+        conn.close()
+
+
+@dataclass
+class Consultas:
+    """Sentencias ejecutadas y filas devueltas por cada una."""
+    sentencias: list[str] = field(default_factory=list)
+    filas: list[int] = field(default_factory=list)
+
+    def limpiar(self):
+        self.sentencias.clear()
+        self.filas.clear()
+
+
+@pytest.fixture
+def consultas(engine):
+    registro = Consultas()
+
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        registro.sentencias.append(statement)
+
+    def despues(conn, cursor, statement, parameters, context, executemany):
+        registro.filas.append(cursor.rowcount)
+
+    event.listen(engine, "before_cursor_execute", antes)
+    event.listen(engine, "after_cursor_execute", despues)
+    try:
+        yield registro
+    finally:
+        event.remove(engine, "before_cursor_execute", antes)
+        event.remove(engine, "after_cursor_execute", despues)
@@ -0,0 +1,95 @@
+"""
+/empresa/full: 1 consulta principal + 5 selectinload (socios, pagos,
+representantes, usuarios, logins), sin producto cartesiano entre colecciones,
+y menos consultas con ?include=.
+"""
+import json
+import os
+
+import pytest
+from starlette.requests import Request
+
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("DATABASE_URL no apunta a una Postgres", allow_module_level=True)
+
+from app.models.generated import Empresa, EmpresaRepresentante, EmpresaSocio, LoginUsuario, PagoAcciones, Usuario
+from app.routers.register_company import obtener_empresa
+
+SOCIOS = 3
+PAGOS_POR_SOCIO = 2
+REPRESENTANTES = 2
+USUARIOS = 3
+
+
+@pytest.fixture
+def empresa_id(db):
+    empresa = Empresa(razon_social="TEST empresa full", estado_suscripcion=0)
+    empresa.empresa_socio = [
+        EmpresaSocio(
+            nombre_socio=f"Socio {i}",
+            pago_acciones=[
+                PagoAcciones(cantidad_acciones=10, forma_pago="efectivo") for _ in range(PAGOS_POR_SOCIO)
+            ],
+        )
+        for i in range(SOCIOS)
+    ]
+    empresa.empresa_representante = [
+        EmpresaRepresentante(nombre_representante=f"Representante {i}") for i in range(REPRESENTANTES)
+    ]
+    empresa.usuario = [
+        Usuario(
+            nombre=f"Usuario {i}",
+            login_usuario=[
+                LoginUsuario(telefono="", correo=f"empresa-full-{i}@test.example.com", password="x", tipo_usuario=1)
+            ],
+        )
+        for i in range(USUARIOS)
+    ]
+    db.add(empresa)
+    db.flush()
+    # Sin objetos en memoria: cada relación tiene que cargarse desde la DB
+    db.expunge_all()
+    return empresa.id_empresa
+
+
+def _pedir(db, empresa_id: int, include: str | None = None) -> dict:
+    request = Request({"type": "http", "method": "GET", "path": "/empresa/full", "headers": []})
+    respuesta = obtener_empresa(request=request, include=include, db=db, user={"empresa_id": empresa_id})
+    assert respuesta.status_code == 200
+    return json.loads(respuesta.body)
+
+
+def test_empresa_full_consultas_y_filas(db, empresa_id, consultas):
+    consultas.limpiar()
+    cuerpo = _pedir(db, empresa_id)
+
+    assert len(consultas.sentencias) == 1 + 5, consultas.sentencias
+    # La consulta principal trae una sola fila (solo relaciones escalares con JOIN)
+    assert consultas.filas[0] == 1
+    # El resto trae exactamente las filas de cada colección, no su producto
+    assert sorted(consultas.filas[1:]) == sorted(
+        [SOCIOS, SOCIOS * PAGOS_POR_SOCIO, REPRESENTANTES, USUARIOS, USUARIOS]
+    )
+
+    assert len(cuerpo["empresa_socio"]) == SOCIOS
+    assert all(len(s["pago_acciones"]) == PAGOS_POR_SOCIO for s in cuerpo["empresa_socio"])
+    assert len(cuerpo["empresa_representante"]) == REPRESENTANTES
+    assert len(cuerpo["usuario"]) == USUARIOS
+
+
+@pytest.mark.parametrize("include, esperadas", [
+    ("territorial", 1),
+    ("empresa_seguridad,empresa_tipo", 1),
+    ("empresa_representante", 2),
+    ("empresa_socio", 3),
+    ("usuario", 3),
+])
+def test_empresa_full_include_reduce_consultas(db, empresa_id, consultas, include, esperadas):
+    consultas.limpiar()
+    cuerpo = _pedir(db, empresa_id, include)
+
+    assert len(consultas.sentencias) == esperadas, consultas.sentencias
+    pedidas = set(include.split(","))
+    omitidas = {"territorial", "empresa_parametros", "empresa_seguridad", "empresa_tipo",
+                "empresa_socio", "empresa_representante", "usuario"} - pedidas
+    assert not omitidas & cuerpo.keys()
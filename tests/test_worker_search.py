@@ -0,0 +1,138 @@
+"""
+/trabajadores/buscar contra Postgres: columna generada `nombre_busqueda`,
+índice trigram, umbral de `<%` y paginación por keyset sobre (score, id).
+
+Requiere pg_trgm, unaccent y `make workers-search-schema` aplicado; si no, se
+salta.
+"""
+import json
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import insert, select, text
+
+if not os.getenv("DATABASE_URL", "").startswith("postgresql"):
+    pytest.skip("DATABASE_URL no apunta a una Postgres", allow_module_level=True)
+
+from app.models.generated import Afp, DatosTrabajador, Empresa, Territorial, Trabajador
+from app.routers.workers import buscar_trabajadores
+from app.services import worker_search
+from app.services.pagination import PageParams
+
+NOMBRES = [
+    ("Juan", "Pérez", "Soto"),
+    ("JUAN", "PEREZ", "ROJAS"),
+    ("Juán", "Pérez", "Muñoz"),
+    ("Juan Pablo", "Pérez", "Díaz"),
+    ("Juana", "Peña", "Soto"),
+    ("María José", "González", "Díaz"),
+    ("Pedro", "Soto", "Muñoz"),
+    ("Camila", "Rojas", "Núñez"),
+]
+
+
+@pytest.fixture(scope="module")
+def esquema_busqueda(engine):
+    with engine.connect() as conn:
+        extensiones = set(conn.execute(text(
+            "SELECT extname FROM pg_extension WHERE extname IN ('pg_trgm', 'unaccent')"
+        )).scalars())
+        columna = conn.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'datos_trabajador' AND column_name = 'nombre_busqueda'"
+        )).first()
+    if extensiones != {"pg_trgm", "unaccent"} or columna is None:
+        pytest.skip("Falta pg_trgm/unaccent o `make workers-search-schema`")
+
+
+def _crear_empresa(db, nombres) -> int:
+    id_afp = db.execute(select(Afp.__table__.c.id_afp).limit(1)).scalar()
+    id_territorial = db.execute(select(Territorial.__table__.c.id_territorial).limit(1)).scalar()
+    if id_afp is None or id_territorial is None:
+        pytest.skip("Faltan los catálogos afp/territorial en la DB")
+
+    id_empresa = db.execute(
+        insert(Empresa.__table__).values(razon_social="TEST búsqueda").returning(Empresa.__table__.c.id_empresa)
+    ).scalar()
+    for i, (nombre, paterno, materno) in enumerate(nombres):
+        id_trabajador = db.execute(
+            insert(Trabajador.__table__)
+            .values(id_empresa=id_empresa, id_afp=id_afp, id_territorial=id_territorial)
+            .returning(Trabajador.__table__.c.id_trabajador)
+        ).scalar()
+        db.execute(insert(DatosTrabajador.__table__).values(
+            id_trabajador=id_trabajador,
+            nombre=nombre,
+            apellido_paterno=paterno,
+            apellido_materno=materno,
+            fecha_nacimiento=date(1990, 1, 1),
+            rut=1_000_000 + i,
+            DV_rut="0",
+            nacionalidad="Chilena",
+            direccion_real="Calle de prueba 123",
+        ))
+    return id_empresa
+
+
+@pytest.fixture
+def empresa_id(db, esquema_busqueda):
+    return _crear_empresa(db, NOMBRES)
+
+
+def _nombres(filas) -> list[str]:
+    return [f"{f.nombre} {f.apellido_paterno} {f.apellido_materno}" for f in filas]
+
+
+def test_sin_tildes_ni_mayusculas(db, empresa_id):
+    sin_tildes = worker_search.search(db, empresa_id, "juan perez", limit=50)
+    con_tildes = worker_search.search(db, empresa_id, "JUÁN PÉREZ", limit=50)
+
+    assert [f.id_trabajador for f in sin_tildes] == [f.id_trabajador for f in con_tildes]
+    encontrados = set(_nombres(sin_tildes))
+    for esperado in ("Juan Pérez Soto", "JUAN PEREZ ROJAS", "Juán Pérez Muñoz", "Juan Pablo Pérez Díaz"):
+        assert esperado in encontrados
+    assert "Camila Rojas Núñez" not in encontrados
+
+
+def test_tolera_errores_de_tipeo(db, empresa_id):
+    assert "Juan Pérez Soto" in _nombres(worker_search.search(db, empresa_id, "juan peres soto", limit=50))
+
+
+def test_orden_por_score_y_desempate_por_id(db, empresa_id):
+    filas = worker_search.search(db, empresa_id, "pedro soto", limit=50)
+
+    assert _nombres(filas)[0] == "Pedro Soto Muñoz"
+    claves = [(-f.score, f.id_trabajador) for f in filas]
+    assert claves == sorted(claves)
+
+
+def test_solo_la_empresa_del_usuario(db, empresa_id):
+    otra = _crear_empresa(db, [("Juan", "Pérez", "Soto")])
+    ids_otra = {f.id_trabajador for f in worker_search.search(db, otra, "juan perez", limit=50)}
+    ids_propia = {f.id_trabajador for f in worker_search.search(db, empresa_id, "juan perez", limit=50)}
+
+    assert len(ids_otra) == 1
+    assert not ids_otra & ids_propia
+
+
+def test_cursor_recorre_todo_sin_repetir(db, empresa_id):
+    completo = buscar_trabajadores(
+        q="juan perez", page=PageParams(limit=50, cursor=None), db=db, current_user={"empresa_id": empresa_id}
+    )
+    esperados = [item["id_trabajador"] for item in json.loads(completo.body)["items"]]
+    assert len(esperados) >= 4
+
+    vistos, cursor = [], None
+    while True:
+        respuesta = buscar_trabajadores(
+            q="juan perez", page=PageParams(limit=2, cursor=cursor), db=db, current_user={"empresa_id": empresa_id}
+        )
+        pagina = json.loads(respuesta.body)
+        assert len(pagina["items"]) <= 2
+        vistos.extend(item["id_trabajador"] for item in pagina["items"])
+        cursor = pagina["next_cursor"]
+        if cursor is None:
+            break
+
+    assert vistos == esperados